@@ -0,0 +1,378 @@
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from benchmarks.data import (
+    make_alpha_vantage_raw,
+    make_close_panel,
+    make_ohlc_df,
+    make_tickers,
+)
+from constants import RSI_PERIOD, S3_BUCKET, S3_FOLDER_DAILY_DATA
+
+# Sizes of the synthetic data per profile
+PROFILES: Dict[str, Dict[str, List[int]]] = {
+    "quick": {"rows": [1_000, 10_000], "tickers": [1, 100]},
+    "full": {"rows": [1_000, 10_000, 100_000], "tickers": [1, 100, 5_000]},
+}
+# Rows per ticker in the benchmarks over many tickers
+ROWS_PER_TICKER = 1_000
+NEW_ROWS = 5
+
+
+@dataclass
+class Benchmark:
+    """
+    setup is called before every timed call of func and is not timed,
+    its result is passed to func. Benchmarks without state changes
+    (stateless=True) may call func several times per setup.
+    """
+
+    name: str
+    params: Dict[str, Any]
+    func: Callable[[Any], Any]
+    setup: Callable[[], Any] = lambda: None
+    stateless: bool = True
+    tags: List[str] = field(default_factory=list)
+
+    @property
+    def id(self) -> str:
+        params = ",".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.name}[{params}]"
+
+
+@lru_cache(maxsize=None)
+def _ohlc_df(n_rows: int) -> pd.DataFrame:
+    return make_ohlc_df(n_rows=n_rows)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _main_and_new_ohlc_dfs(n_rows: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Stored bars without the last NEW_ROWS, and fresh bars overlapping them"""
+    df = _ohlc_df(n_rows=n_rows)
+    return df.iloc[:-NEW_ROWS], df.iloc[-2 * NEW_ROWS :]
+
+
+@lru_cache(maxsize=None)
+def _ohlc_rsi_df(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    from utils.derived_columns import add_rsi_column
+
+    return add_rsi_column(df=make_ohlc_df(n_rows=n_rows, seed=seed))
+
+
+def _rsi_benchmarks(rows: List[int]) -> List[Benchmark]:
+    from utils.derived_columns import add_rsi_column
+
+    res = list()
+    for n_rows in rows:
+        for ma_type in ["simple", "exponential"]:
+            res.append(
+                Benchmark(
+                    name="add_rsi_column",
+                    params={"rows": n_rows, "ma_type": ma_type},
+                    setup=partial(_ohlc_df, n_rows=n_rows),
+                    func=partial(add_rsi_column, col_name="Close", ma_type=ma_type),
+                    tags=["rsi"],
+                )
+            )
+    return res
+
+
+def _panel_rsi_benchmarks(tickers: List[int]) -> List[Benchmark]:
+    from utils.derived_columns import panel_rsi
+
+    return [
+        Benchmark(
+            name="panel_rsi",
+            params={"rows": ROWS_PER_TICKER, "tickers": n_tickers},
+            setup=partial(
+                make_close_panel, n_tickers=n_tickers, n_rows=ROWS_PER_TICKER
+            ),
+            func=partial(panel_rsi, periods=[RSI_PERIOD]),
+            tags=["rsi"],
+        )
+        for n_tickers in tickers
+    ]
+
+
+def _import_data_benchmarks(rows: List[int]) -> List[Benchmark]:
+    from utils.import_data import add_fresh_ohlc_to_main_data
+    from utils.import_data.alpha_vantage import (
+        _check_imported_data,
+        transform_a_v_raw_data_to_df,
+    )
+
+    res = list()
+    for n_rows in rows:
+        res.append(
+            Benchmark(
+                name="add_fresh_ohlc_to_main_data",
+                params={"rows": n_rows, "new_rows": NEW_ROWS},
+                setup=partial(_main_and_new_ohlc_dfs, n_rows=n_rows),
+                func=lambda dfs: add_fresh_ohlc_to_main_data(
+                    main_df=dfs[0], new_data=dfs[1]
+                ),
+                tags=["import"],
+            )
+        )
+        raw = make_alpha_vantage_raw(n_rows=n_rows)
+        res.append(
+            Benchmark(
+                name="transform_a_v_raw_data_to_df",
+                params={"rows": n_rows},
+                setup=partial(_identity, raw),
+                func=partial(
+                    transform_a_v_raw_data_to_df, key_name="Time Series (Daily)"
+                ),
+                tags=["import"],
+            )
+        )
+        transformed = transform_a_v_raw_data_to_df(
+            data=raw, key_name="Time Series (Daily)"
+        )
+        res.append(
+            Benchmark(
+                name="_check_imported_data",
+                params={"rows": n_rows},
+                setup=partial(_identity, transformed),
+                func=partial(_check_imported_data, ticker="BENCH", data_type="Daily"),
+                tags=["import"],
+            )
+        )
+    return res
+
+
+def _s3_csv_benchmarks(rows: List[int]) -> List[Benchmark]:
+    from utils.s3 import read_df_from_s3_csv, s3_df_cache, write_df_to_s3_csv
+
+    res = list()
+    for n_rows in rows:
+        filename = f"BENCH_{n_rows}.csv"
+
+        def _write(df: pd.DataFrame, filename: str = filename) -> str:
+            return write_df_to_s3_csv(
+                df=df, filename=filename, bucket=S3_BUCKET, folder=S3_FOLDER_DAILY_DATA
+            )
+
+        def _setup_read(
+            n_rows: int = n_rows, filename: str = filename, cached: bool = False
+        ) -> None:
+            _write(df=_ohlc_df(n_rows=n_rows), filename=filename)
+            if cached:
+                # Fill the in-memory tier, the timed read is answered 304
+                read_df_from_s3_csv(filename=filename)
+            else:
+                s3_df_cache.clear()
+                s3_df_cache.invalidate(
+                    bucket=S3_BUCKET, key=S3_FOLDER_DAILY_DATA + filename
+                )
+
+        def _read(_: Any, filename: str = filename) -> Optional[pd.DataFrame]:
+            return read_df_from_s3_csv(filename=filename)
+
+        res.append(
+            Benchmark(
+                name="s3_csv_write",
+                params={"rows": n_rows},
+                setup=partial(_ohlc_df, n_rows=n_rows),
+                func=_write,
+                tags=["s3"],
+            )
+        )
+        res.append(
+            Benchmark(
+                name="s3_csv_read",
+                params={"rows": n_rows, "cache": "cold"},
+                setup=_setup_read,
+                func=_read,
+                stateless=False,
+                tags=["s3"],
+            )
+        )
+        res.append(
+            Benchmark(
+                name="s3_csv_read",
+                params={"rows": n_rows, "cache": "revalidated"},
+                setup=partial(_setup_read, cached=True),
+                func=_read,
+                tags=["s3"],
+            )
+        )
+    return res
+
+
+def _update_rsi_benchmarks(rows: List[int], tickers: List[int]) -> List[Benchmark]:
+    """
+    Stored bars and RSI miss the last NEW_ROWS values, which are calculated
+    and appended by the timed call, so setup restores the RSI before every call.
+    """
+    from utils.derived_columns import (
+        calculate_rsi_with_state,
+        update_close_rsi_for_ticker,
+        write_rsi_df_to_s3,
+        write_rsi_state_to_s3,
+    )
+    from utils.s3 import BARS_GROUP, write_dataset_group
+
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    sizes = [(n_rows, 1) for n_rows in rows]
+    sizes = sizes + [
+        (ROWS_PER_TICKER, n_tickers) for n_tickers in tickers if n_tickers > 1
+    ]
+    res = list()
+    for n_rows, n_tickers in sizes:
+        names = [f"{ticker}_{n_rows}" for ticker in make_tickers(n_tickers=n_tickers)]
+        prepared: Dict[str, bool] = dict()
+
+        def _setup(
+            names: List[str] = names, n_rows: int = n_rows, prepared: dict = prepared
+        ) -> List[str]:
+            for i, ticker in enumerate(names):
+                df = _ohlc_rsi_df(n_rows=n_rows, seed=i)
+                if not prepared:
+                    write_dataset_group(
+                        ticker=ticker, group=BARS_GROUP, df=df.drop(columns=rsi_col)
+                    )
+                stored = df.iloc[:-NEW_ROWS]
+                write_rsi_df_to_s3(ticker=ticker, df=stored)
+                _, state = calculate_rsi_with_state(
+                    close=stored["Close"].set_axis(pd.to_datetime(stored.index)),
+                    period=RSI_PERIOD,
+                )
+                write_rsi_state_to_s3(ticker=ticker, state=state)
+            prepared["done"] = True
+            return names
+
+        res.append(
+            Benchmark(
+                name="update_close_rsi_for_ticker",
+                params={"rows": n_rows, "tickers": n_tickers},
+                setup=_setup,
+                func=lambda names: [
+                    update_close_rsi_for_ticker(ticker=ticker, initial_ohlc_df=None)
+                    for ticker in names
+                ],
+                stateless=False,
+                tags=["rsi", "s3"],
+            )
+        )
+    return res
+
+
+def _read_many_benchmarks(tickers: List[int]) -> List[Benchmark]:
+    """Universe loading: the bars of every ticker, sequential vs read_many"""
+    from utils.s3 import (
+        BARS_GROUP,
+        read_many,
+        read_ticker_dataset,
+        s3_df_cache,
+        write_dataset_group,
+    )
+
+    res = list()
+    for n_tickers in tickers:
+        names = [f"{ticker}_MANY" for ticker in make_tickers(n_tickers=n_tickers)]
+        prepared: Dict[str, bool] = dict()
+
+        def _setup(names: List[str] = names, prepared: dict = prepared) -> List[str]:
+            if not prepared:
+                for i, ticker in enumerate(names):
+                    df = make_ohlc_df(n_rows=ROWS_PER_TICKER, seed=i)
+                    write_dataset_group(ticker=ticker, group=BARS_GROUP, df=df)
+                prepared["done"] = True
+            s3_df_cache.clear()
+            return names
+
+        res.append(
+            Benchmark(
+                name="read_ticker_dataset_sequential",
+                params={"rows": ROWS_PER_TICKER, "tickers": n_tickers},
+                setup=_setup,
+                func=lambda names: [
+                    read_ticker_dataset(ticker=ticker) for ticker in names
+                ],
+                stateless=False,
+                tags=["s3"],
+            )
+        )
+        res.append(
+            Benchmark(
+                name="read_many",
+                params={"rows": ROWS_PER_TICKER, "tickers": n_tickers},
+                setup=_setup,
+                func=lambda names: read_many(tickers=names),
+                stateless=False,
+                tags=["s3"],
+            )
+        )
+    return res
+
+
+def _chart_benchmarks(rows: List[int], work_dir: str) -> List[Benchmark]:
+    import utils.draw_charts.render_cache as render_cache
+    import utils.draw_charts.store as chart_store
+    from utils.draw_charts import (
+        build_candlestick_with_rsi_figure,
+        draw_save_candlestick_with_rsi,
+        get_chart_window,
+        remove_charts,
+    )
+
+    chart_store.CHART_LOCAL_DIR = os.path.join(work_dir, "charts")
+    render_cache.CHART_RENDER_CACHE_DIR = os.path.join(work_dir, "chart_cache")
+    os.makedirs(chart_store.CHART_LOCAL_DIR, exist_ok=True)
+
+    def _setup_draw(n_rows: int) -> pd.DataFrame:
+        # The saved chart would be reused, the timed call must render
+        remove_charts(ticker="BENCH", fmts=["png"])
+        df = _ohlc_rsi_df(n_rows=n_rows)
+        return df.set_axis(pd.to_datetime(df.index))
+
+    def _setup_window(n_rows: int) -> pd.DataFrame:
+        return get_chart_window(df=_setup_draw(n_rows=n_rows))
+
+    res = list()
+    for n_rows in rows:
+        res.append(
+            Benchmark(
+                name="build_candlestick_with_rsi_figure",
+                params={"rows": n_rows},
+                setup=partial(_setup_window, n_rows=n_rows),
+                func=partial(build_candlestick_with_rsi_figure, ticker="BENCH"),
+                tags=["chart"],
+            )
+        )
+        res.append(
+            Benchmark(
+                name="draw_save_candlestick_with_rsi",
+                params={"rows": n_rows},
+                setup=partial(_setup_draw, n_rows=n_rows),
+                func=partial(draw_save_candlestick_with_rsi, ticker="BENCH"),
+                stateless=False,
+                tags=["chart"],
+            )
+        )
+    return res
+
+
+def get_benchmarks(profile: str, work_dir: str) -> List[Benchmark]:
+    """All benchmarks of the profile, work_dir is used for local files"""
+    if profile not in PROFILES:
+        raise ValueError(f"get_benchmarks: {profile=}, must be one of {list(PROFILES)}")
+    rows = PROFILES[profile]["rows"]
+    tickers = PROFILES[profile]["tickers"]
+    return (
+        _rsi_benchmarks(rows=rows)
+        + _panel_rsi_benchmarks(tickers=tickers)
+        + _import_data_benchmarks(rows=rows)
+        + _s3_csv_benchmarks(rows=rows)
+        + _update_rsi_benchmarks(rows=rows, tickers=tickers)
+        + _read_many_benchmarks(tickers=tickers)
+        + _chart_benchmarks(rows=rows, work_dir=work_dir)
+    )
@@ -0,0 +1,83 @@
+"""
+Compare two benchmark result files, e.g.
+
+    python -m benchmarks.compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+
+Exits with 1 if any benchmark is slower than --threshold allows,
+so that it can fail a CI job.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+
+def _load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        data = json.load(f)
+    return {res["id"]: res for res in data["results"]}
+
+
+def compare_results(
+    old: Dict[str, Dict[str, Any]],
+    new: Dict[str, Dict[str, Any]],
+    stat: str = "median",
+    threshold: float = 0.1,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Ratio new / old of the stat for every benchmark present in both.
+    Returns the rows and the ids of regressions, ratio > 1 + threshold.
+    """
+    rows = list()
+    regressions = list()
+    for bench_id in sorted(set(old) & set(new)):
+        if "error" in old[bench_id] or "error" in new[bench_id]:
+            continue
+        ratio = new[bench_id][stat] / old[bench_id][stat]
+        rows.append(
+            {
+                "id": bench_id,
+                "old": old[bench_id][stat],
+                "new": new[bench_id][stat],
+                "ratio": ratio,
+            }
+        )
+        if ratio > 1.0 + threshold:
+            regressions.append(bench_id)
+    return rows, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--stat", default="median", choices=["min", "median", "mean"])
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Allowed slowdown, 0.1 means 10%%",
+    )
+    args = parser.parse_args()
+
+    old = _load_results(args.old)
+    new = _load_results(args.new)
+    rows, regressions = compare_results(
+        old=old, new=new, stat=args.stat, threshold=args.threshold
+    )
+    for row in rows:
+        mark = "REGRESSION" if row["id"] in regressions else ""
+        print(
+            f"{row['id']:<70} {row['old'] * 1e3:12.3f} ms {row['new'] * 1e3:12.3f} ms"
+            f" {row['ratio']:7.2f}x {mark}"
+        )
+    for bench_id in sorted(set(old) ^ set(new)):
+        print(f"{bench_id:<70} only in {'old' if bench_id in old else 'new'}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+def make_ohlc_df(n_rows: int, seed: int = 0, end: str = "2025-01-03") -> pd.DataFrame:
+    """
+    Synthetic daily bars: geometric random walk of Close on business days,
+    Open/High/Low around it and integer Volume.
+    The index is datetime64, as in the DataFrames read from S3.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=n_rows)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n_rows)))
+    open_ = close * np.exp(rng.normal(0.0, 0.005, n_rows))
+    spread = close * np.abs(rng.normal(0.0, 0.01, n_rows))
+    df = pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) + spread,
+            "Low": np.minimum(open_, close) - spread,
+            "Close": close,
+            "Volume": rng.integers(1_000, 1_000_000, n_rows),
+        },
+        index=index,
+    )
+    return df
+
+
+def make_tickers(n_tickers: int) -> List[str]:
+    return [f"T{i:05d}" for i in range(n_tickers)]
+
+
+def make_ohlc_dfs(n_tickers: int, n_rows: int) -> Dict[str, pd.DataFrame]:
+    return {
+        ticker: make_ohlc_df(n_rows=n_rows, seed=i)
+        for i, ticker in enumerate(make_tickers(n_tickers=n_tickers))
+    }
+
+
+def make_close_panel(n_tickers: int, n_rows: int, seed: int = 0) -> np.ndarray:
+    """Close prices, dates x tickers"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.01, (n_rows, n_tickers))
+    return 100.0 * np.exp(np.cumsum(returns, axis=0))
+
+
+def make_alpha_vantage_raw(n_rows: int, seed: int = 0) -> dict:
+    """Alpha Vantage TIME_SERIES_DAILY response with string values, newest first"""
+    df = make_ohlc_df(n_rows=n_rows, seed=seed)
+    series = {
+        str(day): {
+            "1. open": f"{row.Open:.4f}",
+            "2. high": f"{row.High:.4f}",
+            "3. low": f"{row.Low:.4f}",
+            "4. close": f"{row.Close:.4f}",
+            "5. volume": str(row.Volume),
+        }
+        for day, row in zip(df.index[::-1], df.iloc[::-1].itertuples())
+    }
+    return {
+        "Meta Data": {"2. Symbol": "BENCH"},
+        "Time Series (Daily)": series,
+    }
@@ -0,0 +1,173 @@
+import hashlib
+import io
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code: str, operation: str, status: int) -> ClientError:
+    return ClientError(
+        error_response={
+            "Error": {"Code": code, "Message": code},
+            "ResponseMetadata": {
+                "RequestId": "",
+                "HostId": "",
+                "HTTPStatusCode": status,
+                "HTTPHeaders": {},
+                "RetryAttempts": 0,
+            },
+        },
+        operation_name=operation,
+    )
+
+
+def _ok(**kwargs: Any) -> dict:
+    return {"ResponseMetadata": {"HTTPStatusCode": 200}, **kwargs}
+
+
+class _ListObjectsV2Paginator:
+    def __init__(self, client: "FilesystemS3Client") -> None:
+        self.client = client
+
+    def paginate(self, **kwargs: Any) -> Iterator[dict]:
+        yield self.client.list_objects_v2(**kwargs)
+
+
+class FilesystemS3Client:
+    """
+    The part of the boto3 S3 client used by utils.s3, with object bodies
+    in files under root_dir, so that benchmarks measure our code and
+    local disk instead of the network.
+    ETags, metadata and modification times are kept in memory.
+    """
+
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir = root_dir
+        self._objects: Dict[Tuple[str, str], dict] = dict()
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root_dir, bucket, *key.split("/"))
+
+    def create_bucket(self, Bucket: str, **kwargs: Any) -> dict:
+        os.makedirs(os.path.join(self.root_dir, Bucket), exist_ok=True)
+        return _ok()
+
+    def put_object(
+        self,
+        Bucket: str,
+        Key: str,
+        Body: bytes,
+        Metadata: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> dict:
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        elif not isinstance(Body, bytes):
+            Body = Body.read()
+        path = self._path(bucket=Bucket, key=Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body)
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self._objects[(Bucket, Key)] = {
+            "ETag": etag,
+            "Metadata": Metadata or dict(),
+            "LastModified": datetime.now(tz=timezone.utc).replace(microsecond=0),
+            "Size": len(Body),
+        }
+        return _ok(ETag=etag)
+
+    def _get_info(self, bucket: str, key: str, operation: str) -> dict:
+        info = self._objects.get((bucket, key))
+        if info is None:
+            raise _client_error(code="NoSuchKey", operation=operation, status=404)
+        return info
+
+    def head_object(self, Bucket: str, Key: str, **kwargs: Any) -> dict:
+        try:
+            info = self._get_info(bucket=Bucket, key=Key, operation="HeadObject")
+        except ClientError:
+            # HEAD responses have no body, S3 answers with the bare status code
+            raise _client_error(code="404", operation="HeadObject", status=404)
+        return _ok(ContentLength=info["Size"], **info)
+
+    def get_object(
+        self, Bucket: str, Key: str, IfNoneMatch: Optional[str] = None, **kwargs: Any
+    ) -> dict:
+        info = self._get_info(bucket=Bucket, key=Key, operation="GetObject")
+        if IfNoneMatch is not None and IfNoneMatch == info["ETag"]:
+            raise _client_error(code="304", operation="GetObject", status=304)
+        with open(self._path(bucket=Bucket, key=Key), "rb") as f:
+            body = f.read()
+        return _ok(Body=io.BytesIO(body), ContentLength=len(body), **info)
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs: Any) -> dict:
+        if self._objects.pop((Bucket, Key), None) is not None:
+            os.remove(self._path(bucket=Bucket, key=Key))
+        return {"ResponseMetadata": {"HTTPStatusCode": 204}}
+
+    def delete_objects(self, Bucket: str, Delete: dict, **kwargs: Any) -> dict:
+        for obj in Delete["Objects"]:
+            self.delete_object(Bucket=Bucket, Key=obj["Key"])
+        return _ok(Deleted=[{"Key": obj["Key"]} for obj in Delete["Objects"]])
+
+    def list_objects_v2(
+        self,
+        Bucket: str,
+        Prefix: str = "",
+        Delimiter: Optional[str] = None,
+        **kwargs: Any,
+    ) -> dict:
+        contents: List[dict] = list()
+        common_prefixes = set()
+        for (bucket, key), info in sorted(self._objects.items()):
+            if bucket != Bucket or not key.startswith(Prefix):
+                continue
+            rest = key[len(Prefix) :]
+            if Delimiter and Delimiter in rest:
+                common_prefixes.add(Prefix + rest.split(Delimiter)[0] + Delimiter)
+                continue
+            contents.append(
+                {
+                    "Key": key,
+                    "ETag": info["ETag"],
+                    "Size": info["Size"],
+                    "LastModified": info["LastModified"],
+                }
+            )
+        res = _ok(KeyCount=len(contents) + len(common_prefixes), IsTruncated=False)
+        # Like S3, the keys are absent if there are no objects
+        if contents:
+            res["Contents"] = contents
+        if common_prefixes:
+            res["CommonPrefixes"] = [{"Prefix": p} for p in sorted(common_prefixes)]
+        return res
+
+    def get_paginator(self, operation_name: str) -> _ListObjectsV2Paginator:
+        if operation_name != "list_objects_v2":
+            raise ValueError(f"get_paginator: {operation_name=} is not supported")
+        return _ListObjectsV2Paginator(client=self)
+
+
+@contextmanager
+def fake_s3(root_dir: str, bucket: str) -> Iterator[FilesystemS3Client]:
+    """
+    Replace the S3 client in every loaded utils module with FilesystemS3Client
+    for the duration of the block.
+    """
+    client = FilesystemS3Client(root_dir=root_dir)
+    client.create_bucket(Bucket=bucket)
+    replaced = list()
+    for name, module in list(sys.modules.items()):
+        if name.startswith("utils") and hasattr(module, "s3_client"):
+            replaced.append((module, getattr(module, "s3_client")))
+            setattr(module, "s3_client", client)
+    try:
+        yield client
+    finally:
+        for module, original in replaced:
+            setattr(module, "s3_client", original)
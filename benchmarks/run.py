@@ -0,0 +1,162 @@
+"""
+Run the benchmark suite and save the timings as JSON, e.g.
+
+    python -m benchmarks.run --profile quick --filter rsi
+
+Compare two result files with benchmarks.compare.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.cases import Benchmark, get_benchmarks
+from benchmarks.fake_s3 import fake_s3
+from constants import S3_BUCKET
+from utils.logging import get_app_logger
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Stateless benchmarks repeat the call until one measurement takes this long
+MIN_MEASUREMENT_SECONDS = 0.05
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment() -> Dict[str, Any]:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _calibrate_number(bench: Benchmark, state: Any) -> int:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            bench.func(state)
+        if time.perf_counter() - start >= MIN_MEASUREMENT_SECONDS or number >= 10**6:
+            return number
+        number = number * 10
+
+
+def time_benchmark(bench: Benchmark, repeat: int) -> Dict[str, Any]:
+    """
+    Seconds per call: min, median, mean and stdev over repeat measurements.
+    A failed benchmark gets an error instead, e.g. charts without Kaleido.
+    """
+    res: Dict[str, Any] = {"id": bench.id, "name": bench.name, "params": bench.params}
+    try:
+        number = 1
+        if bench.stateless:
+            number = _calibrate_number(bench=bench, state=bench.setup())
+        else:
+            # Warm-up call, e.g. imports and caches that any real run has
+            bench.func(bench.setup())
+        times: List[float] = list()
+        for _ in range(repeat):
+            state = bench.setup()
+            start = time.perf_counter()
+            for _ in range(number):
+                bench.func(state)
+            times.append((time.perf_counter() - start) / number)
+    except Exception as e:
+        res["error"] = f"{type(e).__name__}: {str(e).strip()}"
+        return res
+    res.update(
+        {
+            "repeat": repeat,
+            "number": number,
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        }
+    )
+    return res
+
+
+def run_benchmarks(
+    profile: str, name_filter: Optional[str], repeat: int
+) -> Dict[str, Any]:
+    results = list()
+    with tempfile.TemporaryDirectory(prefix="benchmarks_") as work_dir:
+        from utils.s3 import s3_df_cache
+
+        s3_df_cache.disk_dir = os.path.join(work_dir, "s3_cache")
+        s3_df_cache.clear()
+        with fake_s3(root_dir=os.path.join(work_dir, "s3"), bucket=S3_BUCKET):
+            for bench in get_benchmarks(profile=profile, work_dir=work_dir):
+                if name_filter and not (
+                    name_filter in bench.id or name_filter in bench.tags
+                ):
+                    continue
+                res = time_benchmark(bench=bench, repeat=repeat)
+                if "error" in res:
+                    error = res["error"].splitlines()[0]
+                    print(f"{res['id']:<70} ERROR {error}", flush=True)
+                else:
+                    print(f"{res['id']:<70} {res['median'] * 1e3:12.3f} ms", flush=True)
+                results.append(res)
+    return {"environment": get_environment(), "profile": profile, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks of the pipeline stages")
+    parser.add_argument("--profile", default="quick", choices=["quick", "full"])
+    parser.add_argument(
+        "--filter", default=None, help="Substring of benchmark ids or a tag"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Result JSON path, benchmarks/results/<commit>_<profile>.json by default",
+    )
+    args = parser.parse_args()
+
+    # execute_and_log would flood the output and the timings with INFO records
+    get_app_logger().setLevel(logging.WARNING)
+    res = run_benchmarks(
+        profile=args.profile, name_filter=args.filter, repeat=args.repeat
+    )
+    output = args.output
+    if output is None:
+        commit = (res["environment"]["commit"] or "nocommit")[:12]
+        if res["environment"]["dirty"]:
+            commit = commit + "-dirty"
+        output = os.path.join(RESULTS_DIR, f"{commit}_{args.profile}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(res, f, indent=2)
+    print(f"Saved {len(res['results'])} results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,116 @@
-OHLC_REQUIRED_COLUMNS = {"Volume", "Close", "High", "Low", "Open"}
-RSI_PERIOD = 14
-S3_BUCKET = "sys-trading"
-S3_FOLDER_DAILY_DATA = "daily_tickers_data_csv/"
-S3_FOLDER_RSI = "daily_OHLC_with_RSI/"
+OHLC_REQUIRED_COLUMNS = {"Volume", "Close", "High", "Low", "Open"}
+# float32 halves the memory of the prices, at about 7 significant digits
+OHLC_PRICE_DTYPE = "float64"
+RSI_PERIOD = 14
+S3_BUCKET = "sys-trading"
+S3_FOLDER_DAILY_DATA = "daily_tickers_data_csv/"
+S3_FOLDER_RSI = "daily_OHLC_with_RSI/"
+PIPELINE_IO_WORKERS = 32
+PIPELINE_CPU_WORKERS = 4
+YF_INCREMENTAL_OVERLAP_DAYS = 7
+YF_BATCH_SIZE = 100
+# csv, parquet or arrow (Arrow IPC). Compression is used by parquet and arrow only.
+S3_STORAGE_FORMAT = "csv"
+S3_STORAGE_COMPRESSION = "zstd"
+S3_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Local disk tier of the S3 read cache, None to disable it
+S3_CACHE_DIR = ".s3_cache"
+# append: write only new rows as segment objects, full: rewrite whole history
+S3_WRITE_MODE = "append"
+S3_SEGMENT_COMPACTION_THRESHOLD = 20
+# One prefix per ticker with column group objects: daily_dataset/GLD/bars.csv, ...
+S3_FOLDER_DATASET = "daily_dataset/"
+# Chart rendering processes kept alive between tickers and runs
+CHART_RENDER_WORKERS = 2
+CHART_WINDOW_DAYS = 90
+# Render keys of the saved charts, a chart is rendered again only if its key changes
+CHART_RENDER_CACHE_DIR = ".chart_cache"
+# Where the served charts are kept: local files in CHART_LOCAL_DIR or s3 objects
+CHART_STORAGE = "local"
+CHART_LOCAL_DIR = "."
+S3_FOLDER_CHARTS = "charts/"
+CHART_CACHE_MAX_BYTES = 128 * 1024 * 1024
+# Cached charts are revalidated against the storage after this many seconds
+CHART_CACHE_TTL_SECONDS = 60
+# Ticker arrays served by the chart data API are reloaded after this many seconds
+ARRAY_STORE_TTL_SECONDS = 60
+ARRAY_STORE_MAX_TICKERS = 2000
+# The bars API keeps all columns of fewer tickers
+BARS_STORE_MAX_TICKERS = 200
+# Rows per Arrow record batch or NDJSON chunk of the streamed bars
+BARS_STREAM_CHUNK_ROWS = 5000
+CHART_DATA_DEFAULT_POINTS = 1000
+CHART_DATA_MAX_POINTS = 10000
+# queue: log records are formatted and written by a listener thread, sync: by the caller
+LOG_MODE = "queue"
+LOG_QUEUE_MAX_SIZE = 10000
+# What to do with a record when the queue is full: drop_new, drop_oldest or block
+LOG_QUEUE_OVERFLOW = "drop_new"
+LOG_QUEUE_BLOCK_SECONDS = 1.0
+# Share of DEBUG records that are logged, 1.0 logs all of them
+LOG_DEBUG_SAMPLE_RATE = 1.0
+# S3 client: connections shared by all threads, adaptive retries with backoff
+S3_MAX_POOL_CONNECTIONS = 64
+S3_MAX_ATTEMPTS = 10
+S3_CONNECT_TIMEOUT_SECONDS = 5
+S3_READ_TIMEOUT_SECONDS = 60
+# Objects larger than this are uploaded in parts of S3_MULTIPART_CHUNK_SIZE
+S3_MULTIPART_THRESHOLD = 64 * 1024 * 1024
+S3_MULTIPART_CHUNK_SIZE = 16 * 1024 * 1024
+# Transfers at once in read_many / write_many, at most S3_MAX_POOL_CONNECTIONS
+S3_BULK_WORKERS = 32
+# Big folders are listed in parallel key ranges split at prefix + each of these
+S3_LIST_PARTITION_BOUNDARIES = list("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+# Alpha Vantage: requests per minute of the API key, 5 for a free key
+ALPHA_VANTAGE_REQUESTS_PER_MINUTE = 5
+ALPHA_VANTAGE_TIMEOUT_SECONDS = 30
+# outputsize=compact returns this many last bars, enough if fewer are missing
+ALPHA_VANTAGE_COMPACT_BARS = 100
+# Responses are cached on disk for this long, None dir to disable the cache
+ALPHA_VANTAGE_CACHE_DIR = ".alpha_vantage_cache"
+ALPHA_VANTAGE_CACHE_TTL_SECONDS = 6 * 3600
+# OHLC providers in order of preference, the next one is the failover and hedge
+OHLC_PROVIDERS = ["yahoo", "alpha_vantage"]
+PROVIDER_TIMEOUT_SECONDS = 30
+# A hedged request goes to the next provider when an incremental request is slower
+# than this quantile of the recent latencies of its provider, never before
+# PROVIDER_LATENCY_MIN_SAMPLES latencies are known
+PROVIDER_HEDGE_QUANTILE = 0.95
+PROVIDER_LATENCY_WINDOW = 200
+PROVIDER_LATENCY_MIN_SAMPLES = 20
+# Circuit breaker: a provider is skipped for the reset time after this many failures in a row
+PROVIDER_BREAKER_FAILURES = 5
+PROVIDER_BREAKER_RESET_SECONDS = 60
+# Relative Close difference above which bars of two providers are reported as a mismatch
+PROVIDER_RECONCILE_TOLERANCE = 0.01
+# Tickers of the daily update: static (UNIVERSE_TICKERS), file (one per line) or s3 (dataset folder)
+UNIVERSE_SOURCE = "static"
+UNIVERSE_TICKERS = ["GLD", "COPX"]
+UNIVERSE_FILE = "universe.txt"
+# The daily update is split into shards of this many tickers, taken by workers under leases
+UNIVERSE_SHARD_SIZE = 25
+# Where the leases are kept: s3 (conditional writes) or local files for one node
+LEASE_STORE = "s3"
+LEASE_LOCAL_DIR = ".leases"
+S3_FOLDER_LEASES = "leases/"
+# A lease not renewed for this long is taken over by another worker
+LEASE_TTL_SECONDS = 300
+# How often a worker checks for expired leases once no shard is free
+LEASE_POLL_SECONDS = 30
+# Unscheduled full-day NYSE closures, not covered by the holiday rules
+TRADING_CALENDAR_EXTRA_CLOSURES = [
+    "2012-10-29",
+    "2012-10-30",
+    "2018-12-05",
+    "2025-01-09",
+]
+# Per-ticker last bar, row count, content hash and last derived date, see utils.s3.freshness
+S3_FRESHNESS_MANIFEST_KEY = "manifests/freshness.json"
+# Attempts of a manifest update that other workers keep overtaking
+FRESHNESS_MANIFEST_MAX_ATTEMPTS = 20
+# Bars of these intervals and their RSI are resampled from the stored daily bars
+RESAMPLED_INTERVALS = ["1wk", "1mo"]
+# Intraday bars downloaded and stored next to the daily ones, e.g. ["1h"], none by default
+INTRADAY_INTERVALS = []  # type: ignore
+# Intraday bars older than this are dropped from the storage
+INTRADAY_RETENTION_DAYS = 180
@@ -1,6 +1,5 @@
 import logging
 from contextlib import asynccontextmanager
-from logging.config import dictConfig
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -8,16 +7,16 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 
 from constants import S3_BUCKET, S3_FOLDER_DAILY_DATA
-from utils.e2e import update_ohlc_rsi_chart
-from utils.e2e.jobs import update_ohlc_rsi_charts_for_tickers
-from utils.logging import log_config
+from routers import charts, jobs, metrics, tickers
+from utils.e2e import shutdown_pipeline_executors, update_job_queue
+from utils.e2e.jobs import compact_s3_segments, update_ohlc_rsi_charts_for_tickers
+from utils.logging import configure_logging, stop_queue_logging
+from utils.s3 import shutdown_s3_executor
 
-dictConfig(log_config)
+configure_logging()
 app_logger = logging.getLogger("app")
 load_dotenv(".env")
 
-app = FastAPI()
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # type: ignore
@@ -33,18 +32,32 @@ async def lifespan(app: FastAPI):  # type: ignore
         second="0",
     )
     scheduler.add_job(update_ohlc_rsi_charts_for_tickers, trigger)
+    # Saturday at 06:00, when no daily bars are appended
+    compaction_trigger = CronTrigger(day_of_week="sat", hour="6", minute="0")
+    scheduler.add_job(compact_s3_segments, compaction_trigger)
     scheduler.start()
     yield
     scheduler.shutdown()
+    shutdown_pipeline_executors()
+    shutdown_s3_executor()
+    stop_queue_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(jobs.router)
+app.include_router(charts.router)
+app.include_router(tickers.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
 async def root() -> dict:
     ticker = "GLD"
-    update_ohlc_rsi_chart(ticker=ticker)
+    job_ids = update_job_queue.submit(tickers=[ticker])
 
     return {
         "message": f"Hello World RSI, {ticker=}",
+        "job_id": job_ids[ticker],
         "S3_BUCKET": S3_BUCKET,
         "S3_FOLDER_DAILY_DATA": S3_FOLDER_DAILY_DATA,
     }
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import date
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from constants import CHART_DATA_DEFAULT_POINTS, CHART_DATA_MAX_POINTS
+from utils.chart_data import get_chart_data
+from utils.draw_charts import (
+    StoredChart,
+    chart_cache,
+    get_chart,
+    get_chart_renderer,
+)
+
+router = APIRouter(prefix="/charts", tags=["charts"])
+
+
+def _is_not_modified(request: Request, chart: StoredChart) -> bool:
+    """If-None-Match wins over If-Modified-Since, as in RFC 9110"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        return "*" in etags or chart.etag in etags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return chart.last_modified <= since
+
+
+@router.get("/{ticker}")
+async def get_ticker_chart(
+    ticker: str,
+    request: Request,
+    format: Literal["png", "svg", "html"] = "png",
+) -> Response:
+    """
+    The latest OHLC + RSI chart of the ticker as png, svg or interactive html.
+    Answers 304 Not Modified to conditional requests for an unchanged chart.
+    """
+    ticker = ticker.strip().upper()
+    chart: Optional[StoredChart] = chart_cache.get_fresh(ticker=ticker, fmt=format)
+    if chart is None:
+        # Storage reads and on-demand renders must not block the event loop
+        chart = await asyncio.to_thread(get_chart, ticker, format, get_chart_renderer())
+    if chart is None:
+        raise HTTPException(status_code=404, detail=f"No chart for {ticker=}")
+    headers = {
+        "ETag": chart.etag,
+        "Last-Modified": format_datetime(chart.last_modified, usegmt=True),
+        # Clients may keep the chart but must revalidate it every time
+        "Cache-Control": "no-cache",
+    }
+    if _is_not_modified(request=request, chart=chart):
+        return Response(status_code=304, headers=headers)
+    return Response(content=chart.body, media_type=chart.media_type, headers=headers)
+
+
+@router.get("/{ticker}/data")
+async def get_ticker_chart_data(
+    ticker: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    points: int = Query(CHART_DATA_DEFAULT_POINTS, ge=3, le=CHART_DATA_MAX_POINTS),
+) -> dict:
+    """
+    OHLC, Volume and RSI series of the ticker for client-side charts,
+    downsampled on the server to at most points candles and RSI values.
+    """
+    ticker = ticker.strip().upper()
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=422, detail=f"{start=} is after {end=}")
+    res = await asyncio.to_thread(get_chart_data, ticker, start, end, points)
+    if res is None:
+        raise HTTPException(status_code=404, detail=f"No bars for {ticker=}")
+    return res
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from utils.e2e import UpdateJob, update_job_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+class UpdateJobsRequest(BaseModel):
+    tickers: List[str]
+
+
+def _get_job_or_404(job_id: str) -> UpdateJob:
+    job = update_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post("", status_code=202)
+async def create_update_jobs(request: UpdateJobsRequest) -> dict:
+    """
+    Start OHLC, RSI and chart updates for tickers and return at once.
+    Tickers that already have an update in flight get the existing job.
+    """
+    tickers = [ticker.strip() for ticker in request.tickers if ticker.strip()]
+    if not tickers:
+        raise HTTPException(status_code=422, detail="tickers must not be empty")
+    return {"jobs": update_job_queue.submit(tickers=tickers)}
+
+
+@router.get("/{job_id}")
+async def get_update_job(job_id: str) -> dict:
+    return _get_job_or_404(job_id).to_dict()
+
+
+@router.get("/{job_id}/events")
+async def stream_update_job(job_id: str) -> StreamingResponse:
+    """
+    Server-sent events with the job status, one event per status change.
+    The stream ends when the job is finished.
+    """
+    job = _get_job_or_404(job_id)
+
+    async def _events() -> AsyncIterator[str]:
+        last_status = None
+        while True:
+            if job.status != last_status:
+                last_status = job.status
+                yield f"data: {json.dumps(job.to_dict(), default=str)}\n\n"
+            if job.finished:
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
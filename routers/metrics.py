@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics() -> Response:
+    """Prometheus metrics of the pipeline stages, S3 traffic and caches"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import date
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from utils.chart_data import (
+    iter_bars_arrow,
+    iter_bars_ndjson,
+    select_bar_columns,
+    ticker_bars_store,
+)
+
+router = APIRouter(prefix="/tickers", tags=["tickers"])
+
+_BARS_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+@router.get("/{ticker}/bars")
+async def get_ticker_bars(
+    ticker: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    columns: Optional[List[str]] = Query(None),
+    format: Literal["ndjson", "arrow"] = "ndjson",
+) -> StreamingResponse:
+    """
+    Daily bars and derived columns of the ticker between start and end,
+    both inclusive, streamed as JSON lines or an Arrow IPC stream.
+    columns may be repeated or comma-separated, all columns by default.
+    """
+    ticker = ticker.strip().upper()
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=422, detail=f"{start=} is after {end=}")
+    arrays = ticker_bars_store.get_fresh(ticker=ticker)
+    if arrays is None:
+        arrays = await asyncio.to_thread(ticker_bars_store.get, ticker)
+    if arrays is None:
+        raise HTTPException(status_code=404, detail=f"No bars for {ticker=}")
+    requested = None
+    if columns:
+        requested = [
+            col_name.strip()
+            for value in columns
+            for col_name in value.split(",")
+            if col_name.strip()
+        ]
+    try:
+        selected = select_bar_columns(arrays=arrays, columns=requested)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    i0, i1 = arrays.get_range(start=start, end=end)
+    if format == "arrow":
+        chunks = iter_bars_arrow(arrays=arrays, i0=i0, i1=i1, columns=selected)
+    else:
+        chunks = iter_bars_ndjson(arrays=arrays, i0=i0, i1=i1, columns=selected)
+    # The chunks are built from the arrays of this request, in a worker thread
+    return StreamingResponse(
+        chunks,
+        media_type=_BARS_MEDIA_TYPES[format],
+        headers={"X-Bars-Count": str(i1 - i0)},
+    )
@@ -0,0 +1,50 @@
+import os
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Fake credentials, so that no test can reach AWS
+os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+from constants import S3_BUCKET  # noqa: E402
+
+
+@pytest.fixture
+def s3_bucket() -> Iterator[str]:
+    """S3_BUCKET in a moto S3 stand-in, empty for every test"""
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        from utils.s3 import s3_client
+
+        s3_client.create_bucket(Bucket=S3_BUCKET)
+        yield S3_BUCKET
+
+
+def make_close(n_rows: int, seed: int = 0) -> pd.Series:
+    """Random walk of Close prices on business days"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2025-12-31", periods=n_rows)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+    return pd.Series(close, index=index, name="Close")
+
+
+def make_bars(
+    n_rows: int, seed: int = 0, index: Optional[pd.DatetimeIndex] = None
+) -> pd.DataFrame:
+    """Daily OHLCV bars around make_close, on the n_rows dates of index if given"""
+    close = make_close(n_rows=n_rows, seed=seed)
+    if index is not None:
+        close.index = index
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Volume": np.full(n_rows, 1000),
+        }
+    )
@@ -0,0 +1,48 @@
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_close
+
+import utils.chart_data.arrays as arrays_module
+from utils.chart_data import TickerArrayStore, ticker_arrays_from_df
+
+
+def test_get_range_with_dates() -> None:
+    close = make_close(n_rows=30)
+    arrays = ticker_arrays_from_df(ticker="AAA", df=close.to_frame(), columns=None)
+    start, end = close.index[5], close.index[9]
+    assert arrays.get_range(start=start.date(), end=end.date()) == (5, 10)
+    assert arrays.get_range(start=start, end=end) == (5, 10)
+    assert arrays.get_range(start=date(1990, 1, 1)) == (0, 30)
+    assert arrays.get_range(start=date(2100, 1, 1)) == (30, 30)
+    assert arrays.get_range(start=end.date(), end=start.date()) == (9, 9)
+
+
+def test_load_locks_are_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    close = make_close(n_rows=30)
+    loads = list()
+    started = threading.Event()
+
+    def _read_ticker_dataset(ticker: str, columns: list) -> pd.DataFrame:
+        loads.append(ticker)
+        started.wait(timeout=5)
+        return close.to_frame() if ticker == "AAA" else pd.DataFrame()
+
+    monkeypatch.setattr(arrays_module, "read_ticker_dataset", _read_ticker_dataset)
+    store = TickerArrayStore(columns=None)
+    threads = [threading.Thread(target=store.get, args=("AAA",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+    assert loads == ["AAA"]
+    for i in range(100):
+        assert store.get(ticker=f"UNKNOWN{i}") is None
+    assert store._load_locks == {}
+    entry = store.get(ticker="AAA")
+    assert entry is not None
+    np.testing.assert_array_equal(entry.columns["Close"], close.to_numpy())
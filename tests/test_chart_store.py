@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import List, Optional
+
+import pandas as pd
+import pytest
+
+import utils.draw_charts.misc as chart_misc
+import utils.draw_charts.render_cache as render_cache
+import utils.draw_charts.store as store
+from utils.draw_charts import chart_cache, get_chart, load_chart_render_key, save_chart
+
+
+@pytest.fixture(autouse=True)
+def _clear_chart_cache() -> None:
+    chart_cache.clear()
+    render_cache._render_keys.clear()
+
+
+def test_render_key_from_s3_metadata(
+    s3_bucket: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(store, "CHART_STORAGE", "s3")
+    assert load_chart_render_key(ticker="AAA", fmt="png") is None
+    save_chart(ticker="AAA", fmt="png", body=b"png bytes", render_key="key1")
+    chart_cache.clear()
+
+    def _get_object(**kwargs) -> None:
+        raise AssertionError("the chart body must not be read")
+
+    monkeypatch.setattr(store.s3_client, "get_object", _get_object)
+    assert load_chart_render_key(ticker="AAA", fmt="png") == "key1"
+    assert load_chart_render_key(ticker="AAA", fmt="svg") is None
+
+
+def test_render_key_from_local_file(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(store, "CHART_STORAGE", "local")
+    monkeypatch.setattr(store, "CHART_LOCAL_DIR", str(tmp_path / "charts"))
+    monkeypatch.setattr(
+        render_cache, "CHART_RENDER_CACHE_DIR", str(tmp_path / "render_keys")
+    )
+    assert load_chart_render_key(ticker="AAA", fmt="png") is None
+    save_chart(ticker="AAA", fmt="png", body=b"png bytes", render_key="key1")
+    chart_cache.clear()
+    render_cache._render_keys.clear()
+    assert load_chart_render_key(ticker="AAA", fmt="png") == "key1"
+
+
+def test_render_locks_are_released(monkeypatch: pytest.MonkeyPatch) -> None:
+    running: List[int] = [0, 0]  # now, max
+    running_lock = threading.Lock()
+
+    def _read_ticker_dataset(
+        ticker: str, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        with running_lock:
+            running[0] = running[0] + 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with running_lock:
+            running[0] = running[0] - 1
+        # An unknown ticker
+        return None
+
+    monkeypatch.setattr(chart_misc, "load_chart", lambda ticker, fmt: None)
+    monkeypatch.setattr(chart_misc, "read_ticker_dataset", _read_ticker_dataset)
+    threads = [
+        threading.Thread(target=get_chart, kwargs={"ticker": "NOPE", "fmt": "png"})
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert running[1] == 1
+    assert chart_misc._render_locks == {}
@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pytest
+from conftest import make_close
+
+import utils.e2e.job_queue as job_queue
+import utils.e2e.jobs as jobs
+import utils.e2e.pipeline as pipeline
+from utils.s3 import FreshnessEntry, make_freshness_entry, read_freshness_manifest
+
+TICKERS = ["AAA", "BBB", "CCC"]
+
+
+def _make_entry(seed: int) -> FreshnessEntry:
+    close = make_close(n_rows=50, seed=seed).to_frame("Close")
+    return make_freshness_entry(bars_df=close, last_derived_date=close.index[-1].date())
+
+
+def test_save_freshness_entries(s3_bucket: str) -> None:
+    entries = {ticker: _make_entry(seed=i) for i, ticker in enumerate(TICKERS)}
+    pipeline.save_freshness_entries(entries=entries)
+    assert read_freshness_manifest() == entries
+
+
+def test_save_freshness_entries_logs_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _fail(entries: Dict[str, FreshnessEntry]) -> None:
+        raise RuntimeError("manifest not written")
+
+    monkeypatch.setattr(pipeline, "update_freshness_manifest", _fail)
+    pipeline.save_freshness_entries(entries={"AAA": _make_entry(seed=0)})
+
+
+def test_shard_writes_manifest_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    writes: List[Dict[str, FreshnessEntry]] = list()
+
+    def _update_freshness_manifest(entries: Dict[str, FreshnessEntry]) -> None:
+        writes.append(entries)
+
+    def _run_ticker_pipeline(
+        ticker: str, cpu_executor: Executor, new_data: Optional[pd.DataFrame]
+    ) -> FreshnessEntry:
+        if ticker == "CCC":
+            raise ValueError("no bars")
+        return _make_entry(seed=TICKERS.index(ticker))
+
+    io_executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(
+        job_queue, "get_pipeline_executors", lambda: (io_executor, None)
+    )
+    monkeypatch.setattr(job_queue, "run_ticker_pipeline", _run_ticker_pipeline)
+    monkeypatch.setattr(
+        pipeline, "update_freshness_manifest", _update_freshness_manifest
+    )
+    monkeypatch.setattr(jobs, "update_job_queue", job_queue.UpdateJobQueue())
+    try:
+        failed = asyncio.run(jobs._update_tickers(tickers=TICKERS, manifest=dict()))
+    finally:
+        io_executor.shutdown()
+
+    assert failed == {"CCC": "no bars"}
+    assert len(writes) == 1 and sorted(writes[0]) == ["AAA", "BBB"]
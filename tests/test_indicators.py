@@ -0,0 +1,55 @@
+import pandas as pd
+from conftest import make_bars
+
+from utils.derived_columns import (
+    INDICATORS,
+    INDICATORS_GROUP,
+    Node,
+    calculate_indicators,
+    save_indicators_for_ticker,
+)
+from utils.s3 import read_dataset_group, read_dataset_state
+
+
+def test_save_indicators_appends_from_state(s3_bucket: str) -> None:
+    bars = make_bars(n_rows=400)
+    save_indicators_for_ticker(
+        ticker="AAA", indicators_df=calculate_indicators(bars_df=bars.iloc[:300])
+    )
+    state = read_dataset_state(ticker="AAA", name=INDICATORS_GROUP)
+    assert state == {
+        "last_date": bars.index[299].date().isoformat(),
+        "columns": list(INDICATORS),
+    }
+    expected = calculate_indicators(bars_df=bars)
+    save_indicators_for_ticker(ticker="AAA", indicators_df=expected)
+    stored = read_dataset_group(ticker="AAA", group=INDICATORS_GROUP)
+    assert stored is not None
+    pd.testing.assert_frame_equal(
+        stored, expected, check_freq=False, check_dtype=False, rtol=1e-9
+    )
+
+
+def test_save_indicators_rewrites_on_new_columns(s3_bucket: str) -> None:
+    bars = make_bars(n_rows=300)
+    indicators_df = calculate_indicators(bars_df=bars)
+    save_indicators_for_ticker(ticker="AAA", indicators_df=indicators_df)
+    with_new = indicators_df.assign(NEW=1.0)
+    save_indicators_for_ticker(ticker="AAA", indicators_df=with_new)
+    stored = read_dataset_group(ticker="AAA", group=INDICATORS_GROUP)
+    assert stored is not None
+    assert list(stored.columns) == list(with_new.columns)
+    assert len(stored) == len(with_new)
+
+
+def test_calculate_indicators_with_explicit_nodes() -> None:
+    bars = make_bars(n_rows=50)
+    indicators = {"SMA_3": Node("rolling_mean", (Node("column", ("Close",)), 3))}
+    res = calculate_indicators(bars_df=bars, indicators=indicators)
+    assert list(res.columns) == ["SMA_3"]
+    pd.testing.assert_series_equal(
+        res["SMA_3"],
+        bars["Close"].rolling(3).mean(),
+        check_names=False,
+        check_freq=False,
+    )
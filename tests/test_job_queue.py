@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+import pytest
+from conftest import make_close
+
+import utils.e2e.job_queue as job_queue
+import utils.e2e.jobs as jobs
+from utils.s3 import FreshnessEntry, make_freshness_entry
+
+ENTRY = make_freshness_entry(
+    bars_df=make_close(n_rows=50).to_frame(), last_derived_date=None
+)
+
+
+@pytest.fixture
+def saved(monkeypatch: pytest.MonkeyPatch) -> Iterator[List[Dict[str, FreshnessEntry]]]:
+    """Entries written by the jobs, their pipelines run in a thread pool"""
+    res: List[Dict[str, FreshnessEntry]] = list()
+    io_executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(
+        job_queue, "get_pipeline_executors", lambda: (io_executor, None)
+    )
+    monkeypatch.setattr(job_queue, "save_freshness_entries", res.append)
+    yield res
+    io_executor.shutdown()
+
+
+def _pipeline(
+    release: Optional[threading.Event] = None,
+) -> Callable[[str, Executor, Optional[pd.DataFrame]], FreshnessEntry]:
+    def _run_ticker_pipeline(
+        ticker: str, cpu_executor: Executor, new_data: Optional[pd.DataFrame]
+    ) -> FreshnessEntry:
+        if release is not None:
+            release.wait(5)
+        return ENTRY
+
+    return _run_ticker_pipeline
+
+
+def test_joined_job_leaves_the_entry_to_the_shard(
+    saved: List[Dict[str, FreshnessEntry]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    release = threading.Event()
+    monkeypatch.setattr(job_queue, "run_ticker_pipeline", _pipeline(release))
+    queue = job_queue.UpdateJobQueue()
+
+    async def _run() -> None:
+        api_ids = queue.submit(tickers=["AAA"])
+        shard_ids = queue.submit(tickers=["AAA", "BBB"], save_freshness=False)
+        assert shard_ids["AAA"] == api_ids["AAA"]
+        release.set()
+        await queue.wait(job_ids=list(shard_ids.values()), poll_interval=0.01)
+
+    asyncio.run(_run())
+    assert saved == []
+
+
+def test_waited_jobs_are_not_forgotten(
+    saved: List[Dict[str, FreshnessEntry]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(job_queue, "run_ticker_pipeline", _pipeline())
+    queue = job_queue.UpdateJobQueue(max_finished_jobs=0)
+
+    async def _run() -> None:
+        job_ids = queue.submit(tickers=["AAA"])
+        waiting = asyncio.create_task(
+            queue.wait(job_ids=list(job_ids.values()), poll_interval=0.2)
+        )
+        job = queue.get(job_ids["AAA"])
+        while job is not None and not job.finished:
+            await asyncio.sleep(0.01)
+        # Forgets the finished jobs beyond max_finished_jobs
+        queue.submit(tickers=["BBB"])
+        assert queue.get(job_ids["AAA"]) is not None
+        await waiting
+        assert queue.get(job_ids["AAA"]) is not None
+        queue.submit(tickers=["CCC"])
+        assert queue.get(job_ids["AAA"]) is None
+
+    asyncio.run(_run())
+
+
+def test_missing_job_is_reported_as_failed(
+    saved: List[Dict[str, FreshnessEntry]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(job_queue, "run_ticker_pipeline", _pipeline())
+    queue = job_queue.UpdateJobQueue()
+    monkeypatch.setattr(queue, "get", lambda job_id: None)
+    monkeypatch.setattr(jobs, "update_job_queue", queue)
+    monkeypatch.setattr(jobs, "save_freshness_entries", lambda entries: None)
+
+    failed = asyncio.run(jobs._update_tickers(tickers=["AAA"], manifest=dict()))
+
+    assert list(failed) == ["AAA"]
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+import utils.e2e.jobs as jobs
+import utils.e2e.universe as universe
+from utils.e2e.leases import (
+    LEASE_STATUS_DONE,
+    LocalJsonStore,
+    complete_lease,
+    read_lease,
+    renew_lease,
+    try_acquire_lease,
+)
+from utils.e2e.universe import get_shard_lease_name
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> LocalJsonStore:
+    return LocalJsonStore(root_dir=str(tmp_path))
+
+
+def test_lease_is_exclusive_until_done(store: LocalJsonStore) -> None:
+    lease = try_acquire_lease(store=store, name="runs/r/0", ttl_seconds=60, owner="a")
+    assert lease is not None
+    assert try_acquire_lease(store=store, name="runs/r/0", ttl_seconds=60) is None
+
+    assert renew_lease(store=store, lease=lease, ttl_seconds=120)
+    assert complete_lease(store=store, lease=lease, result={"failed": {}})
+    stored = read_lease(store=store, name="runs/r/0")
+    assert stored is not None and stored.status == LEASE_STATUS_DONE
+    assert stored.owner == "a" and stored.result == {"failed": {}}
+    assert try_acquire_lease(store=store, name="runs/r/0", ttl_seconds=60) is None
+
+
+def test_expired_lease_is_taken_over(store: LocalJsonStore) -> None:
+    # The holder crashed and did not renew the lease
+    crashed = try_acquire_lease(
+        store=store, name="runs/r/0", ttl_seconds=0.05, owner="crashed"
+    )
+    assert crashed is not None
+    time.sleep(0.1)
+
+    lease = try_acquire_lease(store=store, name="runs/r/0", ttl_seconds=60, owner="b")
+    assert lease is not None and lease.owner == "b"
+    # The old holder comes back and finds out that it lost the lease
+    assert not renew_lease(store=store, lease=crashed, ttl_seconds=60)
+    assert not complete_lease(store=store, lease=crashed, result={})
+    assert complete_lease(store=store, lease=lease, result={})
+
+
+def test_compaction_lease_is_renewed_and_completed_on_error(
+    store: LocalJsonStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    expires_at: List[float] = list()
+
+    def _compact(folder: str) -> List[str]:
+        lease = read_lease(store=store, name=name)
+        assert lease is not None
+        expires_at.append(lease.expires_at)
+        time.sleep(0.5)
+        lease = read_lease(store=store, name=name)
+        assert lease is not None
+        expires_at.append(lease.expires_at)
+        raise ConnectionError("S3 is down")
+
+    monkeypatch.setattr(jobs, "LEASE_TTL_SECONDS", 0.3)
+    monkeypatch.setattr(jobs, "get_lease_store", lambda: store)
+    monkeypatch.setattr(jobs, "compact_segments_in_s3_folder", _compact)
+    name = f"runs/{datetime.now(timezone.utc).date().isoformat()}/compaction"
+
+    with pytest.raises(ConnectionError):
+        jobs.compact_s3_segments()
+
+    assert expires_at[1] > expires_at[0]
+    lease = read_lease(store=store, name=name)
+    assert lease is not None and lease.status == LEASE_STATUS_DONE
+    assert lease.result == {"failed": "S3 is down"}
+
+
+class WarningRecorder:
+    def __init__(self) -> None:
+        self.warnings: List[str] = list()
+
+    def warning(self, msg: str) -> None:
+        self.warnings.append(msg)
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def error(self, msg: str) -> None:
+        pass
+
+
+def test_lost_shard_lease_is_not_completed(
+    store: LocalJsonStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    name = get_shard_lease_name(run_id="r", shard_index=0)
+
+    async def _update_tickers(tickers: List[str], manifest: Dict) -> Dict[str, str]:
+        # Blocks the event loop, the lease expires and another worker takes it
+        time.sleep(0.1)
+        lease = try_acquire_lease(store=store, name=name, ttl_seconds=60, owner="b")
+        assert lease is not None
+        complete_lease(store=store, lease=lease, result={"failed": {}})
+        return dict()
+
+    recorder = WarningRecorder()
+    monkeypatch.setattr(jobs, "LEASE_TTL_SECONDS", 0.05)
+    monkeypatch.setattr(universe, "LEASE_TTL_SECONDS", 0.05)
+    monkeypatch.setattr(jobs, "get_app_logger", lambda: recorder)
+    monkeypatch.setattr(jobs, "get_lease_store", lambda: store)
+    monkeypatch.setattr(jobs, "read_freshness_manifest", dict)
+    monkeypatch.setattr(jobs, "load_universe", lambda: ["AAA"])
+    monkeypatch.setattr(jobs, "_update_tickers", _update_tickers)
+
+    async def _run() -> None:
+        await jobs.update_ohlc_rsi_charts_for_tickers(run_id="r")
+        # The lease renewal task is finished, not left pending
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(_run())
+
+    lease = read_lease(store=store, name=name)
+    assert lease is not None and lease.owner == "b"
+    assert any("lease lost" in msg for msg in recorder.warnings)
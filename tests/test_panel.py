@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_close
+
+from utils.derived_columns import calculate_rsi_with_state, panel_rsi, panel_rsi_df
+
+PERIODS = [2, 6, 14, 28]
+
+
+def _make_closes_with_gaps(n_rows: int = 2_000, n_tickers: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    closes = pd.DataFrame(
+        {f"T{i}": make_close(n_rows=n_rows, seed=i) for i in range(n_tickers)}
+    )
+    values = closes.to_numpy()
+    # Scattered missing days, a late listing and an early delisting
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[:300, 1] = np.nan
+    values[-500:, 2] = np.nan
+    return pd.DataFrame(values, index=closes.index, columns=closes.columns)
+
+
+@pytest.mark.parametrize("ma_type", ["simple", "exponential"])
+def test_panel_rsi_equals_per_ticker_rsi(ma_type: str) -> None:
+    closes = _make_closes_with_gaps()
+    res = panel_rsi_df(closes_df=closes, periods=PERIODS, ma_type=ma_type)
+    for period in PERIODS:
+        for ticker in closes.columns:
+            close = closes[ticker].dropna()
+            expected, _ = calculate_rsi_with_state(
+                close=close, period=period, ma_type=ma_type
+            )
+            got = res[period][ticker]
+            # NaN on the days the ticker did not trade
+            assert got[closes[ticker].isnull()].isnull().all()
+            pd.testing.assert_series_equal(
+                got[close.index], expected, check_names=False, rtol=0, atol=1e-8
+            )
+
+
+@pytest.mark.parametrize("ma_type", ["simple", "exponential"])
+def test_panel_rsi_float32_out(ma_type: str) -> None:
+    closes = _make_closes_with_gaps(n_rows=500).to_numpy()
+    expected = panel_rsi(closes=closes, periods=PERIODS, ma_type=ma_type)
+    out = np.empty((len(PERIODS),) + closes.shape, dtype=np.float32)
+    res = panel_rsi(
+        closes=closes, periods=PERIODS, ma_type=ma_type, dtype=np.float32, out=out
+    )
+    assert res is out
+    np.testing.assert_allclose(out, expected, rtol=1e-5, atol=1e-3)
+
+
+def test_panel_rsi_rejects_wrong_out_shape() -> None:
+    closes = make_close(n_rows=50).to_numpy()[:, np.newaxis]
+    with pytest.raises(ValueError):
+        panel_rsi(closes=closes, periods=PERIODS, out=np.empty((1, 50, 1)))
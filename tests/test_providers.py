@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import date
+from typing import Iterator, List, Optional
+
+import pandas as pd
+import pytest
+from conftest import make_bars
+
+from constants import PROVIDER_BREAKER_FAILURES, PROVIDER_LATENCY_MIN_SAMPLES
+from utils.import_data import OHLC_PROVIDER_REGISTRY, fetch_ohlc, register_ohlc_provider
+
+# Finished bars up to yesterday
+BARS_INDEX = pd.bdate_range(end=pd.Timestamp("today").normalize(), periods=31)[:-1]
+BARS = make_bars(n_rows=30, seed=0, index=BARS_INDEX)
+BACKUP_BARS = make_bars(n_rows=30, seed=1, index=BARS_INDEX)
+
+
+class FakeFetcher:
+    """Counts the calls, sleeps then returns bars or raises"""
+
+    def __init__(
+        self, bars: Optional[pd.DataFrame], sleep_seconds: float = 0.0
+    ) -> None:
+        self.bars = bars
+        self.sleep_seconds = sleep_seconds
+        self.calls: List[str] = list()
+
+    def __call__(self, ticker: str, last_date: Optional[date]) -> pd.DataFrame:
+        self.calls.append(ticker)
+        time.sleep(self.sleep_seconds)
+        if self.bars is None:
+            raise ConnectionError("fake provider is down")
+        return self.bars
+
+
+@pytest.fixture
+def fake_providers() -> Iterator[List[str]]:
+    names: List[str] = list()
+    yield names
+    for name in names:
+        OHLC_PROVIDER_REGISTRY.pop(name).shutdown_executor()
+
+
+def _warm_up(name: str, seconds: float) -> None:
+    for _ in range(PROVIDER_LATENCY_MIN_SAMPLES):
+        OHLC_PROVIDER_REGISTRY[name].latency.record(seconds)
+
+
+def test_failover_to_next_provider(fake_providers: List[str]) -> None:
+    down, backup = FakeFetcher(bars=None), FakeFetcher(bars=BACKUP_BARS)
+    fake_providers.append(register_ohlc_provider("fake_down", down).name)
+    fake_providers.append(register_ohlc_provider("fake_backup", backup).name)
+
+    res = fetch_ohlc(ticker="AAA", providers=fake_providers)
+
+    assert res["Close"].equals(BACKUP_BARS["Close"])
+    assert down.calls == ["AAA"] and backup.calls == ["AAA"]
+
+
+def test_every_provider_failed(fake_providers: List[str]) -> None:
+    fake_providers.append(
+        register_ohlc_provider("fake_down", FakeFetcher(bars=None)).name
+    )
+    with pytest.raises(RuntimeError):
+        fetch_ohlc(ticker="AAA", providers=fake_providers)
+
+
+def test_slow_incremental_request_is_hedged(fake_providers: List[str]) -> None:
+    slow, backup = FakeFetcher(BARS, sleep_seconds=1.0), FakeFetcher(BACKUP_BARS)
+    fake_providers.append(register_ohlc_provider("fake_slow", slow).name)
+    fake_providers.append(register_ohlc_provider("fake_backup", backup).name)
+    _warm_up("fake_slow", seconds=0.05)
+
+    start = time.monotonic()
+    res = fetch_ohlc(
+        ticker="AAA", last_date=BARS.index[-5].date(), providers=fake_providers
+    )
+
+    assert time.monotonic() - start < 0.9
+    assert res["Close"].equals(BACKUP_BARS["Close"])
+
+
+@pytest.mark.parametrize("hedge_case", ["full_history", "cold", "unavailable"])
+def test_no_hedge(fake_providers: List[str], hedge_case: str) -> None:
+    slow, backup = FakeFetcher(BARS, sleep_seconds=0.3), FakeFetcher(BACKUP_BARS)
+    fake_providers.append(register_ohlc_provider("fake_slow", slow).name)
+    register_ohlc_provider(
+        "fake_backup", backup, is_available=lambda: hedge_case != "unavailable"
+    )
+    fake_providers.append("fake_backup")
+    if hedge_case == "cold":
+        assert OHLC_PROVIDER_REGISTRY["fake_slow"].get_hedge_delay() is None
+    else:
+        _warm_up("fake_slow", seconds=0.05)
+    last_date = None if hedge_case == "full_history" else BARS.index[-5].date()
+
+    res = fetch_ohlc(ticker="AAA", last_date=last_date, providers=fake_providers)
+
+    assert res["Close"].equals(BARS["Close"])
+    assert backup.calls == []
+
+
+def test_breaker_skips_failing_provider(fake_providers: List[str]) -> None:
+    down, backup = FakeFetcher(bars=None), FakeFetcher(bars=BACKUP_BARS)
+    fake_providers.append(register_ohlc_provider("fake_down", down).name)
+    fake_providers.append(register_ohlc_provider("fake_backup", backup).name)
+
+    for _ in range(PROVIDER_BREAKER_FAILURES + 3):
+        fetch_ohlc(ticker="AAA", providers=fake_providers)
+
+    assert len(down.calls) == PROVIDER_BREAKER_FAILURES
+    assert OHLC_PROVIDER_REGISTRY["fake_down"].breaker.is_open
+
+
+def test_queue_time_does_not_trip_breaker(fake_providers: List[str]) -> None:
+    busy, backup = FakeFetcher(bars=BARS), FakeFetcher(bars=BACKUP_BARS)
+    fake_providers.append(
+        register_ohlc_provider(
+            "fake_busy", busy, timeout_seconds=0.2, max_workers=1
+        ).name
+    )
+    fake_providers.append(register_ohlc_provider("fake_backup", backup).name)
+    release = threading.Event()
+    # Holds the only thread of the provider
+    OHLC_PROVIDER_REGISTRY["fake_busy"].get_executor().submit(release.wait, 5)
+    try:
+        res = fetch_ohlc(ticker="AAA", providers=fake_providers)
+    finally:
+        release.set()
+
+    assert res["Close"].equals(BACKUP_BARS["Close"])
+    assert busy.calls == []
+    assert OHLC_PROVIDER_REGISTRY["fake_busy"].breaker._failures == 0
@@ -0,0 +1,41 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from utils.import_data.rate_limit import SlidingWindowLimiter
+
+
+def test_never_more_than_max_calls_per_period() -> None:
+    limiter = SlidingWindowLimiter(max_calls=3, period=0.3)
+    starts: List[float] = list()
+    starts_lock = threading.Lock()
+
+    def _call() -> None:
+        for _ in range(3):
+            limiter.acquire()
+            with starts_lock:
+                starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=_call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    starts.sort()
+    assert len(starts) == 9
+    # Any 4 consecutive calls span at least a whole period
+    for i in range(len(starts) - 3):
+        assert starts[i + 3] - starts[i] >= 0.3 - 0.01
+
+
+def test_burst_up_to_max_calls_does_not_wait() -> None:
+    limiter = SlidingWindowLimiter(max_calls=5, period=60.0)
+    assert sum(limiter.acquire() for _ in range(5)) == 0.0
+
+
+def test_invalid_limits() -> None:
+    with pytest.raises(ValueError):
+        SlidingWindowLimiter(max_calls=0, period=60.0)
@@ -0,0 +1,110 @@
+import copy
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, List
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_close
+
+from constants import RSI_PERIOD
+from utils.derived_columns import (
+    RsiState,
+    add_fresh_rsi_values,
+    add_rsi_column,
+    calculate_rsi_with_state,
+    update_rsi_state,
+)
+
+N_ROWS = 12_000
+
+
+@pytest.mark.parametrize("ma_type", ["simple", "exponential"])
+@pytest.mark.parametrize("split", [RSI_PERIOD, 100, 5_000, N_ROWS - 1])
+def test_incremental_rsi_equals_batch(ma_type: str, split: int) -> None:
+    close = make_close(n_rows=N_ROWS)
+    expected, _ = calculate_rsi_with_state(close=close, ma_type=ma_type)
+    head, state = calculate_rsi_with_state(close=close.iloc[:split], ma_type=ma_type)
+    # Continue in uneven chunks, through the JSON form of the state
+    tail = list()
+    bounds = np.linspace(split, N_ROWS, 8).astype(int)
+    for i0, i1 in zip(bounds[:-1], bounds[1:]):
+        chunk = close.iloc[i0:i1]
+        state = RsiState.from_dict(copy.deepcopy(state.to_dict()))
+        tail.append(update_rsi_state(state=state, close=chunk))
+    res = pd.concat([head] + tail)
+    pd.testing.assert_series_equal(res, expected, check_names=False, rtol=0, atol=1e-9)
+    assert state.last_date == close.index[-1].date().isoformat()
+
+
+@pytest.mark.parametrize("ma_type", ["simple", "exponential"])
+def test_add_rsi_column_uses_the_same_rsi(ma_type: str) -> None:
+    close = make_close(n_rows=1_000, seed=1)
+    rsi, _ = calculate_rsi_with_state(close=close, ma_type=ma_type)
+    df = add_rsi_column(df=close.to_frame(), ma_type=ma_type)
+    np.testing.assert_array_equal(df[f"RSI_{RSI_PERIOD}"].to_numpy(), rsi.to_numpy())
+
+
+def test_flat_window_gives_exact_bounds() -> None:
+    close = make_close(n_rows=200, seed=2)
+    _, state = calculate_rsi_with_state(close=close)
+    index = pd.bdate_range(close.index[-1] + pd.offsets.BDay(), periods=3 * RSI_PERIOD)
+    # Rising, then flat: no losses in the window, then no gains either
+    values = np.r_[
+        close.iloc[-1] + np.arange(1, RSI_PERIOD + 1), [200.0] * RSI_PERIOD * 2
+    ]
+    res = update_rsi_state(state=state, close=pd.Series(values, index=index))
+    assert res.iloc[RSI_PERIOD - 1] == 100.0
+    assert res.iloc[-1] == 100.0
+
+
+def test_update_skips_missing_close() -> None:
+    close = make_close(n_rows=300, seed=3)
+    _, state = calculate_rsi_with_state(close=close.iloc[:200])
+    with_gap = close.iloc[200:].copy()
+    gaps = np.array([5, 50])
+    with_gap.iloc[gaps] = np.nan
+    res = update_rsi_state(state=state, close=with_gap)
+    assert res.iloc[gaps].isnull().all()
+    expected, _ = calculate_rsi_with_state(
+        close=pd.concat([close.iloc[:200], with_gap.dropna()])
+    )
+    pd.testing.assert_series_equal(
+        res.dropna(), expected.iloc[200:], check_names=False, rtol=0, atol=1e-9
+    )
+
+
+class RecordingExecutor(Executor):
+    """Runs the calls at once and keeps the lengths of the Series sent to them"""
+
+    def __init__(self) -> None:
+        self.sent_rows: List[int] = list()
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        self.sent_rows.extend(len(arg) for arg in args if isinstance(arg, pd.Series))
+        future: Future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+@pytest.mark.parametrize("valid_state", [True, False])
+def test_only_new_closes_go_to_the_executor(valid_state: bool) -> None:
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    close = make_close(n_rows=1_000, seed=4)
+    stored, state = calculate_rsi_with_state(close=close.iloc[:900])
+    if not valid_state:
+        state.last_date = close.index[0].date().isoformat()
+    executor = RecordingExecutor()
+    res, changed, new_state = add_fresh_rsi_values(
+        close_df=close.to_frame(),
+        rsi_df=stored.to_frame(rsi_col),
+        rsi_state=state,
+        executor=executor,
+    )
+    # The full history only to rebuild an invalid state
+    assert executor.sent_rows == ([100] if valid_state else [900, 100])
+    expected, _ = calculate_rsi_with_state(close=close)
+    assert changed and new_state.last_date == close.index[-1].date().isoformat()
+    pd.testing.assert_series_equal(
+        res[rsi_col], expected.dropna(), check_names=False, rtol=0, atol=1e-9
+    )
@@ -0,0 +1,49 @@
+import numpy as np
+from conftest import make_bars
+
+from utils.s3 import (
+    BARS_GROUP,
+    read_dataset_group,
+    read_many,
+    read_many_keys,
+    write_many,
+    write_many_keys,
+)
+
+TICKERS = [f"T{i}" for i in range(20)]
+
+
+def test_write_read_many(s3_bucket: str) -> None:
+    frames = {ticker: make_bars(n_rows=100, seed=i) for i, ticker in enumerate(TICKERS)}
+    messages = write_many(frames=frames)
+    assert set(messages) == set(TICKERS)
+    res = read_many(tickers=TICKERS + ["MISSING"], columns=["Close"])
+    assert set(res) == set(TICKERS)
+    for ticker, df in frames.items():
+        np.testing.assert_allclose(res[ticker]["Close"].to_numpy(), df["Close"])
+
+
+def test_write_many_appends_after_last_stored_dates(s3_bucket: str) -> None:
+    frames = {ticker: make_bars(n_rows=100, seed=i) for i, ticker in enumerate(TICKERS)}
+    write_many(frames={ticker: df.iloc[:90] for ticker, df in frames.items()})
+    last_date = frames[TICKERS[0]].index[89].date()
+    write_many(
+        frames=frames, last_stored_dates={ticker: last_date for ticker in TICKERS}
+    )
+    for ticker, df in frames.items():
+        stored = read_dataset_group(ticker=ticker, group=BARS_GROUP)
+        assert stored is not None
+        assert len(stored) == 100
+        np.testing.assert_allclose(stored["Close"].to_numpy(), df["Close"])
+
+
+def test_write_read_many_keys(s3_bucket: str) -> None:
+    frames = {
+        f"bulk/{ticker}.csv": make_bars(n_rows=50, seed=i)
+        for i, ticker in enumerate(TICKERS)
+    }
+    write_many_keys(frames=frames)
+    res = read_many_keys(keys=list(frames) + ["bulk/MISSING.csv"])
+    assert set(res) == set(frames)
+    for key, df in frames.items():
+        np.testing.assert_allclose(res[key]["Close"].to_numpy(), df["Close"])
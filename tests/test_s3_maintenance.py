@@ -0,0 +1,52 @@
+import pytest
+
+from utils.s3 import delete_s3_prefix, iter_s3_objects, iter_s3_objects_parallel
+
+KEYS = [
+    f"listing/{name}/data.csv"
+    for name in [
+        "0A",
+        "1B",
+        "9Z",
+        "A",
+        "AAPL",
+        "B",
+        "GLD",
+        "MSFT",
+        "Z",
+        "ZZZ",
+        "a",
+        "~",
+    ]
+]
+
+
+@pytest.fixture
+def listed_bucket(s3_bucket: str) -> str:
+    # Imported here: pytest would create the client at collection, outside moto
+    from utils.s3 import s3_client
+
+    for key in KEYS:
+        s3_client.put_object(Bucket=s3_bucket, Key=key, Body=b"x")
+    s3_client.put_object(Bucket=s3_bucket, Key="other/data.csv", Body=b"x")
+    return s3_bucket
+
+
+def test_parallel_listing_equals_sequential(listed_bucket: str) -> None:
+    sequential = [obj.key for obj in iter_s3_objects(prefix="listing/")]
+    assert sequential == sorted(KEYS)
+    parallel = [obj.key for obj in iter_s3_objects_parallel(prefix="listing/")]
+    assert sorted(parallel) == sequential
+
+
+def test_parallel_listing_can_stop_early(listed_bucket: str) -> None:
+    objects = iter_s3_objects_parallel(prefix="listing/", workers=2)
+    first = next(objects)
+    objects.close()
+    assert first.key in KEYS
+
+
+def test_delete_s3_prefix(listed_bucket: str) -> None:
+    assert delete_s3_prefix(prefix="listing/") == len(KEYS)
+    assert list(iter_s3_objects(prefix="listing/")) == []
+    assert [obj.key for obj in iter_s3_objects(prefix="other/")] == ["other/data.csv"]
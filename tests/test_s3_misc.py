@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import pytest
+from conftest import make_close
+
+import utils.s3.misc as s3_misc
+from utils.s3.cache import S3DataFrameCache
+
+KEY = "tests/AAA.parquet"
+
+
+@pytest.fixture
+def parsed_columns(monkeypatch: pytest.MonkeyPatch) -> List[Optional[List[str]]]:
+    """The columns of every body parsed by the reads"""
+    res: List[Optional[List[str]]] = list()
+    deserialize_df = s3_misc.deserialize_df
+
+    def _deserialize_df(
+        body: bytes, fmt: str, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        res.append(columns)
+        return deserialize_df(body=body, fmt=fmt, columns=columns)
+
+    monkeypatch.setattr(s3_misc, "deserialize_df", _deserialize_df)
+    return res
+
+
+def _make_df() -> pd.DataFrame:
+    close = make_close(n_rows=100)
+    return pd.DataFrame({"Open": close + 1, "Close": close})
+
+
+@pytest.mark.parametrize("disk_cache", [True, False])
+def test_read_parses_only_the_columns(
+    s3_bucket: str,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    parsed_columns: List[Optional[List[str]]],
+    disk_cache: bool,
+) -> None:
+    cache = S3DataFrameCache(disk_dir=str(tmp_path) if disk_cache else None)
+    monkeypatch.setattr(s3_misc, "s3_df_cache", cache)
+    df = _make_df()
+    s3_misc.write_df_to_s3_key(df=df, key=KEY)
+
+    close = s3_misc.read_df_from_s3_key(key=KEY, columns=["Close"])
+    assert close is not None and list(close.columns) == ["Close"]
+    assert parsed_columns == [["Close"]]
+    entry = cache.get(bucket=s3_bucket, key=KEY)
+    assert entry is None or entry.df is None
+
+    full = s3_misc.read_df_from_s3_key(key=KEY)
+    assert full is not None and list(full.columns) == ["Open", "Close"]
+    pd.testing.assert_series_equal(close["Close"], full["Close"])
+    # Projections of the cached full DataFrame are not parsed again
+    s3_misc.read_df_from_s3_key(key=KEY, columns=["Close"])
+    assert parsed_columns == [["Close"], None]
@@ -0,0 +1,38 @@
+import pandas as pd
+from conftest import make_bars
+
+from constants import RSI_PERIOD, S3_BUCKET
+from utils.derived_columns.rsi import read_rsi_df_from_s3
+from utils.derived_columns.timeframes import update_resampled_bars_for_ticker
+from utils.s3.dataset import get_dataset_state_key
+
+INTERVAL = "1wk"
+# Ends on Wednesday, 2025-12-31
+DAILY = make_bars(n_rows=300)
+
+
+def test_update_without_state_rewrites_provisional_bar(s3_bucket: str) -> None:
+    from utils.s3 import s3_client
+
+    # The first update ends on Tuesday, the week is not over
+    update_resampled_bars_for_ticker(
+        ticker="AAA", daily_df=DAILY.iloc[:-1], interval=INTERVAL
+    )
+    s3_client.delete_object(
+        Bucket=S3_BUCKET,
+        Key=get_dataset_state_key(
+            ticker="AAA", name=f"RSI_{RSI_PERIOD}", interval=INTERVAL
+        ),
+    )
+    res = update_resampled_bars_for_ticker(
+        ticker="AAA", daily_df=DAILY, interval=INTERVAL
+    )
+    update_resampled_bars_for_ticker(ticker="BBB", daily_df=DAILY, interval=INTERVAL)
+
+    stored = read_rsi_df_from_s3(ticker="AAA", interval=INTERVAL)
+    expected = read_rsi_df_from_s3(ticker="BBB", interval=INTERVAL)
+    assert stored is not None and expected is not None
+    assert stored.index.is_unique and res.index.is_unique
+    assert stored.index[-1] == pd.Timestamp("2026-01-02")
+    # The leading NaN values are not kept when RSI is continued
+    pd.testing.assert_frame_equal(stored, expected.dropna())
@@ -0,0 +1,16 @@
+from .arrays import (
+    ARRAY_STORE_COLUMNS,
+    TickerArrays,
+    TickerArrayStore,
+    ticker_array_store,
+    ticker_arrays_from_df,
+    ticker_bars_store,
+)
+from .bars import (
+    BARS_DATE_COLUMN,
+    iter_bars_arrow,
+    iter_bars_ndjson,
+    select_bar_columns,
+)
+from .downsample import aggregate_ohlc, lttb_indices
+from .misc import get_chart_data
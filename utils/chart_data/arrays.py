@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from constants import (
+    ARRAY_STORE_MAX_TICKERS,
+    ARRAY_STORE_TTL_SECONDS,
+    BARS_STORE_MAX_TICKERS,
+    RSI_PERIOD,
+)
+from utils.s3 import read_ticker_dataset
+
+ARRAY_STORE_COLUMNS = ["Open", "High", "Low", "Close", "Volume", f"RSI_{RSI_PERIOD}"]
+
+
+@dataclass
+class TickerArrays:
+    """
+    Columns of the ticker dataset as contiguous arrays, float64 unless
+    loaded with their own dtypes, next to an ascending int64 array
+    of dates (ns since epoch, naive).
+    """
+
+    ticker: str
+    dates: np.ndarray
+    columns: Dict[str, np.ndarray]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def get_range(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Tuple[int, int]:
+        """
+        Positions [i0, i1) of the dates within [start, end], by binary search.
+        start and end are dates or naive datetimes, e.g. pd.Timestamp.
+        """
+        i0 = 0
+        i1 = len(self.dates)
+        if start is not None:
+            i0 = int(np.searchsorted(self.dates, pd.Timestamp(start).value, "left"))
+        if end is not None:
+            i1 = int(np.searchsorted(self.dates, pd.Timestamp(end).value, "right"))
+        return i0, max(i0, i1)
+
+
+def ticker_arrays_from_df(
+    ticker: str, df: pd.DataFrame, columns: Optional[List[str]] = ARRAY_STORE_COLUMNS
+) -> TickerArrays:
+    """
+    float64 arrays of columns, NaN if absent in df,
+    or arrays of all columns of df with their own dtypes if columns is None.
+    """
+    df = df.sort_index()
+    index = pd.DatetimeIndex(pd.to_datetime(df.index))
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    if columns is None:
+        return TickerArrays(
+            ticker=ticker,
+            dates=index.values.astype("datetime64[ns]").view(np.int64),
+            columns={
+                col_name: np.ascontiguousarray(df[col_name].to_numpy())
+                for col_name in df.columns
+            },
+        )
+    res_columns = dict()
+    for col_name in columns:
+        if col_name in df.columns:
+            res_columns[col_name] = np.ascontiguousarray(
+                df[col_name].to_numpy(dtype=np.float64, na_value=np.nan)
+            )
+        else:
+            res_columns[col_name] = np.full(len(df), np.nan)
+    return TickerArrays(
+        ticker=ticker,
+        dates=index.values.astype("datetime64[ns]").view(np.int64),
+        columns=res_columns,
+    )
+
+
+class TickerArrayStore:
+    """
+    LRU of TickerArrays, so that API requests slice ready numpy arrays
+    instead of reading and converting DataFrames every time.
+    Entries are reloaded from S3 after ttl_seconds or when invalidated,
+    e.g. after the ticker is updated by the pipeline.
+    columns are loaded as in ticker_arrays_from_df, None for all of them.
+    """
+
+    def __init__(
+        self,
+        max_tickers: int = ARRAY_STORE_MAX_TICKERS,
+        ttl_seconds: float = ARRAY_STORE_TTL_SECONDS,
+        columns: Optional[List[str]] = ARRAY_STORE_COLUMNS,
+    ) -> None:
+        self.max_tickers = max_tickers
+        self.ttl_seconds = ttl_seconds
+        self.columns = columns
+        self._entries: "OrderedDict[str, TickerArrays]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One S3 load per ticker at a time, only for the loads in progress
+        self._load_locks: Dict[str, threading.Lock] = dict()
+
+    def get_fresh(self, ticker: str) -> Optional[TickerArrays]:
+        """Cached arrays that do not need reloading yet, no S3 access"""
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                return None
+            self._entries.move_to_end(ticker)
+            return entry
+
+    def get(self, ticker: str) -> Optional[TickerArrays]:
+        """Arrays of the ticker, None if it has no bars"""
+        entry = self.get_fresh(ticker=ticker)
+        if entry is not None:
+            return entry
+        with self._lock:
+            load_lock = self._load_locks.setdefault(ticker, threading.Lock())
+        try:
+            with load_lock:
+                entry = self.get_fresh(ticker=ticker)
+                if entry is not None:
+                    return entry
+                df = read_ticker_dataset(ticker=ticker, columns=self.columns)
+                if df is None or df.empty:
+                    self.invalidate(ticker=ticker)
+                    return None
+                entry = ticker_arrays_from_df(
+                    ticker=ticker, df=df, columns=self.columns
+                )
+                self.put(entry)
+                return entry
+        finally:
+            # Requests for unknown tickers must not grow the locks forever;
+            # the threads still waiting for this lock find the loaded entry
+            with self._lock:
+                if self._load_locks.get(ticker) is load_lock:
+                    del self._load_locks[ticker]
+
+    def put(self, entry: TickerArrays) -> None:
+        with self._lock:
+            self._entries.pop(entry.ticker, None)
+            self._entries[entry.ticker] = entry
+            while len(self._entries) > self.max_tickers:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ticker: str) -> None:
+        with self._lock:
+            self._entries.pop(ticker, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+ticker_array_store = TickerArrayStore()
+# All bars and derived columns, for the bars API
+ticker_bars_store = TickerArrayStore(max_tickers=BARS_STORE_MAX_TICKERS, columns=None)
@@ -0,0 +1,107 @@
+import json
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from constants import BARS_STREAM_CHUNK_ROWS
+
+from .arrays import TickerArrays
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+# Name of the dates column in the streamed bars, as in the stored parquet objects
+BARS_DATE_COLUMN = "Date"
+# End-of-stream marker of the Arrow IPC streaming format
+_ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def select_bar_columns(arrays: TickerArrays, columns: Optional[List[str]]) -> List[str]:
+    """
+    columns in the requested order, all stored columns if None.
+    Raises ValueError for columns the ticker does not have.
+    """
+    if not columns:
+        return list(arrays.columns)
+    unknown = [col_name for col_name in columns if col_name not in arrays.columns]
+    if unknown:
+        raise ValueError(f"select_bar_columns: {unknown} not in {list(arrays.columns)}")
+    return list(dict.fromkeys(columns))
+
+
+def _to_json_values(values: np.ndarray) -> list:
+    """JSON has no NaN, missing values become null"""
+    if values.dtype.kind != "f" or not np.isnan(values).any():
+        return values.tolist()
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+def _dumps(row: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(row)
+    return json.dumps(row).encode("utf-8")
+
+
+def iter_bars_ndjson(
+    arrays: TickerArrays,
+    i0: int,
+    i1: int,
+    columns: List[str],
+    chunk_rows: int = BARS_STREAM_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """
+    Bars [i0, i1) of arrays as JSON lines with the ISO date and the columns,
+    chunk_rows lines at a time, so that the response is never held in memory whole.
+    """
+    names = [BARS_DATE_COLUMN] + columns
+    for start in range(i0, i1, chunk_rows):
+        end = min(start + chunk_rows, i1)
+        dates = np.datetime_as_string(
+            arrays.dates[start:end].view("datetime64[ns]"), unit="D"
+        )
+        values = [dates.tolist()] + [
+            _to_json_values(arrays.columns[col_name][start:end]) for col_name in columns
+        ]
+        yield b"".join(_dumps(dict(zip(names, row))) + b"\n" for row in zip(*values))
+
+
+def iter_bars_arrow(
+    arrays: TickerArrays,
+    i0: int,
+    i1: int,
+    columns: List[str],
+    chunk_rows: int = BARS_STREAM_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """
+    Bars [i0, i1) of arrays in the Arrow IPC streaming format: the schema,
+    then a record batch of chunk_rows rows at a time, made of
+    zero-copy views of the cached arrays.
+    """
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [pa.field(BARS_DATE_COLUMN, pa.timestamp("ns"))]
+        + [
+            pa.field(col_name, pa.from_numpy_dtype(arrays.columns[col_name].dtype))
+            for col_name in columns
+        ]
+    )
+
+    def _chunks() -> Iterator[bytes]:
+        yield schema.serialize().to_pybytes()
+        for start in range(i0, i1, chunk_rows):
+            end = min(start + chunk_rows, i1)
+            batch = pa.record_batch(
+                [pa.array(arrays.dates[start:end].view("datetime64[ns]"))]
+                + [
+                    pa.array(arrays.columns[col_name][start:end])
+                    for col_name in columns
+                ],
+                schema=schema,
+            )
+            yield batch.serialize().to_pybytes()
+        yield _ARROW_EOS
+
+    return _chunks()
@@ -0,0 +1,87 @@
+from typing import Dict
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a line.
+    The first and the last points are kept; from every bucket in between
+    the point making the largest triangle with the previously selected point
+    and the average of the next bucket is taken.
+    x must be ascending and x, y must have no NaN.
+
+    Returns:
+        np.ndarray: Ascending positions of the selected points, at most n_out.
+    """
+    n = len(x)
+    if n_out < 3:
+        raise ValueError(f"lttb_indices: {n_out=}, must be >= 3")
+    if n <= n_out:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    x = x - x[0]
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[: n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[: n - 1], edges[:-1]) / counts
+    # The last bucket looks ahead at the last point
+    avg_x = np.append(avg_x[1:], x[n - 1])
+    avg_y = np.append(avg_y[1:], y[n - 1])
+
+    res = np.empty(n_out, dtype=np.int64)
+    res[0] = 0
+    res[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo = edges[i]
+        hi = edges[i + 1]
+        # Doubled triangle areas, the constant factor does not change argmax
+        area = np.abs(
+            (x[a] - avg_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        res[i + 1] = a
+    return res
+
+
+def aggregate_ohlc(
+    dates: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    n_out: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Merge consecutive bars into at most n_out candles of about the same
+    number of bars: first open, max high, min low, last close, total volume,
+    and the date of the first bar.
+    """
+    n = len(dates)
+    if n_out < 1:
+        raise ValueError(f"aggregate_ohlc: {n_out=}, must be >= 1")
+    if n <= n_out:
+        return {
+            "dates": dates,
+            "Open": open_,
+            "High": high,
+            "Low": low,
+            "Close": close,
+            "Volume": volume,
+        }
+    starts = np.unique(np.linspace(0, n, n_out + 1).astype(np.int64)[:-1])
+    ends = np.append(starts[1:], n)
+    return {
+        "dates": dates[starts],
+        "Open": open_[starts],
+        "High": np.fmax.reduceat(high, starts),
+        "Low": np.fmin.reduceat(low, starts),
+        "Close": close[ends - 1],
+        "Volume": np.add.reduceat(np.nan_to_num(volume), starts),
+    }
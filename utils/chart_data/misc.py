@@ -0,0 +1,83 @@
+from datetime import date
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from constants import CHART_DATA_DEFAULT_POINTS, CHART_DATA_MAX_POINTS, RSI_PERIOD
+
+from .arrays import ticker_array_store
+from .downsample import aggregate_ohlc, lttb_indices
+
+
+def _to_epoch_ms(dates: np.ndarray) -> list:
+    return (dates // 1_000_000).tolist()
+
+
+def _to_rounded_list(values: np.ndarray, decimals: int) -> list:
+    """JSON has no NaN, missing values become null"""
+    rounded = np.round(values, decimals)
+    if not np.isnan(rounded).any():
+        return rounded.tolist()
+    return [None if np.isnan(v) else v for v in rounded.tolist()]
+
+
+def get_chart_data(
+    ticker: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    points: int = CHART_DATA_DEFAULT_POINTS,
+    decimals: int = 4,
+) -> Optional[Dict[str, Any]]:
+    """
+    Compact OHLC, Volume and RSI series of the ticker between start and end,
+    both inclusive, for client-side charts.
+    If there are more bars than points, candles are merged into at most points
+    OHLC candles and the RSI line is reduced with LTTB to at most points values.
+    Dates are milliseconds since epoch.
+    Returns None if the ticker has no bars.
+    """
+    if points < 3 or points > CHART_DATA_MAX_POINTS:
+        raise ValueError(
+            f"get_chart_data: {points=}, must be from 3 to {CHART_DATA_MAX_POINTS}"
+        )
+    arrays = ticker_array_store.get(ticker=ticker)
+    if arrays is None:
+        return None
+    i0, i1 = arrays.get_range(start=start, end=end)
+    dates = arrays.dates[i0:i1]
+    columns = {col_name: values[i0:i1] for col_name, values in arrays.columns.items()}
+    candles = aggregate_ohlc(
+        dates=dates,
+        open_=columns["Open"],
+        high=columns["High"],
+        low=columns["Low"],
+        close=columns["Close"],
+        volume=columns["Volume"],
+        n_out=points,
+    )
+
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    rsi = columns[rsi_col]
+    # The first RSI values are NaN, LTTB needs real points
+    rsi_valid = ~np.isnan(rsi)
+    rsi_dates = dates[rsi_valid]
+    rsi = rsi[rsi_valid]
+    rsi_idx = lttb_indices(x=rsi_dates, y=rsi, n_out=points)
+
+    return {
+        "ticker": ticker,
+        "bars": int(i1 - i0),
+        "downsampled": bool(i1 - i0 > points),
+        "candles": {
+            "t": _to_epoch_ms(candles["dates"]),
+            "open": _to_rounded_list(candles["Open"], decimals),
+            "high": _to_rounded_list(candles["High"], decimals),
+            "low": _to_rounded_list(candles["Low"], decimals),
+            "close": _to_rounded_list(candles["Close"], decimals),
+            "volume": _to_rounded_list(candles["Volume"], 0),
+        },
+        rsi_col: {
+            "t": _to_epoch_ms(rsi_dates[rsi_idx]),
+            "value": _to_rounded_list(rsi[rsi_idx], 2),
+        },
+    }
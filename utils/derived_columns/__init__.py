@@ -1 +1,31 @@
-from .rsi import add_rsi_column, update_close_rsi_for_ticker
+from .indicators import (
+    calculate_indicators,
+    save_indicators_for_ticker,
+    update_indicators_for_ticker,
+)
+from .panel import panel_rsi, panel_rsi_df, read_close_panel
+from .registry import (
+    INDICATORS,
+    INDICATORS_GROUP,
+    Node,
+    compute_indicators,
+    get_required_columns,
+    register_indicator,
+    register_node,
+)
+from .rsi import (
+    add_fresh_rsi_values,
+    add_rsi_column,
+    read_rsi_df_from_s3,
+    read_rsi_state_from_s3,
+    save_fresh_rsi_values,
+    update_close_rsi_for_ticker,
+    write_rsi_df_to_s3,
+    write_rsi_state_to_s3,
+)
+from .rsi_state import RsiState, calculate_rsi_with_state, update_rsi_state
+from .timeframes import (
+    RESAMPLE_OFFSETS,
+    resample_ohlc,
+    update_resampled_bars_for_ticker,
+)
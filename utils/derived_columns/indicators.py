@@ -0,0 +1,237 @@
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.derived_columns.registry import (
+    INDICATORS_GROUP,
+    Node,
+    compute_indicators,
+    get_required_columns,
+    no_inputs,
+    register_indicator,
+    register_node,
+)
+from utils.logging import execute_and_log
+from utils.s3 import (
+    BARS_GROUP,
+    get_last_stored_date,
+    read_dataset_group,
+    read_dataset_state,
+    write_dataset_group,
+    write_dataset_state,
+)
+from utils.schema import normalize_date_index
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def column(col_name: str) -> Node:
+    return Node("column", (col_name,))
+
+
+@register_node("column", inputs=no_inputs)
+def _column(df: pd.DataFrame, node: Node) -> pd.Series:
+    return df[node.params[0]].astype(float)
+
+
+@register_node("diff")
+def _diff(df: pd.DataFrame, node: Node, series: pd.Series) -> pd.Series:
+    return series.diff()
+
+
+@register_node("gain")
+def _gain(df: pd.DataFrame, node: Node, delta: pd.Series) -> pd.Series:
+    return delta.clip(lower=0)
+
+
+@register_node("loss")
+def _loss(df: pd.DataFrame, node: Node, delta: pd.Series) -> pd.Series:
+    return delta.clip(upper=0).abs()
+
+
+@register_node("log_return")
+def _log_return(df: pd.DataFrame, node: Node, series: pd.Series) -> pd.Series:
+    return np.log(series).diff()
+
+
+@register_node("rolling_mean")
+def _rolling_mean(df: pd.DataFrame, node: Node, series: pd.Series) -> pd.Series:
+    return series.rolling(node.params[1]).mean()
+
+
+@register_node("rolling_std")
+def _rolling_std(df: pd.DataFrame, node: Node, series: pd.Series) -> pd.Series:
+    return series.rolling(node.params[1]).std()
+
+
+@register_node("ewm_mean")
+def _ewm_mean(df: pd.DataFrame, node: Node, series: pd.Series) -> pd.Series:
+    # adjust=False for classic EMA
+    return series.ewm(span=node.params[1], adjust=False).mean()
+
+
+@register_node("wilder_mean")
+def _wilder_mean(df: pd.DataFrame, node: Node, series: pd.Series) -> pd.Series:
+    return series.ewm(alpha=1.0 / node.params[1], adjust=False).mean()
+
+
+@register_node("sub")
+def _sub(df: pd.DataFrame, node: Node, left: pd.Series, right: pd.Series) -> pd.Series:
+    return left - right
+
+
+@register_node("add_scaled")
+def _add_scaled(
+    df: pd.DataFrame, node: Node, left: pd.Series, right: pd.Series
+) -> pd.Series:
+    """left + factor * right, e.g. Bollinger bands"""
+    return left + node.params[2] * right
+
+
+@register_node("scale")
+def _scale(df: pd.DataFrame, node: Node, series: pd.Series) -> pd.Series:
+    return series * node.params[1]
+
+
+@register_node("true_range")
+def _true_range(
+    df: pd.DataFrame, node: Node, high: pd.Series, low: pd.Series, close: pd.Series
+) -> pd.Series:
+    prev_close = close.shift(1)
+    return pd.concat(
+        [high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1
+    ).max(axis=1)
+
+
+@register_node("rsi")
+def _rsi(
+    df: pd.DataFrame, node: Node, roll_up: pd.Series, roll_down: pd.Series
+) -> pd.Series:
+    rsi = 100.0 - (100.0 / (1.0 + roll_up / roll_down))
+    # Same as add_rsi_column: avoid division-by-zero if roll_down is zero
+    rsi[:] = np.select([roll_down == 0, roll_up == 0, True], [100, 0, rsi])
+    return rsi.where(roll_up.notnull() & roll_down.notnull())
+
+
+def sma(col_name: str, window: int) -> Node:
+    return Node("rolling_mean", (column(col_name), window))
+
+
+def ema(col_name: str, span: int) -> Node:
+    return Node("ewm_mean", (column(col_name), span))
+
+
+def rsi(col_name: str, period: int, ma_type: str = "simple") -> Node:
+    """Same values as add_rsi_column, for periods other than RSI_PERIOD"""
+    delta = Node("diff", (column(col_name),))
+    ma_kind = "rolling_mean" if ma_type == "simple" else "ewm_mean"
+    return Node(
+        "rsi",
+        (
+            Node(ma_kind, (Node("gain", (delta,)), period)),
+            Node(ma_kind, (Node("loss", (delta,)), period)),
+        ),
+    )
+
+
+def _register_default_indicators() -> None:
+    close = column("Close")
+    for window in [20, 50, 200]:
+        register_indicator(f"SMA_{window}", sma("Close", window))
+    for span in [12, 26]:
+        register_indicator(f"EMA_{span}", ema("Close", span))
+
+    macd = Node("sub", (ema("Close", 12), ema("Close", 26)))
+    macd_signal = Node("ewm_mean", (macd, 9))
+    register_indicator("MACD", macd)
+    register_indicator("MACD_SIGNAL", macd_signal)
+    register_indicator("MACD_HIST", Node("sub", (macd, macd_signal)))
+
+    std_20 = Node("rolling_std", (close, 20))
+    register_indicator(
+        "BB_UPPER_20", Node("add_scaled", (sma("Close", 20), std_20, 2.0))
+    )
+    register_indicator(
+        "BB_LOWER_20", Node("add_scaled", (sma("Close", 20), std_20, -2.0))
+    )
+
+    true_range = Node("true_range", (column("High"), column("Low"), close))
+    register_indicator("ATR_14", Node("wilder_mean", (true_range, 14)))
+
+    log_return = Node("log_return", (close,))
+    volatility = Node("rolling_std", (log_return, 20))
+    register_indicator(
+        "VOLATILITY_20", Node("scale", (volatility, np.sqrt(TRADING_DAYS_PER_YEAR)))
+    )
+
+
+_register_default_indicators()
+
+
+def calculate_indicators(
+    bars_df: pd.DataFrame, indicators: Optional[Dict[str, Node]] = None
+) -> pd.DataFrame:
+    """
+    The indicators for the bars, all registered ones if indicators is None.
+    No S3 access here, so that it can run in a process pool;
+    pass INDICATORS there, as the workers do not see the indicators
+    registered after their start.
+    """
+    return compute_indicators(
+        df=normalize_date_index(df=bars_df), indicators=indicators
+    )
+
+
+def save_indicators_for_ticker(ticker: str, indicators_df: pd.DataFrame) -> str:
+    """
+    Save the indicators in one column group of the ticker dataset.
+    Only the new rows are written, unless the set of indicators
+    has changed since the last write. The last date and the columns
+    written are kept in the dataset state, so the stored group is not read.
+    """
+    state = read_dataset_state(ticker=ticker, name=INDICATORS_GROUP)
+    last_stored_date = None
+    if state is not None and state["columns"] == list(indicators_df.columns):
+        last_stored_date = date.fromisoformat(state["last_date"])
+    res = execute_and_log(
+        func=write_dataset_group,
+        params={
+            "ticker": ticker,
+            "group": INDICATORS_GROUP,
+            "df": indicators_df,
+            "last_stored_date": last_stored_date,
+        },
+    )
+    last_date = get_last_stored_date(df=indicators_df)
+    if last_date is None:
+        return res
+    new_state = {
+        "last_date": last_date.isoformat(),
+        "columns": list(indicators_df.columns),
+    }
+    if new_state != state:
+        execute_and_log(
+            func=write_dataset_state,
+            params={"ticker": ticker, "name": INDICATORS_GROUP, "state": new_state},
+        )
+    return res
+
+
+def update_indicators_for_ticker(
+    ticker: str, bars_df: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Calculate all registered indicators for ticker in one pass and save them.
+    If bars_df is not given, only the bars columns the indicators need are read.
+    """
+    if bars_df is None:
+        bars_df = read_dataset_group(
+            ticker=ticker, group=BARS_GROUP, columns=get_required_columns()
+        )
+    if bars_df is None or bars_df.empty:
+        raise RuntimeError(f"update_indicators_for_ticker: no bars for {ticker=}")
+    res = calculate_indicators(bars_df=bars_df)
+    save_indicators_for_ticker(ticker=ticker, indicators_df=res)
+    return res
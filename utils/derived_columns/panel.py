@@ -0,0 +1,160 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.s3 import read_many
+
+
+def _check_panel_inputs(
+    closes: np.ndarray, periods: Sequence[int], ma_type: str
+) -> None:
+    if closes.ndim != 2:
+        raise ValueError(f"panel_rsi: {closes.ndim=}, must be 2 (dates x tickers)")
+    if closes.shape[0] < 2:
+        raise ValueError(f"panel_rsi: {closes.shape=}, need at least 2 dates")
+    if not periods or min(periods) < 2:
+        raise ValueError(f"panel_rsi: {periods=}, every period must be >= 2")
+    if ma_type not in ["simple", "exponential"]:
+        raise ValueError(f"panel_rsi: {ma_type=}, must be simple or exponential")
+
+
+def _rsi_from_averages(
+    roll_up: np.ndarray,
+    roll_down: np.ndarray,
+    up_is_zero: np.ndarray,
+    down_is_zero: np.ndarray,
+) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - (100.0 / (1.0 + roll_up / roll_down))
+    # Same order of checks as np.select in add_rsi_column
+    rsi = np.where(up_is_zero, 0.0, rsi)
+    rsi = np.where(down_is_zero, 100.0, rsi)
+    return rsi
+
+
+def panel_rsi(
+    closes: np.ndarray,
+    periods: Sequence[int],
+    ma_type: str = "simple",
+    dtype: type = np.float64,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    RSI for many tickers and periods at once.
+
+    NaN closes mean the ticker did not trade that day. Each ticker's RSI is
+    calculated over its own trading days only, as add_rsi_column would do
+    on the ticker's own history, and is NaN on the days it did not trade.
+
+    Args:
+        closes (np.ndarray): Close prices, dates x tickers, dates ascending.
+        periods (Sequence[int]): RSI periods, e.g. [2, 6, 14, 28].
+        ma_type (str, optional): 'simple' or 'exponential'. Defaults to 'simple'.
+        dtype (type, optional): np.float32 or np.float64 for the result.
+        out (Optional[np.ndarray]): Preallocated result of shape
+            (len(periods), dates, tickers), allocated if None.
+
+    Returns:
+        np.ndarray: RSI values, periods x dates x tickers.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    _check_panel_inputs(closes=closes, periods=periods, ma_type=ma_type)
+    n_dates, n_tickers = closes.shape
+    if out is None:
+        out = np.empty((len(periods), n_dates, n_tickers), dtype=dtype)
+    elif out.shape != (len(periods), n_dates, n_tickers):
+        raise ValueError(f"panel_rsi: {out.shape=} does not match the inputs")
+
+    # Move the trading days of every ticker to the top of its column,
+    # keeping their order, so that a column-wise calculation skips the gaps.
+    order = np.argsort(np.isnan(closes), axis=0, kind="stable")
+    compressed = np.take_along_axis(closes, order, axis=0)
+    delta = np.diff(compressed, axis=0)
+    delta_is_valid = ~np.isnan(delta)
+    up = np.where(delta_is_valid, np.maximum(delta, 0.0), 0.0)
+    down = np.where(delta_is_valid, np.maximum(-delta, 0.0), 0.0)
+
+    rsi_compressed = np.empty((n_dates, n_tickers), dtype=np.float64)
+    rsi_compressed[0] = np.nan
+    if ma_type == "simple":
+        # Rolling sums from cumulative sums, shared by all periods.
+        # Counts of non-zero values keep the zero checks exact.
+        up_cumsum = np.zeros((n_dates, n_tickers))
+        down_cumsum = np.zeros((n_dates, n_tickers))
+        np.cumsum(up, axis=0, out=up_cumsum[1:])
+        np.cumsum(down, axis=0, out=down_cumsum[1:])
+        up_count = np.zeros((n_dates, n_tickers), dtype=np.int32)
+        down_count = np.zeros((n_dates, n_tickers), dtype=np.int32)
+        np.cumsum(up > 0, axis=0, dtype=np.int32, out=up_count[1:])
+        np.cumsum(down > 0, axis=0, dtype=np.int32, out=down_count[1:])
+        # Number of valid deltas so far, to find complete windows
+        valid_count = np.cumsum(delta_is_valid, axis=0, dtype=np.int32)
+        for i, period in enumerate(periods):
+            rsi_compressed[1:period] = np.nan
+            roll_up = (up_cumsum[period:] - up_cumsum[:-period]) / period
+            roll_down = (down_cumsum[period:] - down_cumsum[:-period]) / period
+            up_is_zero = (up_count[period:] - up_count[:-period]) == 0
+            down_is_zero = (down_count[period:] - down_count[:-period]) == 0
+            rsi = _rsi_from_averages(roll_up, roll_down, up_is_zero, down_is_zero)
+            is_valid = delta_is_valid[period - 1 :] & (
+                valid_count[period - 1 :] >= period
+            )
+            rsi_compressed[period:] = rsi
+            np.copyto(rsi_compressed[period:], np.nan, where=~is_valid)
+            # Cast to the dtype of out by the assignment, without a copy
+            np.put_along_axis(out[i], order, rsi_compressed, axis=0)
+        return out
+
+    # Exponential: the recursion runs over dates, vectorized over tickers,
+    # into the one scratch buffer that every period reuses
+    roll_up = np.empty(n_tickers)
+    roll_down = np.empty(n_tickers)
+    for i, period in enumerate(periods):
+        alpha = 2.0 / (period + 1.0)
+        roll_up[:] = up[0]
+        roll_down[:] = down[0]
+        for j in range(n_dates - 1):
+            if j > 0:
+                roll_up *= 1.0 - alpha
+                roll_up += alpha * up[j]
+                roll_down *= 1.0 - alpha
+                roll_down += alpha * down[j]
+            rsi_compressed[j + 1] = _rsi_from_averages(
+                roll_up, roll_down, roll_up == 0, roll_down == 0
+            )
+        np.copyto(rsi_compressed[1:], np.nan, where=~delta_is_valid)
+        np.put_along_axis(out[i], order, rsi_compressed, axis=0)
+    return out
+
+
+def panel_rsi_df(
+    closes_df: pd.DataFrame,
+    periods: Sequence[int],
+    ma_type: str = "simple",
+    dtype: type = np.float64,
+) -> Dict[int, pd.DataFrame]:
+    """
+    panel_rsi for a DataFrame of Close prices, dates x tickers.
+    Returns period -> DataFrame of RSI values, dates x tickers.
+    """
+    closes_df = closes_df.sort_index()
+    res = panel_rsi(
+        closes=closes_df.to_numpy(dtype=np.float64),
+        periods=periods,
+        ma_type=ma_type,
+        dtype=dtype,
+    )
+    return {
+        period: pd.DataFrame(res[i], index=closes_df.index, columns=closes_df.columns)
+        for i, period in enumerate(periods)
+    }
+
+
+def read_close_panel(tickers: List[str]) -> pd.DataFrame:
+    """Close prices of the tickers from their datasets, aligned by date"""
+    dfs = read_many(tickers=tickers, columns=["Close"])
+    closes = {
+        ticker.upper(): dfs[ticker]["Close"] for ticker in tickers if ticker in dfs
+    }
+    return pd.DataFrame(closes).sort_index()
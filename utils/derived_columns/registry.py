@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from utils.s3 import register_dataset_columns
+
+# All registered indicators are stored together in this dataset column group
+INDICATORS_GROUP = "indicators"
+
+
+@dataclass(frozen=True)
+class Node:
+    """
+    One calculation step, e.g. Node("rolling_mean", (Node("column", ("Close",)), 20)).
+    Equal nodes are calculated once per DataFrame, whichever indicators need them.
+    """
+
+    kind: str
+    params: Tuple = ()
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    inputs: Callable[[Node], List[Node]]
+    compute: Callable[..., pd.Series]
+
+
+_NODE_SPECS: Dict[str, NodeSpec] = dict()
+# Output column name -> node
+INDICATORS: Dict[str, Node] = dict()
+
+
+def no_inputs(node: Node) -> List[Node]:
+    return []
+
+
+def _node_params_inputs(node: Node) -> List[Node]:
+    """By default, the Node params are the inputs"""
+    return [param for param in node.params if isinstance(param, Node)]
+
+
+def register_node(
+    kind: str, inputs: Callable[[Node], List[Node]] = _node_params_inputs
+) -> Callable:
+    """
+    Decorator for the function calculating nodes of this kind.
+    The function gets the bars DataFrame, the node, and the input series.
+    Kinds are looked up by name in the process that calculates the nodes,
+    e.g. a spawned CPU worker, so they must be registered at import time
+    of a module that the worker imports, like the kinds in indicators.py.
+    """
+
+    def decorator(func: Callable[..., pd.Series]) -> Callable[..., pd.Series]:
+        _NODE_SPECS[kind] = NodeSpec(inputs=inputs, compute=func)
+        return func
+
+    return decorator
+
+
+def register_indicator(col_name: str, node: Node) -> None:
+    """
+    Add the indicator to INDICATORS. Spawned workers have only the indicators
+    registered at import time, the pipeline passes them INDICATORS explicitly.
+    """
+    if node.kind not in _NODE_SPECS:
+        raise ValueError(f"register_indicator: unknown {node.kind=} for {col_name=}")
+    INDICATORS[col_name] = node
+    register_dataset_columns(group=INDICATORS_GROUP, columns=[col_name])
+
+
+def _get_spec(node: Node) -> NodeSpec:
+    if node.kind not in _NODE_SPECS:
+        raise ValueError(f"Unknown indicator node kind: {node.kind=}")
+    return _NODE_SPECS[node.kind]
+
+
+def get_calculation_order(nodes: Iterable[Node]) -> List[Node]:
+    """All nodes needed for the given ones, inputs before the nodes using them"""
+    res: List[Node] = list()
+    done: Set[Node] = set()
+    in_progress: Set[Node] = set()
+
+    def _visit(node: Node) -> None:
+        if node in done:
+            return
+        if node in in_progress:
+            raise ValueError(f"get_calculation_order: cycle at {node=}")
+        in_progress.add(node)
+        for input_node in _get_spec(node).inputs(node):
+            _visit(input_node)
+        in_progress.discard(node)
+        done.add(node)
+        res.append(node)
+
+    for node in nodes:
+        _visit(node)
+    return res
+
+
+def get_required_columns(columns: Optional[List[str]] = None) -> List[str]:
+    """Raw bars columns that the indicators are calculated from"""
+    if columns is None:
+        columns = list(INDICATORS)
+    order = get_calculation_order(INDICATORS[col_name] for col_name in columns)
+    return sorted({node.params[0] for node in order if node.kind == "column"})
+
+
+def compute_indicators(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    indicators: Optional[Dict[str, Node]] = None,
+) -> pd.DataFrame:
+    """
+    Calculate the indicators, the registered ones if indicators is None,
+    all of them if columns is None, in one pass over the dependency graph:
+    every intermediate node, e.g. the Close diff or a 20-day rolling mean,
+    is calculated once.
+    """
+    if indicators is None:
+        indicators = INDICATORS
+    if columns is None:
+        columns = list(indicators)
+    for col_name in columns:
+        if col_name not in indicators:
+            raise ValueError(f"compute_indicators: {col_name=} is not registered")
+    results: Dict[Node, pd.Series] = dict()
+    for node in get_calculation_order(indicators[col_name] for col_name in columns):
+        spec = _get_spec(node)
+        inputs = [results[input_node] for input_node in spec.inputs(node)]
+        results[node] = spec.compute(df, node, *inputs)
+    return pd.DataFrame(
+        {col_name: results[indicators[col_name]] for col_name in columns},
+        index=df.index,
+    )
@@ -1,12 +1,27 @@
-from typing import Optional
+from concurrent.futures import Executor
+from datetime import date
+from typing import Any, Callable, Optional, Tuple
 
-import numpy as np
 import pandas as pd
 
-from constants import RSI_PERIOD, S3_FOLDER_RSI
-from utils.import_data.misc import add_fresh_ohlc_to_main_data
+from constants import RSI_PERIOD
+from utils.derived_columns.rsi_state import (
+    RsiState,
+    calculate_rsi_with_state,
+    update_rsi_state,
+)
 from utils.logging import execute_and_log
-from utils.s3 import read_daily_ohlc_from_s3, read_df_from_s3_csv, write_df_to_s3_csv
+from utils.s3 import (
+    BARS_GROUP,
+    DAILY_INTERVAL,
+    get_column_group,
+    get_last_stored_date,
+    read_dataset_group,
+    read_dataset_state,
+    write_dataset_group,
+    write_dataset_state,
+)
+from utils.schema import normalize_date_index
 
 
 def _add_rsi_col_initial_validation(
@@ -23,22 +38,6 @@ def _add_rsi_col_initial_validation(
         raise ValueError(f"add_rsi_column: {RSI_PERIOD=}, must be >= 2")
 
 
-def _calculate_ma(
-    series: pd.Series, period: int = RSI_PERIOD, ma_type: str = "simple"
-) -> pd.Series:
-    """Helper function to calculate different types of moving averages"""
-    if ma_type == "simple":
-        return series.rolling(period).mean()
-    elif ma_type == "exponential":
-        return series.ewm(
-            span=period, adjust=False
-        ).mean()  # adjust=False for classic EMA
-    else:
-        raise ValueError(
-            f"Unsupported moving average type: {ma_type=}, should be simple or exponential "
-        )
-
-
 def add_rsi_column(
     df: pd.DataFrame, col_name: str = "Close", ma_type: str = "simple"
 ) -> pd.DataFrame:
@@ -66,82 +65,188 @@ def add_rsi_column(
     _add_rsi_col_initial_validation(df=df, col_name=col_name, ma_type=ma_type)
 
     internal_df = df.copy()
-    # Get the difference in price
-    delta = internal_df[col_name].diff()
-    # Get rid of the first row, which is NaN
-    # since it did not have a previous row to calculate the differences
-    delta = delta[1:]
-    # Make the positive gains (up) and negative gains (down) Series
-    up, down = delta.clip(lower=0), delta.clip(upper=0).abs()
-
-    roll_up = _calculate_ma(series=up, period=RSI_PERIOD, ma_type=ma_type)
-    roll_down = _calculate_ma(series=down, period=RSI_PERIOD, ma_type=ma_type)
-    rs = roll_up / roll_down
-    rsi = 100.0 - (100.0 / (1.0 + rs))
-    # Avoid division-by-zero if `roll_down` is zero
-    # This prevents inf and/or nan values.
-    rsi[:] = np.select([roll_down == 0, roll_up == 0, True], [100, 0, rsi])
+    rsi, _ = calculate_rsi_with_state(
+        close=internal_df[col_name], period=RSI_PERIOD, ma_type=ma_type
+    )
     # check results again
-    valid_rsi = rsi[RSI_PERIOD - 1 :]
+    valid_rsi = rsi[RSI_PERIOD:]
     assert ((0 <= valid_rsi) & (valid_rsi <= 100)).all()
-    # Note: rsi[:RSI_PERIOD - 1] is excluded from above assertion
-    # because it is NaN for simple MA.
+    # Note: rsi[:RSI_PERIOD] is excluded from above assertion
+    # because it is NaN for simple MA, the first row has no difference.
     internal_df[f"RSI_{RSI_PERIOD}"] = rsi
     return internal_df
 
 
+def read_rsi_df_from_s3(
+    ticker: str, interval: str = DAILY_INTERVAL
+) -> Optional[pd.DataFrame]:
+    """Only the RSI column of the ticker dataset"""
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    return read_dataset_group(
+        ticker=ticker,
+        group=get_column_group(col_name=rsi_col),
+        columns=[rsi_col],
+        interval=interval,
+    )
+
+
+def write_rsi_df_to_s3(
+    ticker: str,
+    df: pd.DataFrame,
+    last_stored_date: Optional[date] = None,
+    interval: str = DAILY_INTERVAL,
+) -> str:
+    """
+    Save the RSI column into the ticker dataset.
+    Only rows after last_stored_date are written, if it is given.
+    """
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    return execute_and_log(
+        func=write_dataset_group,
+        params={
+            "ticker": ticker,
+            "group": get_column_group(col_name=rsi_col),
+            "df": df[[rsi_col]],
+            "last_stored_date": last_stored_date,
+            "interval": interval,
+        },
+    )
+
+
+def read_rsi_state_from_s3(
+    ticker: str, interval: str = DAILY_INTERVAL
+) -> Optional[RsiState]:
+    state = read_dataset_state(
+        ticker=ticker, name=f"RSI_{RSI_PERIOD}", interval=interval
+    )
+    if state is None:
+        return None
+    return RsiState.from_dict(state)
+
+
+def write_rsi_state_to_s3(
+    ticker: str, state: RsiState, interval: str = DAILY_INTERVAL
+) -> str:
+    """Must be called after the RSI values it continues are saved"""
+    return write_dataset_state(
+        ticker=ticker,
+        name=f"RSI_{state.period}",
+        state=state.to_dict(),
+        interval=interval,
+    )
+
+
+def _continue_rsi(close: pd.Series, state: RsiState) -> Tuple[pd.Series, RsiState]:
+    """update_rsi_state that also returns the state, as a process pool returns a copy"""
+    return update_rsi_state(state=state, close=close), state
+
+
+def _run_in(executor: Optional[Executor], func: Callable, *args: Any) -> Any:
+    if executor is None:
+        return func(*args)
+    return executor.submit(func, *args).result()
+
+
+def add_fresh_rsi_values(
+    close_df: pd.DataFrame,
+    rsi_df: Optional[pd.DataFrame],
+    rsi_state: Optional[RsiState] = None,
+    ma_type: str = "simple",
+    executor: Optional[Executor] = None,
+) -> Tuple[pd.DataFrame, bool, RsiState]:
+    """
+    Calculate RSI values for the Close prices after the last stored RSI value.
+    No S3 access here.
+
+    Args:
+        close_df (pd.DataFrame): Close prices, other columns are ignored.
+        rsi_df (Optional[pd.DataFrame]): Stored RSI column, None if there is none yet.
+        rsi_state (Optional[RsiState]): Stored state after the last RSI value.
+            If it is absent or does not match rsi_df, it is rebuilt from the full history.
+        ma_type (str, optional): The type of moving average ('simple' or 'exponential').
+        executor (Optional[Executor]): Where the calculations run, e.g. a process pool.
+            With a valid state only the new Close prices and the state are sent to it,
+            the full history only when the state has to be rebuilt.
+
+    Returns:
+        Tuple[pd.DataFrame, bool, RsiState]: The full RSI column, a flag telling
+        if it has new values that must be saved, and the state to save with them.
+    """
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    close_df = normalize_date_index(df=close_df[["Close"]])
+
+    # There may be NaN RSI values at the start of the dataframe
+    # that will cause harm if not filtered out.
+    if rsi_df is not None:
+        rsi_df = rsi_df.loc[rsi_df[rsi_col].notnull(), [rsi_col]]
+    if rsi_df is None or rsi_df.empty:
+        rsi, rsi_state = _run_in(
+            executor, calculate_rsi_with_state, close_df["Close"], RSI_PERIOD, ma_type
+        )
+        return rsi.to_frame(rsi_col), True, rsi_state
+    rsi_df = normalize_date_index(df=rsi_df)
+
+    last_rsi_date = rsi_df.index.max()
+    new_close = close_df.loc[close_df.index > last_rsi_date, "Close"]
+    if rsi_state is None or not rsi_state.is_valid_for(
+        last_date=last_rsi_date, period=RSI_PERIOD, ma_type=ma_type
+    ):
+        _, rsi_state = _run_in(
+            executor,
+            calculate_rsi_with_state,
+            close_df.loc[close_df.index <= last_rsi_date, "Close"],
+            RSI_PERIOD,
+            ma_type,
+        )
+    if new_close.empty:
+        # There is no need to add values at the end of the RSI column
+        return rsi_df, False, rsi_state
+
+    fresh_rsi, rsi_state = _run_in(executor, _continue_rsi, new_close, rsi_state)
+    return pd.concat([rsi_df, fresh_rsi.to_frame(rsi_col)]), True, rsi_state
+
+
+def save_fresh_rsi_values(
+    ticker: str,
+    rsi_res: pd.DataFrame,
+    stored_rsi_df: Optional[pd.DataFrame],
+    rsi_state: RsiState,
+) -> None:
+    """Append the new RSI values to the ticker dataset, then save the state"""
+    last_stored_date = get_last_stored_date(
+        df=stored_rsi_df, col_name=f"RSI_{RSI_PERIOD}"
+    )
+    write_rsi_df_to_s3(ticker=ticker, df=rsi_res, last_stored_date=last_stored_date)
+    execute_and_log(
+        func=write_rsi_state_to_s3, params={"ticker": ticker, "state": rsi_state}
+    )
+
+
 def update_close_rsi_for_ticker(
     ticker: str, initial_ohlc_df: Optional[pd.DataFrame]
 ) -> pd.DataFrame:
     """
-    Read two dataframes from S3: pure OHLC and OHLC + RSI column.
-    Add fresh OHLC data to the RSI dataframe.
-    Then calculate and add new RSI values.
+    Read the RSI column of the ticker dataset and its saved state from S3
+    and add RSI values for the fresh Close prices.
+    Only the Close prices are read from S3 if initial_ohlc_df is not given,
+    and only the new RSI values are written.
+    Returns initial_ohlc_df (or Close) with the RSI column.
     """
     ohlc_df = None
     if initial_ohlc_df is not None and not initial_ohlc_df.empty:
-        ohlc_df = initial_ohlc_df.copy()
+        ohlc_df = initial_ohlc_df
     else:
-        ohlc_df = read_daily_ohlc_from_s3(ticker=ticker)
+        ohlc_df = read_dataset_group(ticker=ticker, group=BARS_GROUP, columns=["Close"])
     if ohlc_df is None:
         raise RuntimeError(f"update_close_rsi_for_ticker: no OHLC DF for {ticker=}")
 
-    # Read OHLC + RSI DF from S3
-    filename = f"{ticker.upper()}.csv"
-    rsi_df = read_df_from_s3_csv(filename=filename, folder=S3_FOLDER_RSI)
-    if rsi_df is None:
-        res = add_rsi_column(df=ohlc_df)
-        execute_and_log(
-            func=write_df_to_s3_csv,
-            params={"df": res, "filename": filename, "folder": S3_FOLDER_RSI},
-        )
-        return res
-
-    # There may be NaN RSI values at the start of the dataframe
-    # that will cause harm if not filtered out.
-    rsi_df = rsi_df[rsi_df[f"RSI_{RSI_PERIOD}"].notnull()]
-
-    # Concat the RSI dataframe with fresh OHLC data,
-    # and then determine from which day to add new RSI values.
-    ohlc_df.index = ohlc_df.index.date  # type: ignore
-    res = add_fresh_ohlc_to_main_data(main_df=rsi_df, new_data=ohlc_df)
-    first_rsi_nan_index_label = res[f"RSI_{RSI_PERIOD}"].isnull().idxmax()
-    if first_rsi_nan_index_label == res.index[0]:
-        # There is no need to add values at the end of the RSI column
-        return res
-    first_rsi_nan_position = res.index.get_loc(first_rsi_nan_index_label)
-
-    # Take the end of the dataframe to which we will add recent RSI values
-    # We also need the RSI_PERIOD previous lines to calculate RSI.
-    start_index = max(0, first_rsi_nan_position - RSI_PERIOD)  # type: ignore
-    filtered_df = res.iloc[start_index:]
-    filtered_df = add_rsi_column(df=filtered_df)
-
-    # The end result is a dataframe with new recent RSI values added.
-    filtered_df = filtered_df[filtered_df[f"RSI_{RSI_PERIOD}"].notnull()]
-    res = pd.concat([res[res.index < filtered_df.index.min()], filtered_df])  # type: ignore
-    execute_and_log(
-        func=write_df_to_s3_csv,
-        params={"df": res, "filename": filename, "folder": S3_FOLDER_RSI},
+    rsi_df = read_rsi_df_from_s3(ticker=ticker)
+    rsi_state = read_rsi_state_from_s3(ticker=ticker)
+    rsi_res, changed, rsi_state = add_fresh_rsi_values(
+        close_df=ohlc_df, rsi_df=rsi_df, rsi_state=rsi_state
     )
-    return res
+    if changed:
+        save_fresh_rsi_values(
+            ticker=ticker, rsi_res=rsi_res, stored_rsi_df=rsi_df, rsi_state=rsi_state
+        )
+    return normalize_date_index(df=ohlc_df).join(rsi_res, how="left")
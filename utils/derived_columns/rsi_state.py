@@ -0,0 +1,169 @@
+import math
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from constants import RSI_PERIOD
+
+
+@dataclass
+class RsiState:
+    """
+    Running state of the RSI calculation after the bar of last_date.
+    With it, every new bar costs O(1) instead of a recalculation
+    over the previous RSI_PERIOD bars, and the values are the same
+    as those of add_rsi_column over the full history.
+    """
+
+    period: int
+    ma_type: str
+    last_date: str  # ISO date of the last processed bar
+    last_close: float
+    # exponential: EMA of the gains and losses
+    avg_gain: Optional[float] = None
+    avg_loss: Optional[float] = None
+    # simple: the last `period` gains and losses of the rolling window
+    gains: List[float] = field(default_factory=list)
+    losses: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RsiState":
+        return cls(**data)
+
+    def is_valid_for(
+        self, last_date: pd.Timestamp, period: int = RSI_PERIOD, ma_type: str = "simple"
+    ) -> bool:
+        """The state can continue RSI values stored up to last_date"""
+        return (
+            self.period == period
+            and self.ma_type == ma_type
+            and pd.Timestamp(self.last_date) == pd.Timestamp(last_date)
+        )
+
+
+def _calculate_ma(
+    series: pd.Series, period: int = RSI_PERIOD, ma_type: str = "simple"
+) -> pd.Series:
+    """Helper function to calculate different types of moving averages"""
+    if ma_type == "simple":
+        return series.rolling(period).mean()
+    elif ma_type == "exponential":
+        return series.ewm(
+            span=period, adjust=False
+        ).mean()  # adjust=False for classic EMA
+    else:
+        raise ValueError(
+            f"Unsupported moving average type: {ma_type=}, should be simple or exponential "
+        )
+
+
+def _rsi_from_averages(avg_gain: float, avg_loss: float) -> float:
+    # Same order of checks as np.select in calculate_rsi_with_state
+    if avg_loss == 0:
+        return 100.0
+    if avg_gain == 0:
+        return 0.0
+    return 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+
+
+def calculate_rsi_with_state(
+    close: pd.Series, period: int = RSI_PERIOD, ma_type: str = "simple"
+) -> Tuple[pd.Series, RsiState]:
+    """
+    Batch RSI over the full Close history, plus the state needed
+    to continue it bar by bar with update_rsi_state.
+    The one RSI implementation, add_rsi_column calls it too.
+    """
+    if close.empty:
+        raise ValueError("calculate_rsi_with_state: empty close Series")
+    if ma_type not in ["simple", "exponential"]:
+        raise ValueError(
+            f"calculate_rsi_with_state: {ma_type=}, must be simple or exponential"
+        )
+    # Get rid of the first row, which is NaN
+    # since it did not have a previous row to calculate the differences
+    delta = close.diff()[1:]
+    up, down = delta.clip(lower=0), delta.clip(upper=0).abs()
+    roll_up = _calculate_ma(series=up, period=period, ma_type=ma_type)
+    roll_down = _calculate_ma(series=down, period=period, ma_type=ma_type)
+    rs = roll_up / roll_down
+    rsi = 100.0 - (100.0 / (1.0 + rs))
+    # Avoid division-by-zero if `roll_down` is zero
+    # This prevents inf and/or nan values.
+    rsi[:] = np.select([roll_down == 0, roll_up == 0, True], [100, 0, rsi])
+    rsi = rsi.reindex(close.index)
+
+    state = RsiState(
+        period=period,
+        ma_type=ma_type,
+        last_date=pd.Timestamp(close.index[-1]).date().isoformat(),
+        last_close=float(close.iloc[-1]),
+    )
+    if ma_type == "simple":
+        state.gains = [float(value) for value in up.iloc[-period:]]
+        state.losses = [float(value) for value in down.iloc[-period:]]
+    elif not roll_up.empty:
+        state.avg_gain = float(roll_up.iloc[-1])
+        state.avg_loss = float(roll_down.iloc[-1])
+    return rsi, state
+
+
+def update_rsi_state(state: RsiState, close: pd.Series) -> pd.Series:
+    """
+    Feed new Close prices, dated after state.last_date, into the state.
+    Returns their RSI values; the state is updated in place.
+    The simple moving averages come from running sums of the window,
+    so every bar costs O(1) whatever the period.
+    """
+    alpha = 2.0 / (state.period + 1.0)
+    values = close.to_numpy(dtype=float)
+    res = np.full(values.shape[0], np.nan)
+    gains = deque(state.gains, maxlen=state.period)
+    losses = deque(state.losses, maxlen=state.period)
+    sum_gain, sum_loss = math.fsum(gains), math.fsum(losses)
+    # Non-zero values in the window: without any, the sum is exactly 0,
+    # not the rounding error left by the values that went out of it
+    gain_count = sum(1 for value in gains if value != 0)
+    loss_count = sum(1 for value in losses if value != 0)
+    last_i = None
+    for i, close_value in enumerate(values):
+        if math.isnan(close_value):
+            continue
+        delta = close_value - state.last_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if state.ma_type == "simple":
+            if len(gains) == state.period:
+                sum_gain, sum_loss = sum_gain - gains[0], sum_loss - losses[0]
+                gain_count = gain_count - (gains[0] != 0)
+                loss_count = loss_count - (losses[0] != 0)
+            gains.append(gain)
+            losses.append(loss)
+            sum_gain, sum_loss = sum_gain + gain, sum_loss + loss
+            gain_count = gain_count + (gain != 0)
+            loss_count = loss_count + (loss != 0)
+            if len(gains) == state.period:
+                res[i] = _rsi_from_averages(
+                    avg_gain=sum_gain / state.period if gain_count else 0.0,
+                    avg_loss=sum_loss / state.period if loss_count else 0.0,
+                )
+        else:
+            if state.avg_gain is None or state.avg_loss is None:
+                state.avg_gain, state.avg_loss = gain, loss
+            else:
+                state.avg_gain = (1.0 - alpha) * state.avg_gain + alpha * gain
+                state.avg_loss = (1.0 - alpha) * state.avg_loss + alpha * loss
+            res[i] = _rsi_from_averages(
+                avg_gain=state.avg_gain, avg_loss=state.avg_loss
+            )
+        state.last_close = float(close_value)
+        last_i = i
+    if last_i is not None:
+        state.last_date = pd.Timestamp(close.index[last_i]).date().isoformat()
+    state.gains, state.losses = list(gains), list(losses)
+    return pd.Series(res, index=close.index, name=f"RSI_{state.period}")
@@ -0,0 +1,113 @@
+import copy
+from typing import Dict
+
+import pandas as pd
+
+from constants import RSI_PERIOD
+from utils.derived_columns.rsi import (
+    add_fresh_rsi_values,
+    read_rsi_df_from_s3,
+    read_rsi_state_from_s3,
+    write_rsi_df_to_s3,
+    write_rsi_state_to_s3,
+)
+from utils.derived_columns.rsi_state import update_rsi_state
+from utils.logging import execute_and_log
+from utils.s3 import BARS_GROUP, write_dataset_group
+from utils.schema import normalize_ohlc_df
+
+# Bars are labeled with the last day of their period, e.g. Friday of the week
+RESAMPLE_OFFSETS: Dict[str, pd.offsets.BaseOffset] = {
+    "1wk": pd.offsets.Week(weekday=4),
+    "1mo": pd.offsets.MonthEnd(),
+    "3mo": pd.offsets.QuarterEnd(startingMonth=3),
+}
+_OHLC_AGGREGATIONS = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum",
+}
+
+
+def resample_ohlc(daily_df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Bars of interval, one of RESAMPLE_OFFSETS, from the daily bars.
+    The last bar is partial if its period is not over yet.
+    """
+    if interval not in RESAMPLE_OFFSETS:
+        raise ValueError(
+            f"resample_ohlc: {interval=}, must be one of {list(RESAMPLE_OFFSETS)}"
+        )
+    res = (
+        daily_df[list(_OHLC_AGGREGATIONS)]
+        .resample(RESAMPLE_OFFSETS[interval], closed="right", label="right")
+        .agg(_OHLC_AGGREGATIONS)
+    )
+    # Periods without trading days, e.g. a week of holidays
+    return normalize_ohlc_df(res[res["Close"].notnull()])
+
+
+def update_resampled_bars_for_ticker(
+    ticker: str, daily_df: pd.DataFrame, interval: str
+) -> pd.DataFrame:
+    """
+    Resample the daily bars of the ticker to interval and save the bars
+    with their RSI in the interval part of the ticker dataset.
+
+    The last bar is provisional: it may be partial, and it is rewritten
+    by every update until the daily bars of the next period arrive,
+    so that late or corrected daily bars still get into it.
+    Only the bars after the last final one stored are written, and RSI
+    continues from the state saved after that bar, so an update costs
+    the reads of the stored RSI column and state.
+    Returns the bars with the RSI column.
+    """
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    bars = resample_ohlc(daily_df=daily_df, interval=interval)
+    final_bars = bars.iloc[:-1]
+
+    rsi_df = read_rsi_df_from_s3(ticker=ticker, interval=interval)
+    rsi_state = read_rsi_state_from_s3(ticker=ticker, interval=interval)
+    last_final = None
+    if rsi_state is not None:
+        last_final = pd.Timestamp(rsi_state.last_date)
+    if rsi_df is not None and not rsi_df.empty and not final_bars.empty:
+        # Without the provisional bar of the last update: the bar after the state,
+        # or the last stored bar if the state is missing
+        if last_final is not None:
+            keep = rsi_df.index <= last_final
+        else:
+            keep = rsi_df.index < rsi_df.index.max()
+        rsi_df = rsi_df[keep & (rsi_df.index <= final_bars.index[-1])]
+    if final_bars.empty:
+        rsi_res = pd.DataFrame({rsi_col: float("nan")}, index=bars.index)
+    else:
+        rsi_res, _, rsi_state = add_fresh_rsi_values(
+            close_df=final_bars, rsi_df=rsi_df, rsi_state=rsi_state
+        )
+        last_rsi = update_rsi_state(
+            state=copy.deepcopy(rsi_state), close=bars["Close"].iloc[-1:]
+        )
+        rsi_res = pd.concat([rsi_res, last_rsi.to_frame(rsi_col)])
+
+    execute_and_log(
+        func=write_dataset_group,
+        params={
+            "ticker": ticker,
+            "group": BARS_GROUP,
+            "df": bars,
+            "last_stored_date": last_final,
+            "interval": interval,
+        },
+    )
+    write_rsi_df_to_s3(
+        ticker=ticker, df=rsi_res, last_stored_date=last_final, interval=interval
+    )
+    if not final_bars.empty:
+        execute_and_log(
+            func=write_rsi_state_to_s3,
+            params={"ticker": ticker, "state": rsi_state, "interval": interval},
+        )
+    return bars.join(rsi_res, how="left")
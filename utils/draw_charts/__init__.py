@@ -0,0 +1,28 @@
+from .misc import (
+    CHART_COLUMNS,
+    CHART_LAYOUT,
+    build_candlestick_with_rsi_figure,
+    draw_save_candlestick_with_rsi,
+    get_chart,
+    get_chart_window,
+    render_candlestick_with_rsi,
+)
+from .render_cache import (
+    forget_chart_render_key,
+    get_chart_render_key,
+    get_saved_render_key,
+    set_chart_render_cached,
+)
+from .renderer import get_chart_renderer, shutdown_chart_renderer
+from .store import (
+    CHART_MEDIA_TYPES,
+    ChartCache,
+    StoredChart,
+    chart_cache,
+    check_chart_format,
+    get_chart_storage_key,
+    load_chart,
+    load_chart_render_key,
+    remove_charts,
+    save_chart,
+)
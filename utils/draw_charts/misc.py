@@ -0,0 +1,287 @@
+import threading
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from constants import CHART_WINDOW_DAYS, RSI_PERIOD
+from utils.logging import get_app_logger
+from utils.metrics import CHART_RENDERS
+from utils.s3 import read_ticker_dataset
+
+from .render_cache import get_chart_render_key
+from .store import (
+    CHART_MEDIA_TYPES,
+    StoredChart,
+    load_chart,
+    load_chart_render_key,
+    remove_charts,
+    save_chart,
+)
+
+# NOTE
+# If RuntimeError: Kaleido now requires that chrome/chromium is installed separately,
+# see https://stackoverflow.com/questions/79204447/kaleido-runtimeerror
+
+# Everything that changes the picture apart from the data,
+# it is a part of the render key
+CHART_LAYOUT = {
+    "version": 1,
+    "window_days": CHART_WINDOW_DAYS,
+    "row_heights": [0.5, 0.2, 0.3],  # Adjusted heights for OHLC, Volume, Indicator
+    "height": 800,
+    "template": "plotly_white",
+    "rsi_col": f"RSI_{RSI_PERIOD}",
+}
+CHART_COLUMNS = ["Open", "High", "Low", "Close", "Volume", f"RSI_{RSI_PERIOD}"]
+
+# One on-demand render per ticker and format at a time:
+# (ticker, fmt) -> lock and the number of renders holding or waiting for it
+_render_locks: Dict[Tuple[str, str], Tuple[threading.Lock, int]] = dict()
+_render_locks_lock = threading.Lock()
+
+
+@contextmanager
+def _render_lock(ticker: str, fmt: str) -> Iterator[None]:
+    """
+    Hold the render lock of the ticker and format. The lock is kept only
+    while renders use it, so that requests for unknown tickers
+    do not grow _render_locks forever.
+    """
+    key = (ticker, fmt)
+    with _render_locks_lock:
+        lock, users = _render_locks.get(key, (threading.Lock(), 0))
+        _render_locks[key] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _render_locks_lock:
+            lock, users = _render_locks[key]
+            if users > 1:
+                _render_locks[key] = (lock, users - 1)
+            else:
+                del _render_locks[key]
+
+
+def get_chart_window(df: pd.DataFrame) -> pd.DataFrame:
+    """Only the plotted columns of the last CHART_WINDOW_DAYS days"""
+    df_last = df[df.index >= (df.index.max() - pd.Timedelta(days=CHART_WINDOW_DAYS))]
+    return df_last[CHART_COLUMNS].copy()
+
+
+def build_candlestick_with_rsi_figure(df_last: pd.DataFrame, ticker: str) -> go.Figure:
+    """Three-panel OHLC, Volume and RSI figure of an already cut chart window"""
+    fig = make_subplots(
+        rows=3,
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+        row_heights=CHART_LAYOUT["row_heights"],
+    )
+
+    # Add Candlestick trace to the first row
+    fig.add_trace(
+        go.Candlestick(
+            x=df_last.index,
+            open=df_last["Open"],
+            high=df_last["High"],
+            low=df_last["Low"],
+            close=df_last["Close"],
+            name="OHLC",
+            increasing_line_color="green",  # Green for increasing candles
+            decreasing_line_color="red",  # Red for decreasing candles
+        ),
+        row=1,
+        col=1,
+    )
+
+    # Add Volume trace to the second row
+    fig.add_trace(
+        go.Bar(
+            x=df_last.index,
+            y=df_last["Volume"],
+            name="Volume",
+            marker_color="rgba(0,0,255,0.5)",  # Blue with some transparency
+        ),
+        row=2,
+        col=1,
+    )
+
+    # Add Technical Indicator (SMA_10) trace to the second row
+    fig.add_trace(
+        go.Scatter(
+            x=df_last.index,
+            y=df_last[f"RSI_{RSI_PERIOD}"],
+            mode="lines",
+            name=f"RSI_{RSI_PERIOD}",
+            line=dict(color="blue", width=2),
+        ),
+        row=3,
+        col=1,
+    )
+
+    fig.update_layout(
+        title_text=f"{ticker}: Candlestick Chart with RSI_14",
+        title_x=0.5,  # Center the title
+        xaxis_rangeslider_visible=False,  # Hide the range slider on the bottom x-axis
+        height=CHART_LAYOUT["height"],  # Set overall chart height
+        template=CHART_LAYOUT["template"],  # Use a clean white background template
+        hovermode="x unified",  # Show hover info for all traces at a given x-coordinate
+    )
+
+    # Update Y-axis titles
+    fig.update_yaxes(title_text="Price", row=1, col=1)
+    fig.update_yaxes(title_text="Volume", row=2, col=1)
+    fig.update_yaxes(title_text="RSI_14", row=3, col=1)
+
+    # Remove x-axis labels from the top subplot to avoid redundancy
+    fig.update_xaxes(showticklabels=False, row=1, col=1)
+    fig.update_xaxes(showticklabels=False, row=2, col=1)
+
+    last_date = str(df_last.index[-1])
+    last_rsi_value = df_last[f"RSI_{RSI_PERIOD}"].iloc[-1]
+    last_rsi_value = int(last_rsi_value)
+    fig.update_xaxes(title_text=f"{last_date=}, {last_rsi_value=}", row=3, col=1)
+
+    # Add rangebreaks to remove weekends (Saturday and Sunday)
+    # 6 corresponds to Saturday, 7 to Sunday.
+    # This applies to both x-axes due to shared_xaxes=True
+    fig.update_xaxes(
+        rangebreaks=[
+            dict(
+                bounds=[6, 1], pattern="day of week"
+            )  # Hide Saturday (6) and Sunday (7, which wraps to 1 for Monday)
+        ],
+        row=1,
+        col=1,
+    )
+    fig.update_xaxes(
+        rangebreaks=[
+            dict(
+                bounds=[6, 1], pattern="day of week"
+            )  # Hide Saturday (6) and Sunday (7, which wraps to 1 for Monday)
+        ],
+        row=2,
+        col=1,
+    )
+    fig.update_xaxes(
+        rangebreaks=[
+            dict(
+                bounds=[6, 1], pattern="day of week"
+            )  # Hide Saturday (6) and Sunday (7, which wraps to 1 for Monday)
+        ],
+        row=3,
+        col=1,
+    )
+
+    return fig
+
+
+def render_candlestick_with_rsi(
+    df_last: pd.DataFrame, ticker: str, fmt: str = "png"
+) -> bytes:
+    """
+    Build the chart of the window and render it as png, svg or interactive html.
+    Kaleido is slow to start, so this is meant to run in the chart renderer pool.
+    """
+    fig = build_candlestick_with_rsi_figure(df_last=df_last, ticker=ticker)
+    if fmt == "html":
+        return fig.to_html(include_plotlyjs="cdn").encode("utf-8")
+    return fig.to_image(format=fmt)
+
+
+def _render_save_chart(
+    df_last: pd.DataFrame,
+    ticker: str,
+    fmt: str,
+    render_key: str,
+    renderer: Optional[Executor],
+) -> StoredChart:
+    CHART_RENDERS.labels(result="rendered").inc()
+    if renderer is None:
+        body = render_candlestick_with_rsi(df_last=df_last, ticker=ticker, fmt=fmt)
+    else:
+        body = renderer.submit(
+            render_candlestick_with_rsi, df_last, ticker, fmt
+        ).result()
+    return save_chart(ticker=ticker, fmt=fmt, body=body, render_key=render_key)
+
+
+def draw_save_candlestick_with_rsi(
+    df: pd.DataFrame,
+    ticker: str,
+    renderer: Optional[Executor] = None,
+    fmt: str = "png",
+) -> bool:
+    """
+    Save the chart of the last CHART_WINDOW_DAYS days of df to the chart storage.
+    The rendering is skipped if the saved chart has the same data and layout.
+    Saved charts of the other formats rendered from older data are removed,
+    they are rendered again when requested, see get_chart.
+    If renderer is given, only the chart window is sent there to be rendered,
+    see get_chart_renderer.
+    Returns True if the chart was rendered.
+    """
+    df_last = get_chart_window(df=df)
+    render_key = get_chart_render_key(
+        df_last=df_last, ticker=ticker, layout=CHART_LAYOUT
+    )
+    if load_chart_render_key(ticker=ticker, fmt=fmt) == render_key:
+        CHART_RENDERS.labels(result="skipped").inc()
+        get_app_logger().info(
+            f"draw_save_candlestick_with_rsi - {ticker=} - chart unchanged, skipped"
+        )
+        return False
+    _render_save_chart(
+        df_last=df_last,
+        ticker=ticker,
+        fmt=fmt,
+        render_key=render_key,
+        renderer=renderer,
+    )
+    stale_fmts = list()
+    for other_fmt in CHART_MEDIA_TYPES:
+        if other_fmt == fmt:
+            continue
+        other_key = load_chart_render_key(ticker=ticker, fmt=other_fmt)
+        if other_key is not None and other_key != render_key:
+            stale_fmts.append(other_fmt)
+    remove_charts(ticker=ticker, fmts=stale_fmts)
+    return True
+
+
+def get_chart(
+    ticker: str, fmt: str = "png", renderer: Optional[Executor] = None
+) -> Optional[StoredChart]:
+    """
+    The latest chart of the ticker in the given format.
+    If there is no saved chart in this format, it is rendered from
+    the ticker dataset and saved.
+    Returns None if the ticker has no bars or RSI.
+    """
+    chart = load_chart(ticker=ticker, fmt=fmt)
+    if chart is not None:
+        return chart
+    with _render_lock(ticker=ticker, fmt=fmt):
+        # May be rendered by a concurrent request meanwhile
+        chart = load_chart(ticker=ticker, fmt=fmt)
+        if chart is not None:
+            return chart
+        df = read_ticker_dataset(ticker=ticker, columns=CHART_COLUMNS)
+        if df is None or df.empty or set(CHART_COLUMNS) - set(df.columns):
+            return None
+        df_last = get_chart_window(df=df)
+        render_key = get_chart_render_key(
+            df_last=df_last, ticker=ticker, layout=CHART_LAYOUT
+        )
+        return _render_save_chart(
+            df_last=df_last,
+            ticker=ticker,
+            fmt=fmt,
+            render_key=render_key,
+            renderer=renderer,
+        )
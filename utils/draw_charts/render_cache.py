@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+from constants import CHART_RENDER_CACHE_DIR
+from utils.files import write_file_atomic
+
+# filename -> render key of the chart saved there, in front of the disk files
+_render_keys: Dict[str, str] = dict()
+_render_keys_lock = threading.Lock()
+
+
+def get_chart_render_key(df_last: pd.DataFrame, ticker: str, layout: dict) -> str:
+    """Hash of the plotted window, its index and everything else drawn on the chart"""
+    h = hashlib.sha256()
+    h.update(ticker.encode())
+    h.update(json.dumps(layout, sort_keys=True).encode())
+    h.update(",".join(map(str, df_last.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df_last, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _get_render_key_path(filename: str) -> Optional[str]:
+    if CHART_RENDER_CACHE_DIR is None:
+        return None
+    return os.path.join(
+        CHART_RENDER_CACHE_DIR, os.path.basename(filename) + ".render_key"
+    )
+
+
+def get_saved_render_key(filename: str) -> Optional[str]:
+    """Render key of the chart saved in filename, None if it is unknown"""
+    with _render_keys_lock:
+        render_key = _render_keys.get(filename)
+    if render_key is not None:
+        return render_key
+    path = _get_render_key_path(filename=filename)
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        render_key = f.read().strip()
+    with _render_keys_lock:
+        _render_keys[filename] = render_key
+    return render_key
+
+
+def set_chart_render_cached(filename: str, render_key: str) -> None:
+    """Must be called after the chart is written to filename"""
+    with _render_keys_lock:
+        _render_keys[filename] = render_key
+    path = _get_render_key_path(filename=filename)
+    if path is None:
+        return
+    write_file_atomic(path=path, body=render_key.encode("utf-8"))
+
+
+def forget_chart_render_key(filename: str) -> None:
+    with _render_keys_lock:
+        _render_keys.pop(filename, None)
+    path = _get_render_key_path(filename=filename)
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from constants import CHART_RENDER_WORKERS
+from utils.logging import get_app_logger
+from utils.processes import make_process_pool
+
+_chart_renderer: Optional[ProcessPoolExecutor] = None
+_chart_renderer_lock = threading.Lock()
+
+
+def _warm_up_renderer() -> None:
+    """
+    Initializer of the renderer processes.
+    Starts Kaleido and its browser once, so that every chart rendered
+    by the process later does not pay for it.
+    """
+    try:
+        import kaleido
+
+        # Kaleido >= 1.1 can keep one browser running for all the renders
+        start_sync_server = getattr(kaleido, "start_sync_server", None)
+        if start_sync_server is not None:
+            start_sync_server()
+    except ImportError:
+        pass
+    try:
+        pio.to_image(go.Figure(), format="png", width=10, height=10)
+    except Exception as e:
+        get_app_logger().warning(f"_warm_up_renderer - Kaleido warm-up failed: {e}")
+
+
+def get_chart_renderer() -> ProcessPoolExecutor:
+    """
+    Long-lived pool of chart renderer processes shared by all tickers and runs.
+    """
+    global _chart_renderer
+    with _chart_renderer_lock:
+        if _chart_renderer is None:
+            _chart_renderer = make_process_pool(
+                max_workers=CHART_RENDER_WORKERS, initializer=_warm_up_renderer
+            )
+        return _chart_renderer
+
+
+def shutdown_chart_renderer() -> None:
+    global _chart_renderer
+    with _chart_renderer_lock:
+        if _chart_renderer is not None:
+            _chart_renderer.shutdown(wait=False, cancel_futures=True)
+            _chart_renderer = None
@@ -0,0 +1,294 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from constants import (
+    CHART_CACHE_MAX_BYTES,
+    CHART_CACHE_TTL_SECONDS,
+    CHART_LOCAL_DIR,
+    CHART_STORAGE,
+    S3_BUCKET,
+    S3_FOLDER_CHARTS,
+)
+from utils.files import write_file_atomic
+from utils.metrics import CHART_CACHE_LOOKUPS, S3_BYTES
+from utils.s3 import delete_s3_keys, s3_client
+
+from .render_cache import (
+    forget_chart_render_key,
+    get_saved_render_key,
+    set_chart_render_cached,
+)
+
+CHART_MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "html": "text/html; charset=utf-8",
+}
+S3_CHART_RENDER_KEY_METADATA = "render-key"
+
+
+@dataclass
+class StoredChart:
+    ticker: str
+    fmt: str
+    body: bytes
+    # Empty if unknown, e.g. for charts saved before the render keys
+    render_key: str
+    last_modified: datetime
+    # S3 ETag or file mtime, to revalidate the cached chart against the storage
+    storage_version: str = ""
+    # time.monotonic() of the last check against the storage
+    checked_at: float = 0.0
+    etag: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        # HTTP ETag of the bytes, the render key is only a hint to skip renders
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    @property
+    def media_type(self) -> str:
+        return CHART_MEDIA_TYPES[self.fmt]
+
+
+class ChartCache:
+    """
+    In-memory LRU of rendered chart bytes limited by their total size.
+    Entries older than ttl_seconds are revalidated against the chart storage,
+    so that charts saved by other processes are picked up.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = CHART_CACHE_MAX_BYTES,
+        ttl_seconds: float = CHART_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], StoredChart]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str, fmt: str) -> Optional[StoredChart]:
+        with self._lock:
+            entry = self._entries.get((ticker, fmt))
+            if entry is not None:
+                self._entries.move_to_end((ticker, fmt))
+            return entry
+
+    def get_fresh(self, ticker: str, fmt: str) -> Optional[StoredChart]:
+        """Cached chart that does not need revalidation yet"""
+        entry = self.get(ticker=ticker, fmt=fmt)
+        if entry is None or time.monotonic() - entry.checked_at > self.ttl_seconds:
+            return None
+        return entry
+
+    def put(self, chart: StoredChart) -> None:
+        size = len(chart.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(ticker=chart.ticker, fmt=chart.fmt)
+            self._entries[(chart.ticker, chart.fmt)] = chart
+            self._size = self._size + size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size = self._size - len(evicted.body)
+
+    def invalidate(self, ticker: str, fmt: str) -> None:
+        with self._lock:
+            self._pop(ticker=ticker, fmt=fmt)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, ticker: str, fmt: str) -> None:
+        entry = self._entries.pop((ticker, fmt), None)
+        if entry is not None:
+            self._size = self._size - len(entry.body)
+
+
+chart_cache = ChartCache()
+
+
+def check_chart_format(fmt: str) -> None:
+    if fmt not in CHART_MEDIA_TYPES:
+        raise ValueError(
+            f"check_chart_format: {fmt=}, must be one of {list(CHART_MEDIA_TYPES)}"
+        )
+
+
+def get_chart_storage_key(ticker: str, fmt: str) -> str:
+    """Local path or S3 key of the chart, depending on CHART_STORAGE"""
+    filename = f"{ticker}_RSI.{fmt}"
+    if CHART_STORAGE == "s3":
+        return S3_FOLDER_CHARTS + filename
+    return os.path.join(CHART_LOCAL_DIR, filename)
+
+
+def _read_chart_local(
+    ticker: str, fmt: str, cached: Optional[StoredChart]
+) -> Optional[StoredChart]:
+    path = get_chart_storage_key(ticker=ticker, fmt=fmt)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if cached is not None and cached.storage_version == str(mtime_ns):
+        return cached
+    with open(path, "rb") as f:
+        body = f.read()
+    return StoredChart(
+        ticker=ticker,
+        fmt=fmt,
+        body=body,
+        render_key=get_saved_render_key(filename=path) or "",
+        last_modified=datetime.fromtimestamp(mtime_ns // 10**9, tz=timezone.utc),
+        storage_version=str(mtime_ns),
+    )
+
+
+def _read_chart_s3(
+    ticker: str, fmt: str, cached: Optional[StoredChart]
+) -> Optional[StoredChart]:
+    key = get_chart_storage_key(ticker=ticker, fmt=fmt)
+    kwargs = dict()
+    if cached is not None and cached.storage_version:
+        kwargs["IfNoneMatch"] = cached.storage_version
+    try:
+        response = s3_client.get_object(Bucket=S3_BUCKET, Key=key, **kwargs)
+    except ClientError as ex:
+        error_code = ex.response["Error"]["Code"]
+        if error_code == "NoSuchKey":
+            return None
+        elif error_code in ["304", "NotModified"] and cached is not None:
+            return cached
+        else:
+            raise
+    body = response["Body"].read()
+    S3_BYTES.labels(direction="read").inc(len(body))
+    render_key = response.get("Metadata", {}).get(S3_CHART_RENDER_KEY_METADATA)
+    return StoredChart(
+        ticker=ticker,
+        fmt=fmt,
+        body=body,
+        render_key=render_key or "",
+        last_modified=response["LastModified"],
+        storage_version=response.get("ETag", ""),
+    )
+
+
+def load_chart(ticker: str, fmt: str) -> Optional[StoredChart]:
+    """
+    The saved chart of the ticker in the given format, None if there is none.
+    Served from chart_cache, the storage is only asked if the cached chart
+    is older than CHART_CACHE_TTL_SECONDS, and then with a cheap conditional read.
+    """
+    check_chart_format(fmt=fmt)
+    cached = chart_cache.get_fresh(ticker=ticker, fmt=fmt)
+    if cached is not None:
+        CHART_CACHE_LOOKUPS.labels(result="hit").inc()
+        return cached
+    cached = chart_cache.get(ticker=ticker, fmt=fmt)
+    if CHART_STORAGE == "s3":
+        chart = _read_chart_s3(ticker=ticker, fmt=fmt, cached=cached)
+    else:
+        chart = _read_chart_local(ticker=ticker, fmt=fmt, cached=cached)
+    if chart is not None and chart is cached:
+        CHART_CACHE_LOOKUPS.labels(result="revalidated").inc()
+    else:
+        CHART_CACHE_LOOKUPS.labels(result="miss").inc()
+    if chart is None:
+        chart_cache.invalidate(ticker=ticker, fmt=fmt)
+        return None
+    chart.checked_at = time.monotonic()
+    chart_cache.put(chart)
+    return chart
+
+
+def load_chart_render_key(ticker: str, fmt: str) -> Optional[str]:
+    """
+    Render key of the saved chart of the ticker in the given format,
+    None if there is none, empty if it is unknown.
+    The chart bytes are not read: the key comes from chart_cache,
+    the S3 object metadata or the local render key file.
+    """
+    check_chart_format(fmt=fmt)
+    cached = chart_cache.get_fresh(ticker=ticker, fmt=fmt)
+    if cached is not None:
+        return cached.render_key
+    key = get_chart_storage_key(ticker=ticker, fmt=fmt)
+    if CHART_STORAGE == "s3":
+        try:
+            response = s3_client.head_object(Bucket=S3_BUCKET, Key=key)
+        except ClientError as ex:
+            # HEAD responses have no body, so no NoSuchKey code either
+            if ex.response["Error"]["Code"] in ["404", "NoSuchKey", "NotFound"]:
+                return None
+            raise
+        return response.get("Metadata", {}).get(S3_CHART_RENDER_KEY_METADATA) or ""
+    if not os.path.exists(key):
+        return None
+    return get_saved_render_key(filename=key) or ""
+
+
+def save_chart(ticker: str, fmt: str, body: bytes, render_key: str) -> StoredChart:
+    """Save rendered chart bytes to the chart storage and chart_cache"""
+    check_chart_format(fmt=fmt)
+    key = get_chart_storage_key(ticker=ticker, fmt=fmt)
+    if CHART_STORAGE == "s3":
+        response = s3_client.put_object(
+            Bucket=S3_BUCKET,
+            Key=key,
+            Body=body,
+            ContentType=CHART_MEDIA_TYPES[fmt],
+            Metadata={S3_CHART_RENDER_KEY_METADATA: render_key},
+        )
+        S3_BYTES.labels(direction="write").inc(len(body))
+        storage_version = response.get("ETag", "")
+        last_modified = datetime.now(tz=timezone.utc)
+    else:
+        write_file_atomic(path=key, body=body)
+        set_chart_render_cached(filename=key, render_key=render_key)
+        mtime_ns = os.stat(key).st_mtime_ns
+        storage_version = str(mtime_ns)
+        last_modified = datetime.fromtimestamp(mtime_ns // 10**9, tz=timezone.utc)
+    chart = StoredChart(
+        ticker=ticker,
+        fmt=fmt,
+        body=body,
+        render_key=render_key,
+        # HTTP dates have whole seconds only
+        last_modified=last_modified.replace(microsecond=0),
+        storage_version=storage_version,
+        checked_at=time.monotonic(),
+    )
+    chart_cache.put(chart)
+    return chart
+
+
+def remove_charts(ticker: str, fmts: List[str]) -> None:
+    """Remove saved charts, e.g. the ones that were not rendered from fresh data"""
+    for fmt in fmts:
+        chart_cache.invalidate(ticker=ticker, fmt=fmt)
+    keys = [get_chart_storage_key(ticker=ticker, fmt=fmt) for fmt in fmts]
+    if not keys:
+        return
+    if CHART_STORAGE == "s3":
+        delete_s3_keys(keys=keys, bucket=S3_BUCKET)
+        return
+    for key in keys:
+        forget_chart_render_key(filename=key)
+        try:
+            os.remove(key)
+        except FileNotFoundError:
+            pass
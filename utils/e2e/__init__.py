@@ -1 +1,19 @@
+from .job_queue import UpdateJob, UpdateJobQueue, update_job_queue
+from .leases import (
+    Lease,
+    LocalJsonStore,
+    S3JsonStore,
+    complete_lease,
+    get_lease_store,
+    renew_lease,
+    try_acquire_lease,
+)
 from .misc import update_ohlc_rsi_chart
+from .pipeline import (
+    get_pipeline_executors,
+    run_pipeline_for_tickers,
+    run_ticker_pipeline,
+    save_freshness_entries,
+    shutdown_pipeline_executors,
+)
+from .universe import acquire_next_shard, get_universe_shards, load_universe
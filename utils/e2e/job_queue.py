@@ -0,0 +1,167 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from utils.e2e.pipeline import (
+    get_pipeline_executors,
+    run_ticker_pipeline,
+    save_freshness_entries,
+)
+from utils.logging import get_app_logger
+from utils.s3 import FreshnessEntry
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_FAILED = "failed"
+JOB_FINISHED_STATUSES = {JOB_STATUS_DONE, JOB_STATUS_FAILED}
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class UpdateJob:
+    """Pipeline run for one ticker, shared by all requests that asked for it"""
+
+    ticker: str
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JOB_STATUS_QUEUED
+    created_at: datetime = field(default_factory=_utc_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    # How many requests were coalesced into this job
+    requests_count: int = 1
+    # Written to the freshness manifest by the job, else by the caller
+    save_freshness: bool = True
+    freshness: Optional[FreshnessEntry] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in JOB_FINISHED_STATUSES
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class UpdateJobQueue:
+    """
+    Runs the update pipeline in the background, off the event loop.
+    While a job for a ticker is queued or running, new requests
+    for the same ticker get that job instead of a new one (singleflight).
+    Finished jobs are forgotten beyond max_finished_jobs, except the ones
+    that a caller is waiting for.
+    Must be used from the event loop thread only.
+    """
+
+    def __init__(self, max_finished_jobs: int = 1000) -> None:
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: "OrderedDict[str, UpdateJob]" = OrderedDict()
+        self._in_flight: Dict[str, UpdateJob] = dict()
+        self._tasks: Set[asyncio.Task] = set()
+        # job_id -> number of callers in wait() for the job
+        self._waiters: Dict[str, int] = dict()
+
+    def submit(
+        self,
+        tickers: Iterable[str],
+        prefetched: Optional[Dict[str, pd.DataFrame]] = None,
+        save_freshness: bool = True,
+    ) -> Dict[str, str]:
+        """
+        Start or join update jobs for tickers.
+        prefetched are ticker -> fresh bars already downloaded, if any,
+        they are used by the new jobs instead of downloading.
+        Unless save_freshness, the new and joined jobs do not write their
+        freshness entries, the caller writes the entries of all its jobs at once.
+        Returns ticker -> job_id.
+        """
+        prefetched = prefetched or dict()
+        res = dict()
+        for ticker in tickers:
+            ticker = ticker.upper()
+            job = self._in_flight.get(ticker)
+            if job is not None:
+                job.requests_count = job.requests_count + 1
+                # Read by the job once its pipeline is done
+                job.save_freshness = job.save_freshness and save_freshness
+            else:
+                job = UpdateJob(ticker=ticker, save_freshness=save_freshness)
+                self._jobs[job.job_id] = job
+                self._in_flight[ticker] = job
+                task = asyncio.create_task(self._run(job, prefetched.get(ticker)))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            res[ticker] = job.job_id
+        self._forget_old_jobs()
+        return res
+
+    def get(self, job_id: str) -> Optional[UpdateJob]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_ids: List[str], poll_interval: float = 0.5) -> None:
+        """
+        Until the jobs are finished. They are kept until the caller reads them,
+        i.e. until its next await, as long as they were known when wait() started.
+        """
+        for job_id in job_ids:
+            self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            while True:
+                jobs = [self._jobs.get(job_id) for job_id in job_ids]
+                if all(job is None or job.finished for job in jobs):
+                    return
+                await asyncio.sleep(poll_interval)
+        finally:
+            for job_id in job_ids:
+                self._waiters[job_id] = self._waiters[job_id] - 1
+                if not self._waiters[job_id]:
+                    del self._waiters[job_id]
+
+    async def _run(self, job: UpdateJob, new_data: Optional[pd.DataFrame]) -> None:
+        app_logger = get_app_logger()
+        io_executor, cpu_executor = get_pipeline_executors()
+
+        def _run_in_thread() -> None:
+            job.status = JOB_STATUS_RUNNING
+            job.started_at = _utc_now()
+            job.freshness = run_ticker_pipeline(
+                ticker=job.ticker, cpu_executor=cpu_executor, new_data=new_data
+            )
+            if job.save_freshness:
+                save_freshness_entries(entries={job.ticker: job.freshness})
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(io_executor, _run_in_thread)
+            job.status = JOB_STATUS_DONE
+        except Exception as e:
+            app_logger.error(
+                f"UpdateJobQueue - {job.ticker=}, {job.job_id=} - failed: {e}",
+                exc_info=True,
+            )
+            job.status = JOB_STATUS_FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = _utc_now()
+            if self._in_flight.get(job.ticker) is job:
+                del self._in_flight[job.ticker]
+
+    def _forget_old_jobs(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job_id not in self._waiters
+        ]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+
+update_job_queue = UpdateJobQueue()
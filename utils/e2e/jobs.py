@@ -1,13 +1,194 @@
-from utils.e2e import update_ohlc_rsi_chart
+import asyncio
+import contextlib
+import threading
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from constants import LEASE_POLL_SECONDS, LEASE_TTL_SECONDS, S3_FOLDER_DATASET
+from utils.e2e.job_queue import update_job_queue
+from utils.e2e.leases import (
+    JsonStore,
+    Lease,
+    complete_lease,
+    get_lease_store,
+    renew_lease,
+    try_acquire_lease,
+)
+from utils.e2e.pipeline import prefetch_fresh_bars, save_freshness_entries
+from utils.e2e.universe import acquire_next_shard, get_universe_shards, load_universe
 from utils.logging import get_app_logger
+from utils.s3 import (
+    FreshnessEntry,
+    compact_segments_in_s3_folder,
+    get_stale_tickers,
+    read_freshness_manifest,
+)
+from utils.trading_calendar import get_last_finished_session
+
+
+async def _prefetch_shard_bars(
+    tickers: List[str], manifest: Dict[str, FreshnessEntry]
+) -> Dict[str, pd.DataFrame]:
+    """
+    Fresh bars of the tickers of a shard that are in the freshness manifest,
+    with batched downloads from the earliest of their last bar dates.
+    New tickers need their full history, they are downloaded one by one.
+    """
+    known = [ticker.upper() for ticker in tickers if ticker.upper() in manifest]
+    if not known:
+        return dict()
+    last_date = min(date.fromisoformat(manifest[t].last_bar_date) for t in known)
+    return await asyncio.to_thread(prefetch_fresh_bars, known, last_date)
+
+
+async def _update_tickers(
+    tickers: List[str], manifest: Dict[str, FreshnessEntry]
+) -> Dict[str, str]:
+    """
+    Run the updates and return ticker -> error of the failed ones.
+    The updated tickers are written to the freshness manifest at once,
+    one conditional write per shard instead of one per ticker.
+    """
+    prefetched = await _prefetch_shard_bars(tickers=tickers, manifest=manifest)
+    # Goes through the job queue, so it is merged with any API-triggered
+    # updates for the same tickers that are already in flight.
+    job_ids = update_job_queue.submit(
+        tickers=tickers, prefetched=prefetched, save_freshness=False
+    )
+    await update_job_queue.wait(job_ids=list(job_ids.values()))
+    failed = dict()
+    entries = dict()
+    for ticker, job_id in job_ids.items():
+        job = update_job_queue.get(job_id)
+        if job is None:
+            failed[ticker] = f"job {job_id} is not in the job queue"
+        elif job.error is not None:
+            failed[ticker] = job.error
+        elif job.freshness is not None:
+            entries[ticker] = job.freshness
+    await asyncio.to_thread(save_freshness_entries, entries)
+    return failed
+
+
+async def _keep_lease(store: JsonStore, lease: Lease) -> None:
+    """Renew the lease until cancelled, so that it expires only if this worker dies"""
+    app_logger = get_app_logger()
+    while True:
+        await asyncio.sleep(LEASE_TTL_SECONDS / 3)
+        renewed = await asyncio.to_thread(renew_lease, store, lease, LEASE_TTL_SECONDS)
+        if not renewed:
+            app_logger.warning(f"_keep_lease - {lease.name=} lost to another worker")
+            return
+
+
+def _keep_lease_until(store: JsonStore, lease: Lease, stop: threading.Event) -> None:
+    """_keep_lease for the work of a thread, renews the lease until stop is set"""
+    while not stop.wait(LEASE_TTL_SECONDS / 3):
+        if not renew_lease(store=store, lease=lease, ttl_seconds=LEASE_TTL_SECONDS):
+            get_app_logger().warning(
+                f"_keep_lease_until - {lease.name=} lost to another worker"
+            )
+            return
+
+
+async def update_ohlc_rsi_charts_for_tickers(run_id: Optional[str] = None) -> None:
+    """
+    Daily update of the universe, shared by all workers of all nodes:
+    each worker leases shards of tickers until every shard of the run is done.
+    Faster workers take more shards. The shards of a crashed worker
+    are taken over once its leases expire.
+    Only the tickers that the freshness manifest does not show as updated
+    through the last trading day are run, so that on weekends and holidays
+    the run reads the manifest and stops.
+    """
+    app_logger = get_app_logger()
+    session = get_last_finished_session()
+    manifest = await asyncio.to_thread(read_freshness_manifest)
+    universe = await asyncio.to_thread(load_universe)
+    tickers = get_stale_tickers(tickers=universe, manifest=manifest, session=session)
+    if not tickers:
+        app_logger.info(
+            f"update_ohlc_rsi_charts_for_tickers - up to date through {session}"
+        )
+        return
+    run_id = run_id or datetime.now(timezone.utc).date().isoformat()
+    store = get_lease_store()
+    shards = await asyncio.to_thread(get_universe_shards, store, run_id, tickers)
+    app_logger.info(
+        f"update_ohlc_rsi_charts_for_tickers - {run_id=} - {len(shards)} shards"
+    )
+    failed: Dict[str, str] = dict()
+    while True:
+        shard_index, lease, all_done = await asyncio.to_thread(
+            acquire_next_shard, store, run_id, len(shards)
+        )
+        if lease is None:
+            if all_done:
+                break
+            # The other shards are leased, wait for them to finish or expire
+            await asyncio.sleep(LEASE_POLL_SECONDS)
+            continue
+        tickers = shards[shard_index]  # type: ignore
+        app_logger.info(
+            f"update_ohlc_rsi_charts_for_tickers - {run_id=} - {shard_index=} - {tickers=}"
+        )
+        keep_lease = asyncio.create_task(_keep_lease(store=store, lease=lease))
+        try:
+            shard_failed = await _update_tickers(tickers=tickers, manifest=manifest)
+        finally:
+            keep_lease.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await keep_lease
+        failed.update(shard_failed)
+        completed = await asyncio.to_thread(
+            complete_lease, store, lease, {"failed": shard_failed}
+        )
+        if not completed:
+            app_logger.warning(
+                f"update_ohlc_rsi_charts_for_tickers - {run_id=} - {shard_index=} - lease lost"
+            )
+    if failed:
+        app_logger.error(f"update_ohlc_rsi_charts_for_tickers - {failed=}")
+    else:
+        app_logger.info("update_ohlc_rsi_charts_for_tickers - finished OK")
 
 
-async def update_ohlc_rsi_charts_for_tickers() -> None:
+def compact_s3_segments() -> None:
+    """
+    Fold appended daily segments into the base objects of every ticker.
+    Only the worker that gets the lease of the day does it. The lease is
+    renewed while it runs and completed even if it fails, with the error.
+    """
     app_logger = get_app_logger()
-    tickers = ["GLD", "COPX"]
-    for ticker in tickers:
-        log_msg_1 = f"update_ohlc_rsi_charts_for_tickers - {ticker=} - starting"
-        app_logger.info(log_msg_1)
-        update_ohlc_rsi_chart(ticker=ticker)
-        log_msg_2 = f"update_ohlc_rsi_charts_for_tickers - {ticker=} - finished OK"
-        app_logger.info(log_msg_2)
+    store = get_lease_store()
+    run_id = datetime.now(timezone.utc).date().isoformat()
+    lease = try_acquire_lease(
+        store=store, name=f"runs/{run_id}/compaction", ttl_seconds=LEASE_TTL_SECONDS
+    )
+    if lease is None:
+        app_logger.info(f"compact_s3_segments - {run_id=} - done by another worker")
+        return
+    stop = threading.Event()
+    keep_lease = threading.Thread(
+        target=_keep_lease_until,
+        args=(store, lease, stop),
+        name="compaction_lease",
+        daemon=True,
+    )
+    keep_lease.start()
+    result: dict = dict()
+    try:
+        msgs = compact_segments_in_s3_folder(folder=S3_FOLDER_DATASET)
+        for msg in msgs:
+            app_logger.info(f"compact_s3_segments - {msg}")
+        result = {"compacted": len(msgs)}
+    except Exception as e:
+        result = {"failed": str(e)}
+        raise
+    finally:
+        stop.set()
+        keep_lease.join()
+        if not complete_lease(store=store, lease=lease, result=result):
+            app_logger.warning(f"compact_s3_segments - {run_id=} - lease lost")
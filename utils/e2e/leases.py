@@ -0,0 +1,158 @@
+import fcntl
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Union
+
+from constants import LEASE_LOCAL_DIR, LEASE_STORE, S3_BUCKET, S3_FOLDER_LEASES
+from utils.files import write_file_atomic
+from utils.s3 import put_json_if, read_json_with_etag
+
+LEASE_STATUS_LEASED = "leased"
+LEASE_STATUS_DONE = "done"
+# Identifies this process in the leases it holds
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class S3JsonStore:
+    """Versioned JSON documents in S3, versions are ETags of conditional writes"""
+
+    def __init__(self, bucket: str = S3_BUCKET, folder: str = S3_FOLDER_LEASES) -> None:
+        self.bucket = bucket
+        self.folder = folder
+
+    def read(self, name: str) -> Optional[Tuple[dict, str]]:
+        return read_json_with_etag(key=f"{self.folder}{name}.json", bucket=self.bucket)
+
+    def put_if(self, name: str, body: dict, version: Optional[str]) -> Optional[str]:
+        return put_json_if(
+            key=f"{self.folder}{name}.json", body=body, etag=version, bucket=self.bucket
+        )
+
+
+class LocalJsonStore:
+    """
+    Local stand-in for S3JsonStore, shared by the processes of one node.
+    Conditional writes are serialized by a lock file.
+    """
+
+    def __init__(self, root_dir: str = LEASE_LOCAL_DIR) -> None:
+        self.root_dir = root_dir
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root_dir, *f"{name}.json".split("/"))
+
+    def _read_unlocked(self, name: str) -> Optional[Tuple[dict, str]]:
+        try:
+            with open(self._path(name=name), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        return json.loads(body), hashlib.sha256(body).hexdigest()
+
+    def read(self, name: str) -> Optional[Tuple[dict, str]]:
+        return self._read_unlocked(name=name)
+
+    def put_if(self, name: str, body: dict, version: Optional[str]) -> Optional[str]:
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(os.path.join(self.root_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            current = self._read_unlocked(name=name)
+            current_version = None if current is None else current[1]
+            if current_version != version:
+                return None
+            data = json.dumps(body).encode("utf-8")
+            write_file_atomic(path=self._path(name=name), body=data)
+            return hashlib.sha256(data).hexdigest()
+
+
+JsonStore = Union[S3JsonStore, LocalJsonStore]
+
+
+def get_lease_store() -> JsonStore:
+    if LEASE_STORE == "s3":
+        return S3JsonStore()
+    elif LEASE_STORE == "local":
+        return LocalJsonStore()
+    raise ValueError(f"get_lease_store: {LEASE_STORE=}, must be s3 or local")
+
+
+@dataclass
+class Lease:
+    name: str
+    owner: str
+    expires_at: float
+    version: str
+    status: str = LEASE_STATUS_LEASED
+    result: dict = field(default_factory=dict)
+
+    def to_body(self) -> dict:
+        return {
+            "owner": self.owner,
+            "expires_at": self.expires_at,
+            "status": self.status,
+            "result": self.result,
+        }
+
+
+def read_lease(store: JsonStore, name: str) -> Optional[Lease]:
+    current = store.read(name=name)
+    if current is None:
+        return None
+    body, version = current
+    return Lease(name=name, version=version, **body)
+
+
+def try_acquire_lease(
+    store: JsonStore, name: str, ttl_seconds: float, owner: str = WORKER_ID
+) -> Optional[Lease]:
+    """
+    Take the lease if nobody holds it or its holder let it expire,
+    e.g. because the holder crashed. Returns None if it is held or done.
+    """
+    current = read_lease(store=store, name=name)
+    if current is not None and (
+        current.status == LEASE_STATUS_DONE or current.expires_at > time.time()
+    ):
+        return None
+    lease = Lease(
+        name=name, owner=owner, expires_at=time.time() + ttl_seconds, version=""
+    )
+    version = store.put_if(
+        name=name,
+        body=lease.to_body(),
+        version=None if current is None else current.version,
+    )
+    if version is None:
+        # Another worker was first
+        return None
+    lease.version = version
+    return lease
+
+
+def renew_lease(store: JsonStore, lease: Lease, ttl_seconds: float) -> bool:
+    """Extend the lease. False if it was lost, i.e. it expired and was taken over."""
+    expires_at = time.time() + ttl_seconds
+    body = {**lease.to_body(), "expires_at": expires_at}
+    version = store.put_if(name=lease.name, body=body, version=lease.version)
+    if version is None:
+        return False
+    lease.expires_at = expires_at
+    lease.version = version
+    return True
+
+
+def complete_lease(store: JsonStore, lease: Lease, result: dict) -> bool:
+    """Mark the work done, so that no worker takes the lease again"""
+    body = {**lease.to_body(), "status": LEASE_STATUS_DONE, "result": result}
+    version = store.put_if(name=lease.name, body=body, version=lease.version)
+    if version is None:
+        return False
+    lease.status = LEASE_STATUS_DONE
+    lease.result = result
+    lease.version = version
+    return True
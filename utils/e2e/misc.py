@@ -1,12 +1,20 @@
+from constants import RSI_PERIOD
 from utils.derived_columns import update_close_rsi_for_ticker
 from utils.draw_charts import draw_save_candlestick_with_rsi
+from utils.e2e.pipeline import save_freshness_entries
 from utils.import_data import add_fresh_ohlc_to_ticker_data
+from utils.s3 import get_last_stored_date, make_freshness_entry
 
 
 def update_ohlc_rsi_chart(ticker: str) -> None:
     """
     Update OHLC dataframe, RSI column, and RSI chart for ticker.
     """
-    df = add_fresh_ohlc_to_ticker_data(ticker=ticker)
-    df = update_close_rsi_for_ticker(ticker=ticker, initial_ohlc_df=df)
+    bars_df = add_fresh_ohlc_to_ticker_data(ticker=ticker)
+    df = update_close_rsi_for_ticker(ticker=ticker, initial_ohlc_df=bars_df)
     draw_save_candlestick_with_rsi(df=df, ticker=ticker)
+    entry = make_freshness_entry(
+        bars_df=bars_df,
+        last_derived_date=get_last_stored_date(df=df, col_name=f"RSI_{RSI_PERIOD}"),
+    )
+    save_freshness_entries(entries={ticker: entry})
@@ -0,0 +1,281 @@
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from constants import (
+    INTRADAY_INTERVALS,
+    PIPELINE_CPU_WORKERS,
+    PIPELINE_IO_WORKERS,
+    RESAMPLED_INTERVALS,
+    RSI_PERIOD,
+)
+from utils.chart_data import ticker_array_store, ticker_bars_store
+from utils.derived_columns import (
+    INDICATORS,
+    add_fresh_rsi_values,
+    calculate_indicators,
+    get_required_columns,
+    read_rsi_df_from_s3,
+    read_rsi_state_from_s3,
+    save_fresh_rsi_values,
+    save_indicators_for_ticker,
+    update_resampled_bars_for_ticker,
+)
+from utils.draw_charts import (
+    draw_save_candlestick_with_rsi,
+    get_chart_renderer,
+    shutdown_chart_renderer,
+)
+from utils.import_data import (
+    add_fresh_ohlc_to_ticker_data,
+    import_yahoo_fin_daily_batch,
+    shutdown_provider_executors,
+    update_intraday_bars_for_ticker,
+    validate_ohlc_bars,
+)
+from utils.logging import execute_and_log, get_app_logger
+from utils.metrics import (
+    PIPELINE_TICKER_RUNS,
+    PIPELINE_TICKER_SECONDS,
+    measure_stage,
+)
+from utils.processes import make_process_pool
+from utils.s3 import (
+    FreshnessEntry,
+    get_last_stored_date,
+    make_freshness_entry,
+    update_freshness_manifest,
+)
+from utils.schema import normalize_date_index
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_cpu_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_pipeline_executors() -> Tuple[ThreadPoolExecutor, ProcessPoolExecutor]:
+    """
+    Long-lived I/O thread pool and CPU process pool shared by the app,
+    so that the processes are not started again for every job.
+    """
+    global _io_executor, _cpu_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=PIPELINE_IO_WORKERS, thread_name_prefix="pipeline_io"
+        )
+    if _cpu_executor is None:
+        _cpu_executor = make_process_pool(max_workers=PIPELINE_CPU_WORKERS)
+    return _io_executor, _cpu_executor
+
+
+def shutdown_pipeline_executors() -> None:
+    global _io_executor, _cpu_executor
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=False, cancel_futures=True)
+        _io_executor = None
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+    shutdown_chart_renderer()
+    shutdown_provider_executors()
+
+
+def save_freshness_entries(entries: Dict[str, FreshnessEntry]) -> None:
+    """
+    Write the entries of the updated tickers to the freshness manifest at once.
+    A failure is logged: the data are written, the tickers only look stale
+    and are run again by the next update.
+    """
+    if not entries:
+        return
+    try:
+        execute_and_log(func=update_freshness_manifest, params={"entries": entries})
+    except Exception as e:
+        get_app_logger().error(
+            f"save_freshness_entries - {list(entries)} not marked fresh: {e}"
+        )
+
+
+def _run_ticker_stages(
+    ticker: str, cpu_executor: Executor, new_data: Optional[pd.DataFrame]
+) -> FreshnessEntry:
+    df = add_fresh_ohlc_to_ticker_data(ticker=ticker, new_data=new_data)
+    with measure_stage(stage="s3_read", ticker=ticker):
+        rsi_df = read_rsi_df_from_s3(ticker=ticker)
+        rsi_state = read_rsi_state_from_s3(ticker=ticker)
+    with measure_stage(stage="rsi", ticker=ticker):
+        rsi_res, changed, rsi_state = add_fresh_rsi_values(
+            close_df=df[["Close"]],
+            rsi_df=rsi_df,
+            rsi_state=rsi_state,
+            executor=cpu_executor,
+        )
+    if changed:
+        with measure_stage(stage="s3_write", ticker=ticker):
+            save_fresh_rsi_values(
+                ticker=ticker,
+                rsi_res=rsi_res,
+                stored_rsi_df=rsi_df,
+                rsi_state=rsi_state,
+            )
+    with measure_stage(stage="indicators", ticker=ticker):
+        indicators = dict(INDICATORS)
+        # Only the columns the indicators need are sent to the process
+        indicators_df = cpu_executor.submit(
+            calculate_indicators,
+            df[get_required_columns(columns=list(indicators))],
+            indicators,
+        ).result()
+    with measure_stage(stage="s3_write", ticker=ticker):
+        save_indicators_for_ticker(ticker=ticker, indicators_df=indicators_df)
+    # Higher intervals come from the daily bars in memory, without downloads
+    for interval in RESAMPLED_INTERVALS:
+        with measure_stage(stage="resample", ticker=ticker):
+            update_resampled_bars_for_ticker(
+                ticker=ticker, daily_df=df, interval=interval
+            )
+    for interval in INTRADAY_INTERVALS:
+        update_intraday_bars_for_ticker(ticker=ticker, interval=interval)
+    chart_df = normalize_date_index(df=df).join(rsi_res, how="left")
+    # The chart data and bars APIs must not serve the arrays loaded before the update
+    ticker_array_store.invalidate(ticker=ticker)
+    ticker_bars_store.invalidate(ticker=ticker)
+    with measure_stage(stage="chart", ticker=ticker):
+        draw_save_candlestick_with_rsi(
+            df=chart_df, ticker=ticker, renderer=get_chart_renderer()
+        )
+    # Last, so that a ticker is fresh only once all of its writes succeeded
+    return make_freshness_entry(
+        bars_df=df,
+        last_derived_date=get_last_stored_date(
+            df=rsi_res, col_name=f"RSI_{RSI_PERIOD}"
+        ),
+    )
+
+
+def run_ticker_pipeline(
+    ticker: str, cpu_executor: Executor, new_data: Optional[pd.DataFrame] = None
+) -> FreshnessEntry:
+    """
+    Fetch -> S3 merge -> RSI -> indicators -> resampled and intraday bars
+    -> chart for one ticker.
+    Runs in an I/O worker thread; the CPU-heavy RSI and indicators stages
+    are handed over to cpu_executor as soon as their inputs are ready,
+    RSI with only the new Close prices and its saved state,
+    and the chart is rendered by the long-lived chart renderer pool
+    only if its data have changed.
+    new_data are pre-fetched fresh bars, if any.
+    Every stage is timed, see utils.metrics.
+    Returns the freshness entry of the ticker, the caller writes it to
+    the manifest with the entries of the other tickers it runs,
+    see save_freshness_entries.
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        res = _run_ticker_stages(
+            ticker=ticker, cpu_executor=cpu_executor, new_data=new_data
+        )
+        status = "ok"
+        return res
+    finally:
+        PIPELINE_TICKER_RUNS.labels(ticker=ticker, status=status).inc()
+        PIPELINE_TICKER_SECONDS.labels(ticker=ticker).set(time.perf_counter() - start)
+
+
+def _run_ticker_pipeline_logged(
+    ticker: str, cpu_executor: Executor, new_data: Optional[pd.DataFrame]
+) -> FreshnessEntry:
+    app_logger = get_app_logger()
+    app_logger.info(f"run_pipeline_for_tickers - {ticker=} - starting")
+    res = run_ticker_pipeline(
+        ticker=ticker, cpu_executor=cpu_executor, new_data=new_data
+    )
+    app_logger.info(f"run_pipeline_for_tickers - {ticker=} - finished OK")
+    return res
+
+
+def prefetch_fresh_bars(tickers: List[str], last_date: date) -> Dict[str, pd.DataFrame]:
+    """
+    Fresh bars of the tickers since last_date, the earliest last stored date
+    of them, downloaded with batched multi-symbol requests.
+    Tickers without valid bars are absent, they are downloaded one by one
+    by their pipeline. A failed download is logged and gives no bars.
+    """
+    app_logger = get_app_logger()
+    try:
+        batch = import_yahoo_fin_daily_batch(tickers=tickers, last_date=last_date)
+    except Exception as e:
+        app_logger.error(
+            f"prefetch_fresh_bars - batch download failed: {e}", exc_info=True
+        )
+        return dict()
+    res = dict()
+    for ticker, ticker_df in batch.items():
+        try:
+            res[ticker] = validate_ohlc_bars(df=ticker_df, ticker=ticker)
+        except ValueError as e:
+            app_logger.warning(f"prefetch_fresh_bars - {e}")
+    return res
+
+
+def run_pipeline_for_tickers(
+    tickers: List[str],
+    io_workers: int = PIPELINE_IO_WORKERS,
+    cpu_workers: int = PIPELINE_CPU_WORKERS,
+    batch_download_since: Optional[date] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    Run the update pipeline for many tickers at once.
+    Every ticker gets its own I/O thread, at most io_workers at a time,
+    the RSI and indicators stages share a pool of cpu_workers processes
+    and the charts are rendered by the long-lived chart renderer pool.
+    A failure of one ticker is logged and does not stop the others.
+    If batch_download_since is given, fresh bars since that date are
+    downloaded for all tickers with batched multi-symbol requests first.
+    Tickers whose stored data end before it are downloaded one by one.
+    The updated tickers are written to the freshness manifest at once at the end.
+
+    Returns:
+        Dict[str, Optional[str]]: ticker -> error message, None if OK.
+    """
+    app_logger = get_app_logger()
+    res: Dict[str, Optional[str]] = dict()
+    entries: Dict[str, FreshnessEntry] = dict()
+    prefetched: Dict[str, pd.DataFrame] = dict()
+    if batch_download_since is not None:
+        prefetched = prefetch_fresh_bars(
+            tickers=tickers, last_date=batch_download_since
+        )
+    with make_process_pool(max_workers=cpu_workers) as cpu_executor, ThreadPoolExecutor(
+        max_workers=io_workers, thread_name_prefix="pipeline_io"
+    ) as io_executor:
+        futures = {
+            io_executor.submit(
+                _run_ticker_pipeline_logged,
+                ticker,
+                cpu_executor,
+                prefetched.get(ticker.upper()),
+            ): ticker
+            for ticker in tickers
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                entries[ticker] = future.result()
+                res[ticker] = None
+            except Exception as e:
+                app_logger.error(
+                    f"run_pipeline_for_tickers - {ticker=} - failed: {e}",
+                    exc_info=True,
+                )
+                res[ticker] = str(e)
+    save_freshness_entries(entries=entries)
+    return res
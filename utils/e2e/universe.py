@@ -0,0 +1,110 @@
+import random
+from typing import List, Optional, Tuple
+
+from constants import (
+    LEASE_TTL_SECONDS,
+    S3_BUCKET,
+    S3_FOLDER_DATASET,
+    UNIVERSE_FILE,
+    UNIVERSE_SHARD_SIZE,
+    UNIVERSE_SOURCE,
+    UNIVERSE_TICKERS,
+)
+from utils.e2e.leases import (
+    LEASE_STATUS_DONE,
+    WORKER_ID,
+    JsonStore,
+    Lease,
+    read_lease,
+    try_acquire_lease,
+)
+from utils.s3 import s3_client
+
+
+def _list_dataset_tickers() -> List[str]:
+    res = list()
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=S3_BUCKET, Prefix=S3_FOLDER_DATASET, Delimiter="/"
+    ):
+        for common_prefix in page.get("CommonPrefixes", []):
+            res.append(common_prefix["Prefix"][len(S3_FOLDER_DATASET) :].rstrip("/"))
+    return res
+
+
+def load_universe(source: str = UNIVERSE_SOURCE) -> List[str]:
+    """
+    Tickers of the daily update, sorted and without duplicates.
+    static: UNIVERSE_TICKERS, file: UNIVERSE_FILE with one ticker per line
+    and # comments, s3: every ticker of the dataset folder.
+    """
+    if source == "static":
+        tickers = UNIVERSE_TICKERS
+    elif source == "file":
+        with open(UNIVERSE_FILE) as f:
+            tickers = [line.split("#")[0].strip() for line in f]
+    elif source == "s3":
+        tickers = _list_dataset_tickers()
+    else:
+        raise ValueError(f"load_universe: {source=}, must be static, file or s3")
+    return sorted({ticker.upper() for ticker in tickers if ticker})
+
+
+def _get_manifest_name(run_id: str) -> str:
+    return f"runs/{run_id}/manifest"
+
+
+def get_shard_lease_name(run_id: str, shard_index: int) -> str:
+    return f"runs/{run_id}/shard_{shard_index:05d}"
+
+
+def get_universe_shards(
+    store: JsonStore, run_id: str, tickers: Optional[List[str]] = None
+) -> List[List[str]]:
+    """
+    Shards of the run. The first worker of the run splits tickers,
+    the universe by default, and saves the shards, the others read them,
+    so that all workers split the same tickers the same way
+    even if the universe changes meanwhile.
+    """
+    manifest_name = _get_manifest_name(run_id=run_id)
+    current = store.read(name=manifest_name)
+    if current is None:
+        if tickers is None:
+            tickers = load_universe()
+        shards = [
+            tickers[i : i + UNIVERSE_SHARD_SIZE]
+            for i in range(0, len(tickers), UNIVERSE_SHARD_SIZE)
+        ]
+        if store.put_if(name=manifest_name, body={"shards": shards}, version=None):
+            return shards
+        # Another worker saved its manifest first
+        current = store.read(name=manifest_name)
+    return current[0]["shards"]  # type: ignore
+
+
+def acquire_next_shard(
+    store: JsonStore, run_id: str, shards_count: int, owner: str = WORKER_ID
+) -> Tuple[Optional[int], Optional[Lease], bool]:
+    """
+    Lease the first free shard, looking from a random one so that
+    workers starting together do not race for the same shards.
+    Shards whose holder let the lease expire are free again.
+    Returns the shard index and its lease, or None, None and whether
+    all shards are done.
+    """
+    all_done = True
+    start = random.randrange(shards_count) if shards_count else 0
+    for i in range(shards_count):
+        shard_index = (start + i) % shards_count
+        name = get_shard_lease_name(run_id=run_id, shard_index=shard_index)
+        current = read_lease(store=store, name=name)
+        if current is not None and current.status == LEASE_STATUS_DONE:
+            continue
+        all_done = False
+        lease = try_acquire_lease(
+            store=store, name=name, ttl_seconds=LEASE_TTL_SECONDS, owner=owner
+        )
+        if lease is not None:
+            return shard_index, lease, False
+    return None, None, all_done
@@ -0,0 +1,15 @@
+import os
+import threading
+
+
+def write_file_atomic(path: str, body: bytes) -> None:
+    """
+    Write body to path through a temporary file next to it, so that readers
+    in other threads and processes see the old or the new file, never a part.
+    Creates the directory of path if needed.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, path)
@@ -1,3 +1,24 @@
 from .alpha_vantage import import_alpha_vantage_daily
-from .misc import add_fresh_ohlc_to_main_data, add_fresh_ohlc_to_ticker_data
-from .yahoo_fin import get_ohlc_from_yf, import_yahoo_fin_daily
+from .misc import (
+    add_fresh_ohlc_to_main_data,
+    add_fresh_ohlc_to_ticker_data,
+    update_intraday_bars_for_ticker,
+)
+from .providers import (
+    OHLC_PROVIDER_REGISTRY,
+    CircuitBreaker,
+    LatencyTracker,
+    OhlcProvider,
+    fetch_ohlc,
+    reconcile_ohlc_bars,
+    register_ohlc_provider,
+    shutdown_provider_executors,
+    validate_ohlc_bars,
+)
+from .yahoo_fin import (
+    get_ohlc_from_yf,
+    get_ohlc_from_yf_batch,
+    import_yahoo_fin_daily,
+    import_yahoo_fin_daily_batch,
+    import_yahoo_fin_intraday,
+)
@@ -1,52 +1,177 @@
+import hashlib
+import json
 import os
+import threading
+import time
+from datetime import date
+from operator import itemgetter
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from constants import OHLC_REQUIRED_COLUMNS
+from constants import (
+    ALPHA_VANTAGE_CACHE_DIR,
+    ALPHA_VANTAGE_CACHE_TTL_SECONDS,
+    ALPHA_VANTAGE_COMPACT_BARS,
+    ALPHA_VANTAGE_REQUESTS_PER_MINUTE,
+    ALPHA_VANTAGE_TIMEOUT_SECONDS,
+    OHLC_REQUIRED_COLUMNS,
+)
+from utils.files import write_file_atomic
+from utils.import_data.rate_limit import SlidingWindowLimiter
+from utils.schema import to_date_index
 
 load_dotenv(".env")
 ALPHA_VANTAGE_API_KEY = os.environ.get("alpha_vantage_key")
+# Overridden to point the client to a local HTTP stub
+ALPHA_VANTAGE_BASE_URL = os.environ.get(
+    "alpha_vantage_base_url", "https://www.alphavantage.co/query"
+)
+A_V_OHLC_KEYS = ("1. open", "2. high", "3. low", "4. close", "5. volume")
 
+# The quota may be spent at once, but never more than it in any minute
+alpha_vantage_limiter = SlidingWindowLimiter(
+    max_calls=ALPHA_VANTAGE_REQUESTS_PER_MINUTE, period=60.0
+)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
 
-def get_daily_raw_from_alpha_vantage(ticker: str) -> dict:
+
+def get_alpha_vantage_session() -> requests.Session:
+    """
+    HTTP session reused by all requests, so that connections are kept alive.
+    Connection errors, 429 and 5xx responses are retried with backoff.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=3,
+                    backoff_factor=1.0,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["GET"],
+                )
+                session = requests.Session()
+                session.mount("http://", HTTPAdapter(max_retries=retry))
+                session.mount("https://", HTTPAdapter(max_retries=retry))
+                _session = session
+    return _session
+
+
+def _get_cache_path(params: dict) -> Optional[str]:
+    if ALPHA_VANTAGE_CACHE_DIR is None:
+        return None
+    # The API key is left out, the data does not depend on it
+    query = json.dumps(
+        {k: v for k, v in params.items() if k != "apikey"}, sort_keys=True
+    )
+    name = hashlib.sha256(query.encode("utf-8")).hexdigest()
+    return os.path.join(ALPHA_VANTAGE_CACHE_DIR, f"{name}.json")
+
+
+def _read_cached_response(path: Optional[str]) -> Optional[dict]:
+    if path is None:
+        return None
+    try:
+        if time.time() - os.stat(path).st_mtime > ALPHA_VANTAGE_CACHE_TTL_SECONDS:
+            return None
+        with open(path, "rb") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_cached_response(path: Optional[str], body: bytes) -> None:
+    if path is None:
+        return
+    write_file_atomic(path=path, body=body)
+
+
+def query_alpha_vantage(params: dict, use_cache: bool = True) -> dict:
+    """
+    GET the Alpha Vantage API within the rate limit of the API key.
+    Raises RuntimeError if the API answers with an error or a rate limit note,
+    which come with status 200. Only successful responses are cached.
+    """
+    params = {**params, "apikey": ALPHA_VANTAGE_API_KEY}
+    cache_path = _get_cache_path(params=params) if use_cache else None
+    res = _read_cached_response(path=cache_path)
+    if res is not None:
+        return res
+    alpha_vantage_limiter.acquire()
+    response = get_alpha_vantage_session().get(
+        ALPHA_VANTAGE_BASE_URL, params=params, timeout=ALPHA_VANTAGE_TIMEOUT_SECONDS
+    )
+    response.raise_for_status()
+    res = response.json()
+    for error_key in ["Error Message", "Note", "Information"]:
+        if error_key in res:
+            function, symbol = params.get("function"), params.get("symbol")
+            raise RuntimeError(
+                f"query_alpha_vantage: {function=}, {symbol=} - {res[error_key]}"
+            )
+    _write_cached_response(path=cache_path, body=response.content)
+    return res
+
+
+def get_alpha_vantage_outputsize(last_date: Optional[date]) -> str:
+    """compact if the last ALPHA_VANTAGE_COMPACT_BARS bars cover the missing ones"""
+    if last_date is None:
+        return "full"
+    missing_days = np.busday_count(last_date, pd.Timestamp("today").date())
+    return "compact" if missing_days < ALPHA_VANTAGE_COMPACT_BARS else "full"
+
+
+def get_daily_raw_from_alpha_vantage(
+    ticker: str, outputsize: str = "full", use_cache: bool = True
+) -> dict:
     # NOTE Currently, the last returned row is for yesterday
-    url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={ticker}&apikey={ALPHA_VANTAGE_API_KEY}&outputsize=full"
-    return requests.get(url).json()
-
-
-def _rename_alpha_vantage_df_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.rename(
-        columns={
-            "1. open": "Open",
-            "2. high": "High",
-            "3. low": "Low",
-            "4. close": "Close",
-            "5. volume": "Volume",
-        }
+    if outputsize not in ["compact", "full"]:
+        raise ValueError(
+            f"get_daily_raw_from_alpha_vantage: {outputsize=}, must be compact or full"
+        )
+    return query_alpha_vantage(
+        params={
+            "function": "TIME_SERIES_DAILY",
+            "symbol": ticker,
+            "outputsize": outputsize,
+        },
+        use_cache=use_cache,
     )
-    df["Open"] = df["Open"].astype(float)
-    df["High"] = df["High"].astype(float)
-    df["Low"] = df["Low"].astype(float)
-    df["Close"] = df["Close"].astype(float)
-    df["Volume"] = df["Volume"].astype(int)
-    return df
 
 
 def transform_a_v_raw_data_to_df(data: dict, key_name: str) -> pd.DataFrame:
     """
-    Transform alpha vantage raw data to OHLC pd.DataFrame
+    Transform alpha vantage raw data to OHLC pd.DataFrame.
+    The bar values are strings, they are parsed to floats in one pass.
     """
     if key_name not in data:
         raise ValueError(
             f"transform_a_v_raw_data_to_df: no key {key_name} in input data dict"
         )
-    df = pd.DataFrame.from_dict(data[key_name]).transpose()
-    df.index = pd.to_datetime(df.index)
-    df.index = df.index.date
-    df = df.sort_index()
-    return _rename_alpha_vantage_df_columns(df)
+    series = data[key_name]
+    values = np.array(
+        list(map(itemgetter(*A_V_OHLC_KEYS), series.values())), dtype=np.float64
+    )
+    values = values.reshape(-1, len(A_V_OHLC_KEYS))
+    dates = pd.to_datetime(np.array(list(series.keys()), dtype="datetime64[D]"))
+    order = np.argsort(dates.values, kind="stable")
+    return pd.DataFrame(
+        {
+            "Open": values[order, 0],
+            "High": values[order, 1],
+            "Low": values[order, 2],
+            "Close": values[order, 3],
+            "Volume": values[order, 4].astype(np.int64),
+        },
+        index=to_date_index(dates[order]),
+    )
 
 
 def _check_imported_data(df: pd.DataFrame, ticker: str, data_type: str) -> None:
@@ -63,21 +188,30 @@ def _check_imported_data(df: pd.DataFrame, ticker: str, data_type: str) -> None:
         if col_name not in df_columns:
             error_msg = f"In _check_imported_data ({ticker=}, {data_type=}): column {col_name} absent in pd.DataFrame columns: {set(df.columns.values)}"
             raise ValueError(error_msg)
-    all_columns_numeric = df.apply(
-        lambda s: pd.to_numeric(s, errors="coerce").notnull().all()
-    ).all()
-    if not all_columns_numeric:
+    # Columns parsed by transform_a_v_raw_data_to_df are numeric already
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+        numeric_df = df
+    else:
+        numeric_df = df.apply(pd.to_numeric, errors="coerce")
+    if not numeric_df.notnull().all().all():
         raise ValueError(
             f"In _check_imported_data ({ticker=}, {data_type=}): not all pd.DataFrame columns numeric"
         )
 
 
-def import_alpha_vantage_daily(ticker: str) -> pd.DataFrame:
-    raw_data_daily: dict = get_daily_raw_from_alpha_vantage(ticker=ticker)
+def import_alpha_vantage_daily(
+    ticker: str, last_date: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Import daily bars for ticker. If last_date is given and only recent bars
+    are missing, only the last ALPHA_VANTAGE_COMPACT_BARS bars are requested
+    instead of the full history.
+    """
+    raw_data_daily: dict = get_daily_raw_from_alpha_vantage(
+        ticker=ticker, outputsize=get_alpha_vantage_outputsize(last_date=last_date)
+    )
     data_daily: pd.DataFrame = transform_a_v_raw_data_to_df(
         data=raw_data_daily, key_name="Time Series (Daily)"
     )
     _check_imported_data(df=data_daily, ticker=ticker, data_type="Daily")
-    for col in data_daily.columns:
-        data_daily[col] = pd.to_numeric(data_daily[col])
     return data_daily[["Open", "High", "Low", "Close", "Volume"]]
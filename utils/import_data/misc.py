@@ -1,34 +1,118 @@
+from typing import Optional
+
 import pandas as pd
 
-from utils.import_data.yahoo_fin import import_yahoo_fin_daily
+from constants import INTRADAY_RETENTION_DAYS
+from utils.import_data.providers import fetch_ohlc
+from utils.import_data.yahoo_fin import import_yahoo_fin_intraday
 from utils.logging import execute_and_log
-from utils.s3 import read_daily_ohlc_from_s3, write_df_to_s3_csv
+from utils.metrics import measure_stage
+from utils.s3 import (
+    BARS_GROUP,
+    get_last_stored_date,
+    read_daily_ohlc_from_s3,
+    read_dataset_group,
+    write_dataset_group,
+)
+from utils.schema import normalize_date_index
 
 
 def add_fresh_ohlc_to_main_data(
     main_df: pd.DataFrame, new_data: pd.DataFrame
 ) -> pd.DataFrame:
-    if not main_df.empty:
-        res = pd.concat([main_df, new_data[new_data.index > main_df.index.max()]])
-    else:
-        res = pd.concat([main_df, new_data])
-    res.index = pd.to_datetime(res.index)
-    res = res.sort_index()
+    new_data = normalize_date_index(df=new_data)
+    if main_df.empty:
+        return new_data
+    main_df = normalize_date_index(df=main_df)
+    return pd.concat([main_df, new_data[new_data.index > main_df.index[-1]]])
+
+
+def add_fresh_ohlc_to_ticker_data(
+    ticker: str, new_data: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Add fresh rows to the OHLC data for ticker and save them
+    as the bars of the ticker dataset in S3 bucket.
+    Only the bars after the last stored date are downloaded, from the first
+    provider of fetch_ohlc that answers, and written.
+    new_data, e.g. from a batched download, is used instead of downloading
+    if it connects to the stored data without a gap.
+    """
+    with measure_stage(stage="s3_read", ticker=ticker):
+        main_df = read_dataset_group(ticker=ticker, group=BARS_GROUP)
+        last_stored_date = get_last_stored_date(df=main_df)
+        if main_df is None:
+            # The ticker is not in the dataset yet, start from the old OHLC folder
+            main_df = read_daily_ohlc_from_s3(ticker=ticker)
+    last_date = get_last_stored_date(df=main_df)
+    if new_data is not None and (
+        new_data.empty
+        or last_date is None
+        or new_data.index.min() > pd.Timestamp(last_date)
+    ):
+        new_data = None
+    if new_data is None:
+        with measure_stage(stage="fetch", ticker=ticker):
+            new_data = fetch_ohlc(ticker=ticker, last_date=last_date)
+
+    with measure_stage(stage="merge", ticker=ticker):
+        if main_df is not None and not main_df.empty:
+            res = add_fresh_ohlc_to_main_data(main_df=main_df, new_data=new_data)
+        else:
+            res = new_data
+    with measure_stage(stage="s3_write", ticker=ticker):
+        execute_and_log(
+            func=write_dataset_group,
+            params={
+                "ticker": ticker,
+                "group": BARS_GROUP,
+                "df": res,
+                "last_stored_date": last_stored_date,
+            },
+        )
     return res
 
 
-def add_fresh_ohlc_to_ticker_data(ticker: str) -> pd.DataFrame:
+def update_intraday_bars_for_ticker(ticker: str, interval: str) -> pd.DataFrame:
     """
-    Add fresh rows to the OHLC data for ticker and save OHLC DF in S3 bucket.
+    Download the intraday bars of interval after the stored ones and save them
+    in the interval part of the ticker dataset.
+    Bars older than INTRADAY_RETENTION_DAYS are dropped, which rewrites
+    the whole group; otherwise only the new bars are written.
     """
-    new_data = import_yahoo_fin_daily(ticker=ticker)
-    main_df = read_daily_ohlc_from_s3(ticker=ticker)
+    with measure_stage(stage="s3_read", ticker=ticker):
+        main_df = read_dataset_group(ticker=ticker, group=BARS_GROUP, interval=interval)
+    last_time = None
     if main_df is not None and not main_df.empty:
-        res = add_fresh_ohlc_to_main_data(main_df=main_df, new_data=new_data)
-    else:
-        res = new_data
-    s3_filename = f"{ticker}.csv"
-    execute_and_log(
-        func=write_df_to_s3_csv, params={"df": res, "filename": s3_filename}
-    )
+        last_time = main_df.index.max()
+    with measure_stage(stage="fetch", ticker=ticker):
+        new_data = import_yahoo_fin_intraday(
+            ticker=ticker, interval=interval, last_time=last_time
+        )
+    with measure_stage(stage="merge", ticker=ticker):
+        if last_time is not None:
+            res = pd.concat([main_df, new_data[new_data.index > last_time]])
+        else:
+            res = new_data
+        oldest_kept = pd.Timestamp.now(tz="UTC").tz_localize(None) - pd.Timedelta(
+            days=INTRADAY_RETENTION_DAYS
+        )
+        if not res.empty and res.index[0] < oldest_kept:
+            res = res[res.index >= oldest_kept]
+            last_time = None
+    if res.empty:
+        raise RuntimeError(
+            f"update_intraday_bars_for_ticker: no bars in retention for {ticker=}, {interval=}"
+        )
+    with measure_stage(stage="s3_write", ticker=ticker):
+        execute_and_log(
+            func=write_dataset_group,
+            params={
+                "ticker": ticker,
+                "group": BARS_GROUP,
+                "df": res,
+                "last_stored_date": last_time,
+                "interval": interval,
+            },
+        )
     return res
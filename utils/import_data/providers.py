@@ -0,0 +1,418 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from constants import (
+    OHLC_PROVIDERS,
+    PIPELINE_IO_WORKERS,
+    PROVIDER_BREAKER_FAILURES,
+    PROVIDER_BREAKER_RESET_SECONDS,
+    PROVIDER_HEDGE_QUANTILE,
+    PROVIDER_LATENCY_MIN_SAMPLES,
+    PROVIDER_LATENCY_WINDOW,
+    PROVIDER_RECONCILE_TOLERANCE,
+    PROVIDER_TIMEOUT_SECONDS,
+)
+from utils.import_data.alpha_vantage import (
+    ALPHA_VANTAGE_API_KEY,
+    ALPHA_VANTAGE_REQUESTS_PER_MINUTE,
+    alpha_vantage_limiter,
+    import_alpha_vantage_daily,
+)
+from utils.import_data.yahoo_fin import import_yahoo_fin_daily
+from utils.logging import get_app_logger
+from utils.metrics import (
+    PROVIDER_BAR_MISMATCHES,
+    PROVIDER_CIRCUIT_OPEN,
+    PROVIDER_HEDGES,
+    PROVIDER_REQUESTS,
+    PROVIDER_SECONDS,
+)
+from utils.schema import normalize_ohlc_df
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass. After failure_threshold failures in a row it opens
+    and refuses calls for reset_seconds, then lets one trial call through.
+    The trial's success closes it, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight:
+                return False
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        """The allowed call was not made, e.g. it waited too long for a thread"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures = self._failures + 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Latencies of the last window calls"""
+
+    def __init__(self, window: int = PROVIDER_LATENCY_WINDOW) -> None:
+        self._values: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """None until PROVIDER_LATENCY_MIN_SAMPLES latencies are known"""
+        with self._lock:
+            if len(self._values) < PROVIDER_LATENCY_MIN_SAMPLES:
+                return None
+            values = list(self._values)
+        return float(np.quantile(values, q))
+
+
+def _always_available() -> bool:
+    return True
+
+
+@dataclass
+class OhlcProvider:
+    """
+    fetch(ticker, last_date) returns daily bars, the recent ones if last_date is given.
+    Requests run in the max_workers threads of the provider, so that a slow
+    or rate-limited provider does not hold the threads of the others.
+    is_available() is False when a request could not start at once,
+    e.g. the quota of the minute is spent, then no hedged request is sent.
+    """
+
+    name: str
+    fetch: Callable[[str, Optional[date]], pd.DataFrame]
+    timeout_seconds: float = PROVIDER_TIMEOUT_SECONDS
+    max_workers: int = 2 * PIPELINE_IO_WORKERS
+    is_available: Callable[[], bool] = _always_available
+    breaker: CircuitBreaker = field(
+        default_factory=lambda: CircuitBreaker(
+            failure_threshold=PROVIDER_BREAKER_FAILURES,
+            reset_seconds=PROVIDER_BREAKER_RESET_SECONDS,
+        )
+    )
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+    _executor: Optional[ThreadPoolExecutor] = field(default=None, repr=False)
+    _executor_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """
+        Threads of the requests of the provider. A timed out request keeps
+        its thread until it returns, so the default is two per pipeline I/O thread.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"ohlc_{self.name}",
+                    )
+        return self._executor
+
+    def shutdown_executor(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def get_hedge_delay(self) -> Optional[float]:
+        """None until the latencies of enough incremental requests are known"""
+        res = self.latency.quantile(PROVIDER_HEDGE_QUANTILE)
+        return None if res is None else min(res, self.timeout_seconds)
+
+    def record_result(self, result: str) -> None:
+        PROVIDER_REQUESTS.labels(provider=self.name, result=result).inc()
+        if result == "ok":
+            self.breaker.record_success()
+        elif result == "busy":
+            self.breaker.record_cancelled()
+        else:
+            self.breaker.record_failure()
+        PROVIDER_CIRCUIT_OPEN.labels(provider=self.name).set(int(self.breaker.is_open))
+
+
+OHLC_PROVIDER_REGISTRY: Dict[str, OhlcProvider] = dict()
+
+
+def register_ohlc_provider(
+    name: str,
+    fetch: Callable[[str, Optional[date]], pd.DataFrame],
+    timeout_seconds: float = PROVIDER_TIMEOUT_SECONDS,
+    max_workers: int = 2 * PIPELINE_IO_WORKERS,
+    is_available: Callable[[], bool] = _always_available,
+) -> OhlcProvider:
+    """Add or replace the provider of the name, see OhlcProvider"""
+    previous = OHLC_PROVIDER_REGISTRY.get(name)
+    if previous is not None:
+        previous.shutdown_executor()
+    provider = OhlcProvider(
+        name=name,
+        fetch=fetch,
+        timeout_seconds=timeout_seconds,
+        max_workers=max_workers,
+        is_available=is_available,
+    )
+    OHLC_PROVIDER_REGISTRY[name] = provider
+    return provider
+
+
+def _register_default_providers() -> None:
+    register_ohlc_provider(
+        "yahoo",
+        lambda ticker, last_date: import_yahoo_fin_daily(
+            ticker=ticker, last_date=last_date
+        ),
+    )
+    if ALPHA_VANTAGE_API_KEY:
+        register_ohlc_provider(
+            "alpha_vantage",
+            lambda ticker, last_date: import_alpha_vantage_daily(
+                ticker=ticker, last_date=last_date
+            ),
+            # More threads would only wait for the quota
+            max_workers=ALPHA_VANTAGE_REQUESTS_PER_MINUTE,
+            is_available=alpha_vantage_limiter.has_capacity,
+        )
+
+
+_register_default_providers()
+
+
+def shutdown_provider_executors() -> None:
+    for provider in OHLC_PROVIDER_REGISTRY.values():
+        provider.shutdown_executor()
+
+
+def validate_ohlc_bars(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """
+    Bars in the utils.schema layout without today's unfinished bar.
+    Raises ValueError if no bars are left or prices are not positive
+    or High is below Low.
+    """
+    res = normalize_ohlc_df(df)
+    res = res[res.index < pd.Timestamp("today").normalize()]
+    if res.empty:
+        raise ValueError(f"validate_ohlc_bars: no finished bars for {ticker=}")
+    prices = res[["Open", "High", "Low", "Close"]].to_numpy()
+    if not (np.isfinite(prices).all() and (prices > 0).all()):
+        raise ValueError(f"validate_ohlc_bars: non-positive or NaN prices, {ticker=}")
+    if (res["High"] < res["Low"]).any():
+        raise ValueError(f"validate_ohlc_bars: High < Low, {ticker=}")
+    return res
+
+
+def reconcile_ohlc_bars(
+    df: pd.DataFrame, other: pd.DataFrame, provider: str, ticker: str
+) -> int:
+    """
+    Compare the Close of the dates both providers returned.
+    Returns the number of dates whose Close differs beyond
+    PROVIDER_RECONCILE_TOLERANCE, they are logged and counted.
+    """
+    close, other_close = df["Close"].align(other["Close"], join="inner")
+    if close.empty:
+        return 0
+    diff = (other_close - close).abs() / close
+    mismatches = diff[diff > PROVIDER_RECONCILE_TOLERANCE]
+    if not mismatches.empty:
+        PROVIDER_BAR_MISMATCHES.labels(provider=provider).inc(len(mismatches))
+        get_app_logger().warning(
+            f"reconcile_ohlc_bars - {ticker=} - {provider=} - {len(mismatches)}"
+            f" of {len(close)} Close values differ, first {mismatches.index[0]:%Y-%m-%d}"
+        )
+    return len(mismatches)
+
+
+def _call_provider(
+    provider: OhlcProvider,
+    ticker: str,
+    last_date: Optional[date],
+    started: List[float],
+) -> pd.DataFrame:
+    """started gets the monotonic time the request left the queue of the provider"""
+    started.append(time.monotonic())
+    start = time.perf_counter()
+    res = provider.fetch(ticker, last_date)
+    duration = time.perf_counter() - start
+    # Full histories take longer, their latencies would delay the hedges
+    if last_date is not None:
+        provider.latency.record(duration)
+    PROVIDER_SECONDS.labels(provider=provider.name).observe(duration)
+    return res
+
+
+def _get_result(
+    future: Future, provider: OhlcProvider, ticker: str
+) -> Optional[pd.DataFrame]:
+    """Validated bars of the finished request, None if it failed"""
+    try:
+        res = validate_ohlc_bars(df=future.result(), ticker=ticker)
+    except ValueError as e:
+        provider.record_result(result="invalid")
+        get_app_logger().warning(f"fetch_ohlc - {provider.name=} - {e}")
+        return None
+    except Exception as e:
+        provider.record_result(result="error")
+        get_app_logger().warning(f"fetch_ohlc - {provider.name=} - {ticker=} - {e}")
+        return None
+    provider.record_result(result="ok")
+    return res
+
+
+def fetch_ohlc(
+    ticker: str,
+    last_date: Optional[date] = None,
+    providers: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Daily bars of the ticker from the first provider that answers with valid bars.
+
+    Providers are tried in the order of OHLC_PROVIDERS, skipping the ones whose
+    circuit breaker is open. When an incremental request takes longer than
+    the p95 latency of its provider, a hedged request goes to the next one
+    if it is available, and the first valid answer wins. A failed or timed out
+    request is replaced by the next provider at once. The timeout counts from
+    the start of the request, a request still waiting for a thread of its
+    provider after a whole timeout is cancelled without tripping the breaker.
+    The answers that come later are reconciled with the winner in the background.
+    Raises RuntimeError if every provider failed.
+    """
+    names = OHLC_PROVIDERS if providers is None else providers
+    candidates = [
+        OHLC_PROVIDER_REGISTRY[name] for name in names if name in OHLC_PROVIDER_REGISTRY
+    ]
+    pending: Dict[Future, OhlcProvider] = dict()
+    started: Dict[Future, List[float]] = dict()
+    deadlines: Dict[Future, float] = dict()
+    errors: Dict[str, str] = dict()
+    next_index = 0
+    hedge_at = float("inf")
+
+    def _submit_next(reason: Optional[str]) -> None:
+        nonlocal next_index, hedge_at
+        hedge_at = float("inf")
+        while next_index < len(candidates):
+            provider = candidates[next_index]
+            if reason == "slow" and not provider.is_available():
+                # The hedge would wait, the current request may still answer first
+                return
+            next_index = next_index + 1
+            if not provider.breaker.allow():
+                errors[provider.name] = "circuit open"
+                continue
+            if reason is not None:
+                PROVIDER_HEDGES.labels(provider=provider.name, reason=reason).inc()
+            started_at: List[float] = list()
+            future = provider.get_executor().submit(
+                _call_provider, provider, ticker, last_date, started_at
+            )
+            pending[future] = provider
+            started[future] = started_at
+            deadlines[future] = time.monotonic() + provider.timeout_seconds
+            hedge_delay = provider.get_hedge_delay()
+            # Full histories are not hedged, they would spend the quota of the next one
+            if last_date is not None and hedge_delay is not None:
+                hedge_at = time.monotonic() + hedge_delay
+            return
+
+    def _pop(future: Future) -> OhlcProvider:
+        del deadlines[future]
+        del started[future]
+        return pending.pop(future)
+
+    _submit_next(reason=None)
+    while pending:
+        wait_until = min(min(deadlines.values()), hedge_at)
+        done, _ = wait(
+            list(pending),
+            timeout=max(0.0, wait_until - time.monotonic()),
+            return_when=FIRST_COMPLETED,
+        )
+        for future in done:
+            provider = _pop(future)
+            res = _get_result(future=future, provider=provider, ticker=ticker)
+            if res is not None:
+                for other_future, other in pending.items():
+                    other_future.add_done_callback(
+                        partial(
+                            _reconcile_late_result,
+                            provider=other,
+                            ticker=ticker,
+                            winner=res,
+                        )
+                    )
+                return res
+            errors[provider.name] = "failed"
+        now = time.monotonic()
+        for future in [f for f, deadline in deadlines.items() if deadline <= now]:
+            provider = pending[future]
+            if not started[future] and future.cancel():
+                _pop(future)
+                provider.record_result(result="busy")
+                errors[provider.name] = "busy"
+                continue
+            # The time waiting for a thread does not count
+            start = started[future][0] if started[future] else now
+            if start + provider.timeout_seconds > now:
+                deadlines[future] = start + provider.timeout_seconds
+                continue
+            _pop(future)
+            provider.record_result(result="timeout")
+            errors[provider.name] = "timeout"
+        if not pending:
+            _submit_next(reason="failover")
+        elif now >= hedge_at:
+            _submit_next(reason="slow")
+    raise RuntimeError(
+        f"fetch_ohlc: no provider returned bars for {ticker=}, {errors=}"
+    )
+
+
+def _reconcile_late_result(
+    future: Future, provider: OhlcProvider, ticker: str, winner: pd.DataFrame
+) -> None:
+    res = _get_result(future=future, provider=provider, ticker=ticker)
+    if res is not None:
+        reconcile_ohlc_bars(df=winner, other=res, provider=provider.name, ticker=ticker)
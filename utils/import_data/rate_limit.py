@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import deque
+from typing import Deque
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe limiter of at most max_calls calls in any period seconds,
+    e.g. a per-minute API quota that is never exceeded, even in bursts.
+    """
+
+    def __init__(self, max_calls: int, period: float) -> None:
+        if max_calls < 1 or period <= 0:
+            raise ValueError(
+                f"SlidingWindowLimiter: {max_calls=} must be >= 1, {period=} > 0"
+            )
+        self.max_calls = max_calls
+        self.period = period
+        # Start times of the calls of the last period, oldest first
+        self._calls: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _get_wait(self, now: float) -> float:
+        """Seconds until a call is allowed, 0 if it is now"""
+        while self._calls and self._calls[0] <= now - self.period:
+            self._calls.popleft()
+        if len(self._calls) < self.max_calls:
+            return 0.0
+        return self._calls[0] + self.period - now
+
+    def has_capacity(self) -> bool:
+        """A call would not wait now"""
+        with self._lock:
+            return self._get_wait(now=time.monotonic()) <= 0
+
+    def acquire(self) -> float:
+        """Wait until a call is allowed and count it. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._get_wait(now=now)
+                if wait <= 0:
+                    self._calls.append(now)
+                    return waited
+            time.sleep(wait)
+            waited = waited + wait
@@ -1,39 +1,170 @@
+from datetime import date
+from typing import Dict, Iterable, Optional
+
 import pandas as pd
 import yfinance as yf
 
+from constants import YF_BATCH_SIZE, YF_INCREMENTAL_OVERLAP_DAYS
+from utils.schema import normalize_ohlc_df
+
+# How far back Yahoo Finance serves bars of the intraday intervals, in days
+YF_INTRADAY_MAX_DAYS = {
+    "1m": 7,
+    "2m": 60,
+    "5m": 60,
+    "15m": 60,
+    "30m": 60,
+    "60m": 730,
+    "90m": 60,
+    "1h": 730,
+}
+
 
 def get_ohlc_from_yf(
-    ticker: str, period: str = "max", interval: str = "1d"
+    ticker: str,
+    period: str = "max",
+    interval: str = "1d",
+    start: Optional[date] = None,
 ) -> pd.DataFrame:
     """
     Get OHLC DataFrame with Volume from Yahoo Finance.
     Valid periods: 1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max.
     Valid intervals: 1m,2m,5m,15m,30m,60m,90m,1h,1d,5d,1wk,1mo,3mo
+    If start is given, period is ignored and only bars from start are requested.
     """
-    res = yf.Ticker(ticker=ticker).history(period=period, interval=interval)
+    if start is not None:
+        res = yf.Ticker(ticker=ticker).history(start=start, interval=interval)
+    else:
+        res = yf.Ticker(ticker=ticker).history(period=period, interval=interval)
 
     # NOTE  If period and interval mismatch, Yahoo Finance returns empty DataFrame.
     # A mismatch is an interval too small for a long period.
     if res.shape[0] == 0:
         raise RuntimeError(
-            f"get_ohlc_from_yf: YFin returned empty Df for {ticker=},{period=}, {interval=}"
+            f"get_ohlc_from_yf: YFin returned empty Df for {ticker=},{period=}, {interval=}, {start=}"
         )
+    return normalize_ohlc_df(res, intraday=interval in YF_INTRADAY_MAX_DAYS)
+
+
+def get_ohlc_from_yf_batch(
+    tickers: Iterable[str],
+    period: str = "max",
+    interval: str = "1d",
+    start: Optional[date] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Get OHLC DataFrames for many tickers with one multi-symbol Yahoo Finance request.
+    Tickers for which Yahoo Finance returned nothing are absent in the result.
+    """
+    tickers = [ticker.upper() for ticker in tickers]
+    kwargs: dict = {"interval": interval}
+    if start is not None:
+        kwargs["start"] = start
+    else:
+        kwargs["period"] = period
+    raw = yf.download(
+        tickers=tickers,
+        group_by="ticker",
+        auto_adjust=True,  # same as yf.Ticker.history
+        actions=False,
+        threads=True,
+        progress=False,
+        **kwargs,
+    )
+    res = dict()
+    for ticker in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(0):
+                continue
+            ticker_df = raw[ticker]
+        else:
+            ticker_df = raw
+        # Rows of the other tickers' trading days are all NaN for this ticker
+        ticker_df = ticker_df.dropna(how="all")
+        if ticker_df.shape[0] == 0:
+            continue
+        res[ticker] = normalize_ohlc_df(ticker_df)
+    return res
+
 
-    res.index = pd.to_datetime(res.index)
-    res.index = res.index.tz_convert(None)
-    res.index = res.index.date
-    res = res.sort_index()
-    return res[["Open", "High", "Low", "Close", "Volume"]]
+def _get_incremental_start(last_date: Optional[date]) -> Optional[date]:
+    """
+    Bars are requested from a few days before the last stored date,
+    so that the download overlaps the stored bars and connects to them
+    without a gap despite holidays or time zones of the dates.
+    The overlapping bars are dropped by add_fresh_ohlc_to_main_data:
+    stored bars are never rewritten, as the RSI state continues from them.
+    """
+    if last_date is None:
+        return None
+    start = pd.Timestamp(last_date) - pd.Timedelta(days=YF_INCREMENTAL_OVERLAP_DAYS)
+    return start.date()
 
 
-def import_yahoo_fin_daily(ticker: str) -> pd.DataFrame:
+def _drop_unfinished_day(res: pd.DataFrame) -> pd.DataFrame:
     """
     We don't want to have today's data because today's trading day may not be over yet.
     """
-    res = get_ohlc_from_yf(ticker=ticker, period="max", interval="1d")
-    res.index = pd.to_datetime(res.index, utc=True)
-    res.index = res.index.normalize()
-    res.index = res.index.date  # type: ignore
-    res = res.sort_index()
-    res = res[res.index < pd.to_datetime("today").date()]
+    return res[res.index < pd.Timestamp("today").normalize()]
+
+
+def import_yahoo_fin_daily(
+    ticker: str, last_date: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Import daily bars for ticker, without today's unfinished bar.
+    If last_date is given, download only the bars after it (with a small overlap)
+    instead of the full history.
+    """
+    res = get_ohlc_from_yf(
+        ticker=ticker,
+        period="max",
+        interval="1d",
+        start=_get_incremental_start(last_date=last_date),
+    )
+    return _drop_unfinished_day(res)
+
+
+def import_yahoo_fin_daily_batch(
+    tickers: Iterable[str], last_date: Optional[date] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Batched version of import_yahoo_fin_daily: one multi-symbol request
+    for every YF_BATCH_SIZE tickers. last_date must be the earliest
+    last stored date of all the tickers.
+    """
+    tickers = list(tickers)
+    start = _get_incremental_start(last_date=last_date)
+    res = dict()
+    for i in range(0, len(tickers), YF_BATCH_SIZE):
+        batch = get_ohlc_from_yf_batch(
+            tickers=tickers[i : i + YF_BATCH_SIZE], interval="1d", start=start
+        )
+        for ticker, ticker_df in batch.items():
+            res[ticker] = _drop_unfinished_day(ticker_df)
     return res
+
+
+def import_yahoo_fin_intraday(
+    ticker: str, interval: str, last_time: Optional[pd.Timestamp] = None
+) -> pd.DataFrame:
+    """
+    Import intraday bars of interval for ticker, indexed by UTC time,
+    without the bar still in progress.
+    If last_time is given, download only the bars of the days from its one on,
+    as far back as Yahoo Finance serves them.
+    """
+    if interval not in YF_INTRADAY_MAX_DAYS:
+        raise ValueError(
+            f"import_yahoo_fin_intraday: {interval=}, must be one of {list(YF_INTRADAY_MAX_DAYS)}"
+        )
+    max_days = YF_INTRADAY_MAX_DAYS[interval]
+    start = None
+    if last_time is not None:
+        earliest = pd.Timestamp("today").normalize() - pd.Timedelta(days=max_days - 1)
+        start = max(last_time.normalize(), earliest).date()
+    res = get_ohlc_from_yf(
+        ticker=ticker, period=f"{max_days}d", interval=interval, start=start
+    )
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    return res[res.index + pd.Timedelta(interval) <= now]
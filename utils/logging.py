@@ -1,16 +1,45 @@
+import atexit
+import copy
 import json
 import logging
-from datetime import datetime
+import queue
+import random
+import time
+from datetime import datetime, timezone
 from logging import Logger
 from logging.config import dictConfig
-from typing import Any, Callable
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from constants import (
+    LOG_DEBUG_SAMPLE_RATE,
+    LOG_MODE,
+    LOG_QUEUE_BLOCK_SECONDS,
+    LOG_QUEUE_MAX_SIZE,
+    LOG_QUEUE_OVERFLOW,
+)
+from utils.metrics import FUNCTION_CALL_SECONDS, LOG_RECORDS_DROPPED
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+# Longer reprs of parameters and results are cut in log messages
+LOG_VALUE_MAX_CHARS = 200
 
 
 # Custom JSON formatter
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         log_record = {
-            "timestamp": datetime.utcnow().isoformat(),
+            # Time of the call, not of formatting, which may happen later in the listener
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc)
+            .replace(tzinfo=None)
+            .isoformat(),
             "level": record.levelname,
             "module": record.module,
             "line": record.lineno,
@@ -21,7 +50,81 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_record)
+        if orjson is not None:
+            return orjson.dumps(log_record, default=str).decode("utf-8")
+        return json.dumps(log_record, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Passes only a random share of DEBUG records, all records of other levels"""
+
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE) -> None:
+        super().__init__()
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"DebugSamplingFilter: {rate=}, must be from 0 to 1")
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.rate >= 1.0:
+            return True
+        if random.random() < self.rate:
+            return True
+        LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Puts records into a bounded queue, the listener thread formats and writes them.
+    If the queue is full, overflow decides: drop_new drops the record,
+    drop_oldest drops the oldest queued record instead, block waits up to
+    block_seconds and then drops the record. Dropped records are counted
+    in the log_records_dropped_total metric.
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        overflow: str = LOG_QUEUE_OVERFLOW,
+        block_seconds: float = LOG_QUEUE_BLOCK_SECONDS,
+    ) -> None:
+        if overflow not in ["drop_new", "drop_oldest", "block"]:
+            raise ValueError(
+                f"BoundedQueueHandler: {overflow=}, must be drop_new, drop_oldest or block"
+            )
+        super().__init__(log_queue)
+        # QueueHandler types it as any object with put_nowait
+        self.queue: queue.Queue = log_queue
+        self.overflow = overflow
+        self.block_seconds = block_seconds
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Only merge the message with its args, so that later changes of the args
+        do not change the record. JSON and exception formatting is left
+        to the listener thread, unlike in QueueHandler.prepare.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.overflow == "block":
+                self.queue.put(record, timeout=self.block_seconds)
+            else:
+                self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+        LOG_RECORDS_DROPPED.labels(reason="overflow").inc()
 
 
 # Define the logging configuration
@@ -55,7 +158,60 @@ log_config = {
     },
 }
 
-dictConfig(log_config)
+_queue_listener: Optional[QueueListener] = None
+_QUEUE_LOGGER_NAMES = ["app", ""]
+
+
+def stop_queue_logging() -> None:
+    """
+    Write out the queued records and stop the listener thread.
+    The loggers get their handlers back, later records are written synchronously.
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        for name in _QUEUE_LOGGER_NAMES:
+            logging.getLogger(name).handlers = list(_queue_listener.handlers)
+        _queue_listener = None
+
+
+def _start_queue_logging() -> None:
+    """
+    Replace the handlers of the app and root loggers with one BoundedQueueHandler
+    and move the original handlers to a listener thread.
+    """
+    global _queue_listener
+    loggers = [logging.getLogger(name) for name in _QUEUE_LOGGER_NAMES]
+    handlers: List[logging.Handler] = list()
+    for logger in loggers:
+        for handler in logger.handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+    queue_handler = BoundedQueueHandler(log_queue=log_queue)
+    queue_handler.addFilter(DebugSamplingFilter())
+    for logger in loggers:
+        logger.handlers = [queue_handler]
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+
+
+def configure_logging(mode: str = LOG_MODE) -> None:
+    """
+    Apply log_config. With mode == "queue" the records are formatted and
+    written by a listener thread, so that callers, e.g. the event loop,
+    only put them into a queue. Safe to call again.
+    """
+    if mode not in ["queue", "sync"]:
+        raise ValueError(f"configure_logging: {mode=}, must be queue or sync")
+    stop_queue_logging()
+    dictConfig(log_config)
+    if mode == "queue":
+        _start_queue_logging()
+
+
+configure_logging()
+atexit.register(stop_queue_logging)
 app_logger = logging.getLogger("app")
 
 
@@ -63,10 +219,45 @@ def get_app_logger() -> Logger:
     return app_logger
 
 
+def summarize_for_log(value: Any) -> str:
+    """
+    Short description of a value for log messages: shape and date range
+    of DataFrames instead of their repr, cut reprs of everything else.
+    """
+    if isinstance(value, pd.DataFrame):
+        res = f"DataFrame(rows={len(value)}, columns={list(value.columns)}"
+        if len(value):
+            res = res + f", index={value.index[0]}..{value.index[-1]}"
+        return res + ")"
+    if isinstance(value, pd.Series):
+        res = f"Series(name={value.name}, rows={len(value)}"
+        if len(value):
+            res = res + f", index={value.index[0]}..{value.index[-1]}"
+        return res + ")"
+    if isinstance(value, np.ndarray):
+        return f"ndarray(shape={value.shape}, dtype={value.dtype})"
+    if isinstance(value, (bytes, bytearray)):
+        return f"bytes(len={len(value)})"
+    res = value if isinstance(value, str) else repr(value)
+    if len(res) > LOG_VALUE_MAX_CHARS:
+        res = res[:LOG_VALUE_MAX_CHARS] + f"... ({len(res)} chars)"
+    return res
+
+
+def summarize_params_for_log(params: dict) -> str:
+    return (
+        "{"
+        + ", ".join(f"{k!r}: {summarize_for_log(v)}" for k, v in params.items())
+        + "}"
+    )
+
+
 def execute_and_log(func: Callable, params: dict) -> Any:
     """
     Executes a given function with its parameters (passed as a dictionary of key-value pairs),
     logs the result if successful, or logs and re-raises any exceptions that occur.
+    Large parameters and results are summarized in the log, see summarize_for_log,
+    and the duration of the call is logged and exported as a metric.
 
     Args:
         func (callable): The function to be executed.
@@ -79,17 +270,22 @@ def execute_and_log(func: Callable, params: dict) -> Any:
         Exception: Re-raises any exception caught during function execution.
     """
     func_name = func.__name__
-    log_msg = f"Attempting to execute function: '{func_name}' with parameters: {params}"
+    log_msg = f"Attempting to execute function: '{func_name}' with parameters: {summarize_params_for_log(params)}"
     app_logger.info(log_msg)
+    start = time.perf_counter()
     try:
         result = func(**params)  # Unpack the dictionary as keyword arguments
-        log_msg = f"Function '{func_name}' executed successfully. Result: {result}"
+        duration = time.perf_counter() - start
+        FUNCTION_CALL_SECONDS.labels(function=func_name, status="ok").observe(duration)
+        log_msg = f"Function '{func_name}' executed successfully in {duration:.3f}s. Result: {summarize_for_log(result)}"
         app_logger.info(log_msg)
         return result
     except Exception as e:
-        log_msg = (
-            f"An exception occurred during execution of function '{func_name}': {e}"
+        duration = time.perf_counter() - start
+        FUNCTION_CALL_SECONDS.labels(function=func_name, status="error").observe(
+            duration
         )
+        log_msg = f"An exception occurred during execution of function '{func_name}' after {duration:.3f}s: {e}"
         app_logger.error(
             log_msg,
             exc_info=True,
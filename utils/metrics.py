@@ -0,0 +1,99 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# NOTE utils.logging uses these metrics, so the logger is taken directly here
+_app_logger = logging.getLogger("app")
+
+# Pipeline stages take from milliseconds (cached reads) to minutes (full downloads)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Duration of pipeline stages: fetch, s3_read, merge, rsi, indicators, chart, s3_write",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+PIPELINE_STAGE_ERRORS = Counter(
+    "pipeline_stage_errors_total", "Pipeline stages that raised", ["stage"]
+)
+# Per ticker values are counters and gauges only, histograms per ticker
+# would be too many time series for a large universe
+PIPELINE_TICKER_RUNS = Counter(
+    "pipeline_ticker_runs_total", "Pipeline runs per ticker", ["ticker", "status"]
+)
+PIPELINE_TICKER_SECONDS = Gauge(
+    "pipeline_ticker_last_duration_seconds",
+    "Duration of the last pipeline run per ticker",
+    ["ticker"],
+)
+FUNCTION_CALL_SECONDS = Histogram(
+    "function_call_seconds",
+    "Duration of the functions called with execute_and_log",
+    ["function", "status"],
+    buckets=STAGE_BUCKETS,
+)
+S3_BYTES = Counter("s3_bytes_total", "Object bytes moved to and from S3", ["direction"])
+S3_CACHE_LOOKUPS = Counter(
+    "s3_cache_lookups_total",
+    "S3 object reads by cache result: memory, disk (revalidated with 304) or miss",
+    ["result"],
+)
+CHART_RENDERS = Counter(
+    "chart_renders_total", "Chart render requests: rendered or skipped", ["result"]
+)
+CHART_CACHE_LOOKUPS = Counter(
+    "chart_cache_lookups_total",
+    "Chart loads by cache result: hit, revalidated or miss",
+    ["result"],
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records not written: sampled out DEBUG records or queue overflow",
+    ["reason"],
+)
+PROVIDER_REQUESTS = Counter(
+    "provider_requests_total",
+    "OHLC provider requests by result: ok, error, invalid, timeout or busy",
+    ["provider", "result"],
+)
+PROVIDER_SECONDS = Histogram(
+    "provider_request_seconds",
+    "Duration of the successful OHLC provider requests",
+    ["provider"],
+    buckets=STAGE_BUCKETS,
+)
+PROVIDER_HEDGES = Counter(
+    "provider_hedged_requests_total",
+    "Requests sent to a provider because the previous one was slow or failed",
+    ["provider", "reason"],
+)
+PROVIDER_CIRCUIT_OPEN = Gauge(
+    "provider_circuit_open", "1 if the provider circuit breaker is open", ["provider"]
+)
+PROVIDER_BAR_MISMATCHES = Counter(
+    "provider_bar_mismatches_total",
+    "Bars whose Close differs between the providers beyond the tolerance",
+    ["provider"],
+)
+
+
+@contextmanager
+def measure_stage(stage: str, ticker: Optional[str] = None) -> Iterator[None]:
+    """
+    Span around a pipeline stage: its duration goes to PIPELINE_STAGE_SECONDS
+    and to a DEBUG log record, failures are counted.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PIPELINE_STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        PIPELINE_STAGE_SECONDS.labels(stage=stage).observe(duration)
+        _app_logger.debug(f"measure_stage - {stage=} - {ticker=} - {duration:.4f}s")
@@ -0,0 +1,15 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+
+def make_process_pool(
+    max_workers: int, initializer: Optional[Callable[[], None]] = None
+) -> ProcessPoolExecutor:
+    """Process pool for CPU-heavy work, e.g. RSI, indicators or chart rendering"""
+    # NOTE spawn, not fork: the parent has boto3 clients and running threads
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+    )
@@ -0,0 +1,69 @@
+from .bulk import (
+    get_s3_executor,
+    read_many,
+    read_many_async,
+    read_many_keys,
+    shutdown_s3_executor,
+    write_many,
+    write_many_async,
+    write_many_keys,
+)
+from .cache import CachedS3Object, S3DataFrameCache, s3_df_cache
+from .client import get_s3_client, put_object_body
+from .conditional import put_json_if, read_json_with_etag
+from .dataset import (
+    BARS_GROUP,
+    DAILY_INTERVAL,
+    get_column_group,
+    get_dataset_group_key,
+    get_last_stored_date,
+    list_dataset_groups,
+    read_dataset_group,
+    read_dataset_state,
+    read_ticker_dataset,
+    register_dataset_columns,
+    write_dataset_group,
+    write_dataset_state,
+)
+from .formats import deserialize_df, get_storage_format, serialize_df
+from .freshness import (
+    FreshnessEntry,
+    get_content_hash,
+    get_stale_tickers,
+    make_freshness_entry,
+    read_freshness_manifest,
+    update_freshness_manifest,
+)
+from .maintenance import (
+    S3ObjectInfo,
+    delete_s3_keys,
+    delete_s3_prefix,
+    iter_s3_objects,
+    iter_s3_objects_parallel,
+)
+from .misc import (
+    get_list_of_files_in_s3_folder,
+    get_ticker_filename,
+    read_df_from_s3,
+    read_df_from_s3_csv,
+    read_df_from_s3_key,
+    remove_csv_for_tickers,
+    remove_csv_from_s3,
+    s3_client,
+    write_df_to_s3,
+    write_df_to_s3_csv,
+    write_df_to_s3_key,
+)
+from .segments import (
+    append_df_to_s3_key,
+    compact_s3_key_segments,
+    compact_segments_in_s3_folder,
+    read_df_with_segments_from_s3_key,
+    write_df_with_segments_to_s3_key,
+)
+from .tickers import (
+    get_ticker_key,
+    read_daily_ohlc_from_s3,
+    read_ticker_df_from_s3,
+    write_ticker_df_to_s3,
+)
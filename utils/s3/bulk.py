@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+import pandas as pd
+
+from constants import S3_BUCKET, S3_BULK_WORKERS
+from utils.logging import get_app_logger
+from utils.s3.dataset import BARS_GROUP, read_ticker_dataset, write_dataset_group
+from utils.s3.misc import read_df_from_s3_key, write_df_to_s3_key
+
+_s3_executor: Optional[ThreadPoolExecutor] = None
+_s3_executor_lock = threading.Lock()
+
+
+def get_s3_executor() -> ThreadPoolExecutor:
+    """
+    Threads of the bulk transfers, shared by all callers so that the number
+    of transfers in flight stays within the S3 client connection pool
+    """
+    global _s3_executor
+    if _s3_executor is None:
+        with _s3_executor_lock:
+            if _s3_executor is None:
+                _s3_executor = ThreadPoolExecutor(
+                    max_workers=S3_BULK_WORKERS, thread_name_prefix="s3_bulk"
+                )
+    return _s3_executor
+
+
+def shutdown_s3_executor() -> None:
+    global _s3_executor
+    with _s3_executor_lock:
+        if _s3_executor is not None:
+            _s3_executor.shutdown(wait=False, cancel_futures=True)
+            _s3_executor = None
+
+
+def _run_many(
+    caller_func: str, calls: Mapping[str, Callable[[], Any]]
+) -> Dict[str, Any]:
+    """
+    Run the calls at once in the S3 executor. Failed calls are logged
+    and left out of the result, so one bad object does not fail the batch.
+    """
+    app_logger = get_app_logger()
+    executor = get_s3_executor()
+    futures = {executor.submit(call): name for name, call in calls.items()}
+    res = dict()
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            res[name] = future.result()
+        except Exception:
+            app_logger.exception(f"{caller_func} - {name=} FAILED")
+    return res
+
+
+def read_many_keys(
+    keys: Iterable[str],
+    bucket: str = S3_BUCKET,
+    columns: Optional[List[str]] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Read many S3 objects at once. Returns DataFrames by key,
+    missing and unreadable objects are left out.
+    """
+    calls = {
+        key: partial(read_df_from_s3_key, key=key, bucket=bucket, columns=columns)
+        for key in keys
+    }
+    res = _run_many(caller_func="read_many_keys", calls=calls)
+    return {key: df for key, df in res.items() if df is not None}
+
+
+def write_many_keys(
+    frames: Dict[str, pd.DataFrame], bucket: str = S3_BUCKET
+) -> Dict[str, str]:
+    """Write many DataFrames at once, frames by S3 key. Returns messages by key."""
+    calls = {
+        key: partial(write_df_to_s3_key, df=df, key=key, bucket=bucket)
+        for key, df in frames.items()
+    }
+    return _run_many(caller_func="write_many_keys", calls=calls)
+
+
+def read_many(
+    tickers: Iterable[str], columns: Optional[List[str]] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Read the datasets of many tickers at once, e.g. to load the whole universe.
+    Returns DataFrames by ticker, tickers without bars are left out.
+    """
+    calls = {
+        ticker: partial(read_ticker_dataset, ticker=ticker, columns=columns)
+        for ticker in tickers
+    }
+    res = _run_many(caller_func="read_many", calls=calls)
+    return {ticker: df for ticker, df in res.items() if df is not None}
+
+
+def write_many(
+    frames: Dict[str, pd.DataFrame],
+    group: str = BARS_GROUP,
+    last_stored_dates: Optional[Dict[str, date]] = None,
+) -> Dict[str, str]:
+    """
+    Save one column group of many tickers at once, frames by ticker.
+    last_stored_dates works as in write_dataset_group. Returns messages by ticker.
+    """
+    last_stored_dates = last_stored_dates or dict()
+    calls = {
+        ticker: partial(
+            write_dataset_group,
+            ticker=ticker,
+            group=group,
+            df=df,
+            last_stored_date=last_stored_dates.get(ticker),
+        )
+        for ticker, df in frames.items()
+    }
+    return _run_many(caller_func="write_many", calls=calls)
+
+
+async def read_many_async(
+    tickers: Iterable[str], columns: Optional[List[str]] = None
+) -> Dict[str, pd.DataFrame]:
+    """read_many for coroutines, the event loop is not blocked meanwhile"""
+    return await asyncio.to_thread(read_many, list(tickers), columns)
+
+
+async def write_many_async(
+    frames: Dict[str, pd.DataFrame],
+    group: str = BARS_GROUP,
+    last_stored_dates: Optional[Dict[str, date]] = None,
+) -> Dict[str, str]:
+    """write_many for coroutines, the event loop is not blocked meanwhile"""
+    return await asyncio.to_thread(write_many, frames, group, last_stored_dates)
@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from constants import S3_CACHE_DIR, S3_CACHE_MAX_BYTES
+from utils.files import write_file_atomic
+
+
+@dataclass
+class CachedS3Object:
+    etag: str
+    # Parsed DataFrame, None if only the raw body is known (disk tier)
+    df: Optional[pd.DataFrame] = None
+    body: Optional[bytes] = None
+    size: int = 0
+
+
+class S3DataFrameCache:
+    """
+    Two-tier cache of DataFrames read from S3: in-memory LRU limited by
+    DataFrame memory usage, and raw object bodies on local disk.
+    Every entry keeps the S3 ETag, so that it can be revalidated
+    with a conditional GET (If-None-Match) instead of a full download.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = S3_CACHE_MAX_BYTES,
+        disk_dir: Optional[str] = S3_CACHE_DIR,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[Tuple[str, str], CachedS3Object]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, bucket: str, key: str) -> Optional[CachedS3Object]:
+        with self._lock:
+            entry = self._entries.get((bucket, key))
+            if entry is not None:
+                self._entries.move_to_end((bucket, key))
+                return entry
+        return self._read_disk(bucket=bucket, key=key)
+
+    def put_df(self, bucket: str, key: str, etag: str, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(bucket=bucket, key=key)
+            self._entries[(bucket, key)] = CachedS3Object(etag=etag, df=df, size=size)
+            self._size = self._size + size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size = self._size - evicted.size
+
+    def put_body(self, bucket: str, key: str, etag: str, body: bytes) -> None:
+        """Save raw object body on disk, e.g. after our own write"""
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(bucket=bucket, key=key)
+        write_file_atomic(path=path, body=etag.encode("utf-8") + b"\n" + body)
+
+    def invalidate(self, bucket: str, key: str, disk: bool = True) -> None:
+        with self._lock:
+            self._pop(bucket=bucket, key=key)
+        if disk and self.disk_dir is not None:
+            try:
+                os.remove(self._disk_path(bucket=bucket, key=key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, bucket: str, key: str) -> None:
+        entry = self._entries.pop((bucket, key), None)
+        if entry is not None:
+            self._size = self._size - entry.size
+
+    def _disk_path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.disk_dir, bucket, *key.split("/"))  # type: ignore
+
+    def _read_disk(self, bucket: str, key: str) -> Optional[CachedS3Object]:
+        if self.disk_dir is None:
+            return None
+        try:
+            with open(self._disk_path(bucket=bucket, key=key), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        etag, _, body = content.partition(b"\n")
+        return CachedS3Object(etag=etag.decode("utf-8"), body=body)
+
+
+s3_df_cache = S3DataFrameCache()
@@ -0,0 +1,95 @@
+import io
+import os
+import threading
+from typing import Any, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from dotenv import load_dotenv
+
+from constants import (
+    S3_CONNECT_TIMEOUT_SECONDS,
+    S3_MAX_ATTEMPTS,
+    S3_MAX_POOL_CONNECTIONS,
+    S3_MULTIPART_CHUNK_SIZE,
+    S3_MULTIPART_THRESHOLD,
+    S3_READ_TIMEOUT_SECONDS,
+)
+
+load_dotenv()
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def _make_s3_client() -> Any:
+    """
+    boto3 S3 client with a connection pool shared by all threads
+    and adaptive retries: exponential backoff plus client-side rate limiting
+    when S3 answers SlowDown. S3_ENDPOINT_URL from the environment points it
+    to a local S3 stand-in, e.g. MinIO or moto server.
+    """
+    config = Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        retries={"max_attempts": S3_MAX_ATTEMPTS, "mode": "adaptive"},
+        connect_timeout=S3_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=S3_READ_TIMEOUT_SECONDS,
+    )
+    return boto3.client(
+        service_name="s3",
+        endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+        config=config,
+    )
+
+
+def get_s3_client() -> Any:
+    """The S3 client of the process, created on first use"""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = _make_s3_client()
+    return _s3_client
+
+
+class LazyS3Client:
+    """Stands for the S3 client, so that importing utils.s3 does not create it"""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_s3_client(), name)
+
+
+s3_client = LazyS3Client()
+
+_transfer_config = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_CHUNK_SIZE,
+    max_concurrency=10,
+)
+
+
+def put_object_body(
+    body: bytes, key: str, bucket: str, content_type: Optional[str] = None
+) -> Optional[str]:
+    """
+    Upload object bytes, in parallel parts if they are larger than
+    S3_MULTIPART_THRESHOLD. Returns the ETag of the new object.
+    Raises RuntimeError if S3 does not answer 200 to a single-part upload.
+    """
+    extra_args = dict()
+    if content_type is not None:
+        extra_args["ContentType"] = content_type
+    if len(body) <= S3_MULTIPART_THRESHOLD:
+        response = s3_client.put_object(Bucket=bucket, Key=key, Body=body, **extra_args)
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status != 200:
+            raise RuntimeError(
+                f"put_object_body: S3 response {status=} != 200 for {bucket}/{key}"
+            )
+        return response.get("ETag")
+    s3_client.upload_fileobj(
+        io.BytesIO(body), bucket, key, ExtraArgs=extra_args, Config=_transfer_config
+    )
+    # upload_fileobj does not return the ETag of the assembled object
+    return s3_client.head_object(Bucket=bucket, Key=key).get("ETag")
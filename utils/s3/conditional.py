@@ -0,0 +1,52 @@
+import json
+from typing import Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from constants import S3_BUCKET
+from utils.s3.client import s3_client
+
+# 412 if the precondition failed, 409 if a concurrent conditional write won
+_CONDITION_FAILED_CODES = ["PreconditionFailed", "412", "ConditionalRequestConflict"]
+
+
+def read_json_with_etag(
+    key: str, bucket: str = S3_BUCKET
+) -> Optional[Tuple[dict, str]]:
+    """JSON object and its ETag, None if there is no such object"""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] == "NoSuchKey":
+            return None
+        else:
+            raise
+    return json.loads(response["Body"].read()), response["ETag"]
+
+
+def put_json_if(
+    key: str, body: dict, etag: Optional[str], bucket: str = S3_BUCKET
+) -> Optional[str]:
+    """
+    Atomic conditional write: create the object if etag is None,
+    otherwise replace it only if its ETag is still etag.
+    Returns the new ETag, None if another writer was first.
+    """
+    kwargs = {"IfNoneMatch": "*"} if etag is None else {"IfMatch": etag}
+    try:
+        response = s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=json.dumps(body).encode("utf-8"),
+            ContentType="application/json",
+            **kwargs,
+        )
+    except ClientError as ex:
+        if (
+            ex.response["Error"]["Code"] in _CONDITION_FAILED_CODES
+            or ex.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 409
+        ):
+            return None
+        else:
+            raise
+    return response["ETag"]
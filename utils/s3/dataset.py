@@ -0,0 +1,201 @@
+import json
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from botocore.exceptions import ClientError
+
+from constants import (
+    OHLC_REQUIRED_COLUMNS,
+    S3_BUCKET,
+    S3_FOLDER_DATASET,
+    S3_STORAGE_FORMAT,
+    S3_WRITE_MODE,
+)
+from utils.s3.formats import STORAGE_FORMAT_EXTENSIONS, get_storage_format
+from utils.s3.misc import s3_client
+from utils.s3.segments import (
+    append_df_to_s3_key,
+    read_df_with_segments_from_s3_key,
+    write_df_with_segments_to_s3_key,
+)
+
+# Raw bars are stored together, every other column is its own group
+# unless registered with register_dataset_columns.
+BARS_GROUP = "bars"
+# Not column groups: JSON state objects, e.g. daily_dataset/GLD/_state/RSI_14.json
+DATASET_STATE_DIR = "_state/"
+# The dataset holds daily bars, the bars of other intervals and their
+# derived columns and state are under e.g. daily_dataset/GLD/_intervals/1wk/
+DAILY_INTERVAL = "1d"
+DATASET_INTERVALS_DIR = "_intervals/"
+_COLUMN_GROUPS: Dict[str, str] = {col: BARS_GROUP for col in OHLC_REQUIRED_COLUMNS}
+
+
+def register_dataset_columns(group: str, columns: Iterable[str]) -> None:
+    """Store the columns together in one group object"""
+    for col in columns:
+        _COLUMN_GROUPS[col] = group
+
+
+def get_column_group(col_name: str) -> str:
+    return _COLUMN_GROUPS.get(col_name, col_name)
+
+
+def get_dataset_prefix(ticker: str, interval: str = DAILY_INTERVAL) -> str:
+    res = f"{S3_FOLDER_DATASET}{ticker.upper()}/"
+    if interval != DAILY_INTERVAL:
+        res = f"{res}{DATASET_INTERVALS_DIR}{interval}/"
+    return res
+
+
+def get_dataset_group_key(
+    ticker: str, group: str, interval: str = DAILY_INTERVAL
+) -> str:
+    extension = STORAGE_FORMAT_EXTENSIONS[S3_STORAGE_FORMAT]
+    return f"{get_dataset_prefix(ticker=ticker, interval=interval)}{group}{extension}"
+
+
+def get_dataset_state_key(
+    ticker: str, name: str, interval: str = DAILY_INTERVAL
+) -> str:
+    prefix = get_dataset_prefix(ticker=ticker, interval=interval)
+    return f"{prefix}{DATASET_STATE_DIR}{name}.json"
+
+
+def read_dataset_state(
+    ticker: str, name: str, interval: str = DAILY_INTERVAL
+) -> Optional[dict]:
+    """Small JSON object stored next to the ticker dataset, e.g. indicator state"""
+    try:
+        response = s3_client.get_object(
+            Bucket=S3_BUCKET,
+            Key=get_dataset_state_key(ticker=ticker, name=name, interval=interval),
+        )
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] == "NoSuchKey":
+            return None
+        else:
+            raise
+    return json.loads(response["Body"].read())
+
+
+def write_dataset_state(
+    ticker: str, name: str, state: dict, interval: str = DAILY_INTERVAL
+) -> str:
+    key = get_dataset_state_key(ticker=ticker, name=name, interval=interval)
+    response = s3_client.put_object(
+        Bucket=S3_BUCKET, Key=key, Body=json.dumps(state).encode("utf-8")
+    )
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if status == 200:
+        return f"Writing to S3 {S3_BUCKET}/{key} - OK"
+    else:
+        return f"Writing to S3 {S3_BUCKET}/{key} FAILED, status - {status}"
+
+
+def get_last_stored_date(
+    df: Optional[pd.DataFrame], col_name: Optional[str] = None
+) -> Optional[date]:
+    """Last date of df, or of its non-NaN col_name values if col_name is given"""
+    if df is None:
+        return None
+    if col_name is not None:
+        df = df[df[col_name].notnull()]
+    if df.empty:
+        return None
+    return df.index.max().date()
+
+
+def read_dataset_group(
+    ticker: str,
+    group: str,
+    columns: Optional[List[str]] = None,
+    interval: str = DAILY_INTERVAL,
+) -> Optional[pd.DataFrame]:
+    """
+    Read one column group of the ticker dataset, e.g. only Close of the bars.
+    Returns None if the group has not been written yet.
+    """
+    return read_df_with_segments_from_s3_key(
+        key=get_dataset_group_key(ticker=ticker, group=group, interval=interval),
+        bucket=S3_BUCKET,
+        columns=columns,
+    )
+
+
+def write_dataset_group(
+    ticker: str,
+    group: str,
+    df: pd.DataFrame,
+    last_stored_date: Optional[date] = None,
+    interval: str = DAILY_INTERVAL,
+) -> str:
+    """
+    Save one column group of the ticker dataset. With S3_WRITE_MODE == "append"
+    and a known last stored date, only the rows after it are written, as a segment.
+    """
+    if df.empty:
+        raise ValueError(f"write_dataset_group: input DataFrame is empty, {ticker=}")
+    key = get_dataset_group_key(ticker=ticker, group=group, interval=interval)
+    if S3_WRITE_MODE == "append" and last_stored_date is not None:
+        new_rows = df[pd.to_datetime(df.index) > pd.Timestamp(last_stored_date)]
+        return append_df_to_s3_key(df=new_rows, key=key, bucket=S3_BUCKET)
+    return write_df_with_segments_to_s3_key(df=df, key=key, bucket=S3_BUCKET)
+
+
+def list_dataset_groups(ticker: str, interval: str = DAILY_INTERVAL) -> List[str]:
+    """Names of the column groups stored for the ticker"""
+    res = set()
+    prefix = get_dataset_prefix(ticker=ticker, interval=interval)
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=prefix, Delimiter="/"):
+        for obj in page.get("Contents", []):
+            name = obj["Key"][len(prefix) :]
+            extension = STORAGE_FORMAT_EXTENSIONS[get_storage_format(filename=name)]
+            res.add(name[: -len(extension)])
+        # A group may consist of segments only
+        for common_prefix in page.get("CommonPrefixes", []):
+            name = common_prefix["Prefix"][len(prefix) :]
+            if name not in [DATASET_STATE_DIR, DATASET_INTERVALS_DIR]:
+                res.add(name.rstrip("/"))
+    return sorted(res)
+
+
+def read_ticker_dataset(
+    ticker: str, columns: Optional[List[str]] = None, interval: str = DAILY_INTERVAL
+) -> Optional[pd.DataFrame]:
+    """
+    Read the requested columns of the ticker dataset, all of them if columns is None.
+    Only the groups holding the requested columns are downloaded.
+    Derived columns are aligned to the bars dates.
+    Returns None if there are no bars for the ticker.
+    """
+    if columns is None:
+        groups: Dict[str, Optional[List[str]]] = {
+            group: None
+            for group in list_dataset_groups(ticker=ticker, interval=interval)
+        }
+    else:
+        groups = dict()
+        for col_name in columns:
+            groups.setdefault(get_column_group(col_name=col_name), []).append(col_name)  # type: ignore
+    bars_columns = groups.pop(BARS_GROUP, None)
+    if columns is not None and bars_columns is None:
+        # Derived columns are still aligned to the bars dates
+        bars_columns = ["Close"]
+    res = read_dataset_group(
+        ticker=ticker, group=BARS_GROUP, columns=bars_columns, interval=interval
+    )
+    if res is None:
+        return None
+    for group, group_columns in groups.items():
+        group_df = read_dataset_group(
+            ticker=ticker, group=group, columns=group_columns, interval=interval
+        )
+        if group_df is None:
+            continue
+        res = res.join(group_df, how="left")
+    if columns is not None:
+        res = res[[col_name for col_name in columns if col_name in res.columns]]
+    return res
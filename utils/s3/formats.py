@@ -0,0 +1,99 @@
+import io
+import re
+from typing import List, Optional
+
+import pandas as pd
+
+STORAGE_FORMAT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+# Name of the index column inside parquet and arrow objects
+INDEX_COLUMN_NAME = "Date"
+_TZ_OFFSET_RE = re.compile(r"[+-]\d\d:\d\d$")
+
+
+def get_storage_format(filename: str) -> str:
+    """Storage format of S3 object by its filename extension"""
+    for fmt, extension in STORAGE_FORMAT_EXTENSIONS.items():
+        if filename.endswith(extension):
+            return fmt
+    raise ValueError(
+        f"get_storage_format: {filename=} - extension must be one of {list(STORAGE_FORMAT_EXTENSIONS.values())}"
+    )
+
+
+def _check_storage_format(fmt: str) -> None:
+    if fmt not in STORAGE_FORMAT_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported storage format: {fmt=}, should be one of {list(STORAGE_FORMAT_EXTENSIONS)}"
+        )
+
+
+def _with_datetime_index(df: pd.DataFrame) -> pd.DataFrame:
+    res = df.copy(deep=False)
+    res.index = pd.DatetimeIndex(pd.to_datetime(res.index), name=INDEX_COLUMN_NAME)
+    return res
+
+
+def serialize_df(
+    df: pd.DataFrame, fmt: str, compression: Optional[str] = None
+) -> bytes:
+    """
+    Serialize DataFrame for storage in S3.
+    CSV is text as before, parquet and arrow keep typed columns
+    and the index as datetime64.
+    """
+    _check_storage_format(fmt)
+    if fmt == "csv":
+        return df.to_csv(index=True).encode("utf-8")
+
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(_with_datetime_index(df), preserve_index=True)
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, sink, compression=compression or "none")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def deserialize_df(
+    body: bytes, fmt: str, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Deserialize DataFrame read from S3.
+    If columns are given, only they are read (parquet and arrow)
+    or parsed (csv), the index is always kept.
+    """
+    _check_storage_format(fmt)
+    if fmt == "csv":
+        res = pd.read_csv(io.BytesIO(body), index_col=0)
+        if columns is not None:
+            res = res[list(columns)]
+        if res.empty or _TZ_OFFSET_RE.search(str(res.index[0])):
+            # Exchange-local times of daily bars, as the old CSV objects have them
+            res.index = pd.to_datetime(res.index, utc=True).normalize()
+        else:
+            # Naive dates of daily bars or UTC times of intraday bars
+            res.index = pd.to_datetime(res.index)
+        return res
+
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        read_columns = None
+        if columns is not None:
+            read_columns = list(columns) + [INDEX_COLUMN_NAME]
+        table = pq.read_table(pa.BufferReader(body), columns=read_columns)
+    else:
+        table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+        if columns is not None:
+            table = table.select(list(columns) + [INDEX_COLUMN_NAME])
+    res = table.to_pandas()
+    res.index.name = None
+    return res
@@ -0,0 +1,103 @@
+import hashlib
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from constants import (
+    FRESHNESS_MANIFEST_MAX_ATTEMPTS,
+    S3_BUCKET,
+    S3_FRESHNESS_MANIFEST_KEY,
+)
+from utils.s3.conditional import put_json_if, read_json_with_etag
+
+
+@dataclass
+class FreshnessEntry:
+    """What is stored for a ticker, dates in ISO format"""
+
+    last_bar_date: str
+    rows: int
+    content_hash: str
+    last_derived_date: Optional[str]
+    updated_at: float
+
+    def is_fresh(self, session: date) -> bool:
+        """Bars up to session are stored and derived columns are computed for them"""
+        return (
+            self.last_bar_date >= session.isoformat()
+            and self.last_derived_date is not None
+            and self.last_derived_date >= self.last_bar_date
+        )
+
+
+def get_content_hash(df: pd.DataFrame) -> str:
+    """Hash of the values and dates of df, changes whenever a stored bar does"""
+    hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+def make_freshness_entry(
+    bars_df: pd.DataFrame, last_derived_date: Optional[date]
+) -> FreshnessEntry:
+    return FreshnessEntry(
+        last_bar_date=bars_df.index.max().date().isoformat(),
+        rows=len(bars_df),
+        content_hash=get_content_hash(df=bars_df),
+        last_derived_date=(
+            None if last_derived_date is None else last_derived_date.isoformat()
+        ),
+        updated_at=time.time(),
+    )
+
+
+def read_freshness_manifest(bucket: str = S3_BUCKET) -> Dict[str, FreshnessEntry]:
+    """ticker -> entry, empty if the manifest has not been written yet"""
+    current = read_json_with_etag(key=S3_FRESHNESS_MANIFEST_KEY, bucket=bucket)
+    if current is None:
+        return dict()
+    return {
+        ticker: FreshnessEntry(**entry)
+        for ticker, entry in current[0].get("tickers", {}).items()
+    }
+
+
+def update_freshness_manifest(
+    entries: Dict[str, FreshnessEntry], bucket: str = S3_BUCKET
+) -> None:
+    """
+    Replace the entries of the tickers in the manifest with one conditional write.
+    When another worker updates the manifest in between, it is read again
+    and the write is retried, so that no worker loses the entries of another.
+    Raises RuntimeError after FRESHNESS_MANIFEST_MAX_ATTEMPTS attempts.
+    """
+    new_entries = {ticker.upper(): asdict(entry) for ticker, entry in entries.items()}
+    for attempt in range(FRESHNESS_MANIFEST_MAX_ATTEMPTS):
+        current = read_json_with_etag(key=S3_FRESHNESS_MANIFEST_KEY, bucket=bucket)
+        body, etag = ({"tickers": {}}, None) if current is None else current
+        body["tickers"].update(new_entries)
+        if put_json_if(
+            key=S3_FRESHNESS_MANIFEST_KEY, body=body, etag=etag, bucket=bucket
+        ):
+            return
+        # Jittered backoff, so that the writers that lost do not collide again
+        time.sleep(random.uniform(0, 0.05 * 2 ** min(attempt, 5)))
+    raise RuntimeError(
+        f"update_freshness_manifest: {list(new_entries)} not written"
+        f" after {FRESHNESS_MANIFEST_MAX_ATTEMPTS} attempts"
+    )
+
+
+def get_stale_tickers(
+    tickers: Iterable[str], manifest: Dict[str, FreshnessEntry], session: date
+) -> List[str]:
+    """Tickers without bars or derived columns up to session, e.g. the last trading day"""
+    res = list()
+    for ticker in tickers:
+        entry = manifest.get(ticker.upper())
+        if entry is None or not entry.is_fresh(session=session):
+            res.append(ticker)
+    return res
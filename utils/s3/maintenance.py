@@ -0,0 +1,175 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generator, Iterable, Iterator, List, Optional
+
+from constants import S3_BUCKET, S3_BULK_WORKERS, S3_LIST_PARTITION_BOUNDARIES
+from utils.logging import get_app_logger
+from utils.s3.cache import s3_df_cache
+from utils.s3.client import s3_client
+
+S3_DELETE_BATCH_SIZE = 1000
+
+
+@dataclass
+class S3ObjectInfo:
+    key: str
+    size: int
+    etag: str
+    last_modified: datetime
+
+
+def _iter_key_range_pages(
+    bucket: str,
+    prefix: str,
+    start_after: Optional[str] = None,
+    stop_at: Optional[str] = None,
+) -> Iterator[List[S3ObjectInfo]]:
+    """Objects with start_after < key <= stop_at, a listing page at a time"""
+    kwargs = {"Bucket": bucket, "Prefix": prefix}
+    if start_after is not None:
+        kwargs["StartAfter"] = start_after
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(**kwargs):
+        res: List[S3ObjectInfo] = list()
+        # Contents is absent if there are no objects
+        for obj in page.get("Contents", []):
+            if stop_at is not None and obj["Key"] > stop_at:
+                if res:
+                    yield res
+                return
+            res.append(
+                S3ObjectInfo(
+                    key=obj["Key"],
+                    size=obj["Size"],
+                    etag=obj["ETag"],
+                    last_modified=obj["LastModified"],
+                )
+            )
+        if res:
+            yield res
+
+
+def iter_s3_objects(prefix: str, bucket: str = S3_BUCKET) -> Iterator[S3ObjectInfo]:
+    """All objects under the prefix in key order, streamed page by page"""
+    for page in _iter_key_range_pages(bucket=bucket, prefix=prefix):
+        yield from page
+
+
+def _list_range_into(
+    pages: queue.Queue,
+    stop: threading.Event,
+    bucket: str,
+    prefix: str,
+    start_after: Optional[str],
+    stop_at: Optional[str],
+) -> None:
+    """
+    Put the listing pages of the range into pages, then None when it is done,
+    or the error it failed with. Returns early once stop is set.
+    """
+
+    def _put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        for page in _iter_key_range_pages(
+            bucket=bucket, prefix=prefix, start_after=start_after, stop_at=stop_at
+        ):
+            if not _put(page):
+                return
+    except Exception as e:
+        _put(e)
+        return
+    _put(None)
+
+
+def iter_s3_objects_parallel(
+    prefix: str, bucket: str = S3_BUCKET, workers: int = S3_BULK_WORKERS
+) -> Generator[S3ObjectInfo, None, None]:
+    """
+    All objects under the prefix for big folders: the key space is split
+    at prefix + each of S3_LIST_PARTITION_BOUNDARIES and the ranges are listed
+    at once. Objects are streamed page by page as the listings return them,
+    so they are not in key order. At most two pages per range wait in memory
+    for the caller; the listings stop if the caller stops iterating.
+    """
+    boundaries = [prefix + boundary for boundary in S3_LIST_PARTITION_BOUNDARIES]
+    starts: List[Optional[str]] = [None, *boundaries]
+    stops: List[Optional[str]] = [*boundaries, None]
+    pages: queue.Queue = queue.Queue(maxsize=2 * len(starts))
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=min(workers, len(starts)))
+    try:
+        for start_after, stop_at in zip(starts, stops):
+            executor.submit(
+                _list_range_into, pages, stop, bucket, prefix, start_after, stop_at
+            )
+        remaining = len(starts)
+        while remaining:
+            item = pages.get()
+            if item is None:
+                remaining = remaining - 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield from item
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _delete_batch(keys: List[str], bucket: str) -> List[str]:
+    response = s3_client.delete_objects(
+        Bucket=bucket,
+        Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+    )
+    for key in keys:
+        s3_df_cache.invalidate(bucket=bucket, key=key)
+    # Quiet mode reports the failed keys only
+    errors = response.get("Errors", [])
+    if errors:
+        get_app_logger().error(
+            f"delete_s3_keys - {len(errors)} of {len(keys)} keys not deleted,"
+            f" first error {errors[0]}"
+        )
+    return [error["Key"] for error in errors]
+
+
+def delete_s3_keys(
+    keys: Iterable[str], bucket: str = S3_BUCKET, workers: int = S3_BULK_WORKERS
+) -> List[str]:
+    """
+    Delete objects in batches of up to 1000 keys per request,
+    the batches are sent at once. Keys that do not exist count as deleted.
+    Returns the keys S3 failed to delete.
+    """
+    keys = list(keys)
+    batches = [
+        keys[i : i + S3_DELETE_BATCH_SIZE]
+        for i in range(0, len(keys), S3_DELETE_BATCH_SIZE)
+    ]
+    if len(batches) <= 1:
+        return [key for batch in batches for key in _delete_batch(batch, bucket)]
+    res = list()
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        for failed in executor.map(lambda batch: _delete_batch(batch, bucket), batches):
+            res.extend(failed)
+    return res
+
+
+def delete_s3_prefix(prefix: str, bucket: str = S3_BUCKET) -> int:
+    """Delete every object under the prefix. Returns the number of deleted objects."""
+    if not prefix:
+        raise ValueError(f"delete_s3_prefix: {prefix=}, refusing to empty the bucket")
+    keys = [obj.key for obj in iter_s3_objects_parallel(prefix=prefix, bucket=bucket)]
+    failed = delete_s3_keys(keys=keys, bucket=bucket)
+    return len(keys) - len(failed)
@@ -0,0 +1,135 @@
+import argparse
+from typing import List
+
+from constants import (
+    OHLC_REQUIRED_COLUMNS,
+    RSI_PERIOD,
+    S3_BUCKET,
+    S3_FOLDER_DAILY_DATA,
+    S3_FOLDER_RSI,
+)
+from utils.logging import get_app_logger
+from utils.s3.dataset import BARS_GROUP, get_column_group, write_dataset_group
+from utils.s3.formats import STORAGE_FORMAT_EXTENSIONS, get_storage_format
+from utils.s3.maintenance import delete_s3_keys
+from utils.s3.misc import (
+    get_list_of_files_in_s3_folder,
+    read_df_from_s3_key,
+    write_df_to_s3_key,
+)
+from utils.s3.segments import SEGMENTS_DIR, read_df_with_segments_from_s3_key
+
+
+def migrate_s3_folder_format(
+    folder: str,
+    to_fmt: str,
+    from_fmt: str = "csv",
+    bucket: str = S3_BUCKET,
+    remove_source: bool = False,
+) -> List[str]:
+    """
+    Convert every from_fmt object in the S3 folder to to_fmt,
+    e.g. daily_tickers_data_csv/GLD.csv -> daily_tickers_data_csv/GLD.parquet.
+    Returns the list of written keys.
+    """
+    if from_fmt == to_fmt:
+        raise ValueError(f"migrate_s3_folder_format: {from_fmt=} == {to_fmt=}")
+    from_extension = STORAGE_FORMAT_EXTENSIONS[from_fmt]
+    to_extension = STORAGE_FORMAT_EXTENSIONS[to_fmt]
+    app_logger = get_app_logger()
+    res = list()
+    migrated_keys = list()
+    for key in get_list_of_files_in_s3_folder(s3_bucker=bucket, s3_folder=folder):
+        if not key.endswith(from_extension):
+            continue
+        df = read_df_from_s3_key(key=key, bucket=bucket)
+        if df is None or df.empty:
+            continue
+        new_key = key[: -len(from_extension)] + to_extension
+        msg = write_df_to_s3_key(df=df, key=new_key, bucket=bucket)
+        app_logger.info(f"migrate_s3_folder_format - {key=} -> {new_key=} - {msg}")
+        migrated_keys.append(key)
+        res.append(new_key)
+    if remove_source:
+        delete_s3_keys(keys=migrated_keys, bucket=bucket)
+    return res
+
+
+def migrate_s3_storage_format(
+    to_fmt: str, from_fmt: str = "csv", remove_source: bool = False
+) -> List[str]:
+    """Convert both the OHLC and the OHLC + RSI folders"""
+    res = list()
+    for folder in [S3_FOLDER_DAILY_DATA, S3_FOLDER_RSI]:
+        res.extend(
+            migrate_s3_folder_format(
+                folder=folder,
+                to_fmt=to_fmt,
+                from_fmt=from_fmt,
+                remove_source=remove_source,
+            )
+        )
+    return res
+
+
+def _list_legacy_ticker_keys(folder: str) -> dict:
+    """ticker -> base key of its history in the legacy folder"""
+    res = dict()
+    for key in get_list_of_files_in_s3_folder(s3_folder=folder):
+        if SEGMENTS_DIR in key:
+            continue
+        name = key[len(folder) :]
+        extension = STORAGE_FORMAT_EXTENSIONS[get_storage_format(filename=name)]
+        res[name[: -len(extension)]] = key
+    return res
+
+
+def migrate_legacy_folders_to_dataset() -> List[str]:
+    """
+    Build the per-ticker datasets from the duplicated legacy objects:
+    bars and RSI from daily_OHLC_with_RSI/, or bars only from
+    daily_tickers_data_csv/ for the tickers without RSI.
+    Returns the list of migrated tickers.
+    """
+    app_logger = get_app_logger()
+    rsi_col = f"RSI_{RSI_PERIOD}"
+    ohlc_keys = _list_legacy_ticker_keys(folder=S3_FOLDER_DAILY_DATA)
+    rsi_keys = _list_legacy_ticker_keys(folder=S3_FOLDER_RSI)
+    res = list()
+    for ticker in sorted(set(ohlc_keys) | set(rsi_keys)):
+        key = rsi_keys.get(ticker, ohlc_keys.get(ticker))
+        df = read_df_with_segments_from_s3_key(key=key)  # type: ignore
+        if df is None or df.empty:
+            continue
+        bars_columns = [col for col in df.columns if col in OHLC_REQUIRED_COLUMNS]
+        write_dataset_group(ticker=ticker, group=BARS_GROUP, df=df[bars_columns])
+        if rsi_col in df.columns:
+            write_dataset_group(
+                ticker=ticker,
+                group=get_column_group(col_name=rsi_col),
+                df=df[[rsi_col]],
+            )
+        app_logger.info(f"migrate_legacy_folders_to_dataset - {ticker=} from {key=}")
+        res.append(ticker)
+    return res
+
+
+if __name__ == "__main__":
+    # python -m utils.s3.migration --to parquet
+    # python -m utils.s3.migration --to-dataset
+    parser = argparse.ArgumentParser(description="Convert S3 ticker data format")
+    parser.add_argument("--to", dest="to_fmt", choices=list(STORAGE_FORMAT_EXTENSIONS))
+    parser.add_argument("--from", dest="from_fmt", default="csv")
+    parser.add_argument("--remove-source", action="store_true")
+    parser.add_argument("--to-dataset", action="store_true")
+    args = parser.parse_args()
+    if args.to_dataset:
+        migrated = migrate_legacy_folders_to_dataset()
+        print(f"Migrated {len(migrated)} tickers to the dataset")
+    else:
+        written = migrate_s3_storage_format(
+            to_fmt=args.to_fmt,
+            from_fmt=args.from_fmt,
+            remove_source=args.remove_source,
+        )
+        print(f"Converted {len(written)} objects to {args.to_fmt}")
@@ -0,0 +1,277 @@
+from typing import List, Optional, Set
+
+import pandas as pd
+from botocore.exceptions import ClientError
+
+from constants import (
+    S3_BUCKET,
+    S3_FOLDER_DAILY_DATA,
+    S3_STORAGE_COMPRESSION,
+    S3_STORAGE_FORMAT,
+)
+from utils.metrics import S3_BYTES, S3_CACHE_LOOKUPS
+from utils.s3.cache import s3_df_cache
+from utils.s3.client import put_object_body, s3_client
+from utils.s3.formats import (
+    STORAGE_FORMAT_EXTENSIONS,
+    deserialize_df,
+    get_storage_format,
+    serialize_df,
+)
+from utils.s3.maintenance import delete_s3_keys, iter_s3_objects
+from utils.schema import normalize_date_index
+
+
+def _check_s3_call_inputs(
+    caller_func: str,
+    folder: str,
+    filename: Optional[str],
+    df: Optional[pd.DataFrame] = None,
+) -> None:
+    if df is not None and df.empty:
+        raise ValueError(f"{caller_func}: input DataFrame is empty")
+    if folder[-1] != "/":
+        raise ValueError(f"{caller_func}: {folder=}, last symbol must be /")
+    if folder[0] == "/":
+        raise ValueError(f"{caller_func}: {folder=}, first symbol can't be /")
+    if filename is not None:
+        if caller_func in ["write_df_to_s3", "read_df_from_s3"]:
+            get_storage_format(filename=filename)
+
+
+def remove_csv_from_s3(
+    filename: str,
+    bucket: str = S3_BUCKET,
+    folder: str = S3_FOLDER_DAILY_DATA,
+) -> str:
+    """
+    Remove file from S3 bucket.
+    If removal fails because file DOES NOT EXIST, it's ok.
+    """
+    _check_s3_call_inputs(
+        caller_func="remove_csv_from_s3",
+        folder=folder,
+        filename=filename,
+    )
+    folder_filename = folder + filename
+    try:
+        s3_client.head_object(Bucket=bucket, Key=folder_filename)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "404":
+            return f"File {folder_filename} DOES NOT EXIST in the S3 bucket {bucket}"
+        elif e.response["Error"]["Code"] == "403":
+            raise RuntimeError(
+                f"Unauthorized access to S3, maybe invalid {bucket=}"
+            ) from e
+        else:
+            # Something else has gone wrong.
+            raise
+    else:
+        response = s3_client.delete_object(Bucket=bucket, Key=folder_filename)
+        s3_df_cache.invalidate(bucket=bucket, key=folder_filename)
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status != 204:
+            raise RuntimeError(
+                f"remove_csv_from_s3 {folder_filename=}, {status=}, should be 204, full {response=}"
+            )
+        else:
+            return f"{folder_filename} removed from S3 bucket {bucket} - OK"
+
+
+def remove_csv_for_tickers(tickers: Set[str]) -> None:
+    """
+    Remove CSV of every input ticker from S3 bucket,
+    up to 1000 tickers per request, and print message
+    """
+    keys = [S3_FOLDER_DAILY_DATA + f"{ticker}.csv" for ticker in sorted(tickers)]
+    failed = delete_s3_keys(keys=keys, bucket=S3_BUCKET)
+    print(f"Removing CSV for {len(keys)} tickers - {len(failed)} FAILED {failed}")
+
+
+def get_ticker_filename(ticker: str, fmt: str = S3_STORAGE_FORMAT) -> str:
+    """S3 filename of ticker data in the given storage format"""
+    if fmt not in STORAGE_FORMAT_EXTENSIONS:
+        raise ValueError(
+            f"get_ticker_filename: {fmt=}, should be one of {list(STORAGE_FORMAT_EXTENSIONS)}"
+        )
+    return f"{ticker.upper()}{STORAGE_FORMAT_EXTENSIONS[fmt]}"
+
+
+def _get_folder_filename(
+    caller_func: str, filename: str, folder: str, df: Optional[pd.DataFrame] = None
+) -> str:
+    """Full S3 key: filename with a folder inside is used as is"""
+    if not "/" in filename:
+        _check_s3_call_inputs(
+            caller_func=caller_func,
+            df=df,
+            folder=folder,
+            filename=filename,
+        )
+        return folder + filename
+    get_storage_format(filename=filename)
+    return filename
+
+
+def write_df_to_s3_key(
+    df: pd.DataFrame,
+    key: str,
+    bucket: str = S3_BUCKET,
+    compression: Optional[str] = S3_STORAGE_COMPRESSION,
+) -> str:
+    """
+    Write DataFrame to S3 object, the storage format is taken from the key extension.
+    """
+    fmt = get_storage_format(filename=key)
+    body = serialize_df(df=df, fmt=fmt, compression=compression)
+    # The parsed DataFrame is outdated now, but the body we have just written
+    # is exactly what a new read would download.
+    s3_df_cache.invalidate(bucket=bucket, key=key)
+    try:
+        etag = put_object_body(body=body, key=key, bucket=bucket)
+    except RuntimeError as e:
+        return f"Writing to S3 {bucket}/{key} FAILED - {e}"
+    S3_BYTES.labels(direction="write").inc(len(body))
+    if etag:
+        s3_df_cache.put_body(bucket=bucket, key=key, etag=etag, body=body)
+    return f"Writing to S3 {bucket}/{key} - OK"
+
+
+def _parse_s3_body(
+    body: bytes, fmt: str, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    return normalize_date_index(df=deserialize_df(body=body, fmt=fmt, columns=columns))
+
+
+def _select_columns(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Copy, so that callers can't modify the cached DataFrame"""
+    if columns is not None:
+        return df[list(columns)].copy()
+    return df.copy()
+
+
+def read_df_from_s3_key(
+    key: str,
+    bucket: str = S3_BUCKET,
+    columns: Optional[List[str]] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Read DataFrame from S3 object, the storage format is taken from the key extension.
+    Returns None if there is no such object.
+    Goes through s3_df_cache: if the object has not changed since it was cached,
+    S3 answers 304 Not Modified and the cached DataFrame is returned.
+    If columns are given and the DataFrame is not cached, only they are parsed,
+    e.g. only the Close column of the bars for RSI; the full DataFrame
+    is cached only by the reads without columns.
+    """
+    fmt = get_storage_format(filename=key)
+    cached = s3_df_cache.get(bucket=bucket, key=key)
+    kwargs = dict()
+    if cached is not None:
+        kwargs["IfNoneMatch"] = cached.etag
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key, **kwargs)
+    except ClientError as ex:
+        error_code = ex.response["Error"]["Code"]
+        if error_code == "NoSuchKey":
+            s3_df_cache.invalidate(bucket=bucket, key=key)
+            return None
+        elif error_code in ["304", "NotModified"] and cached is not None:
+            res = cached.df
+            S3_CACHE_LOOKUPS.labels(
+                result="memory" if res is not None else "disk"
+            ).inc()
+            if res is None:
+                res = _parse_s3_body(
+                    body=cached.body, fmt=fmt, columns=columns  # type: ignore
+                )
+                if columns is None:
+                    s3_df_cache.put_df(bucket=bucket, key=key, etag=cached.etag, df=res)
+            return _select_columns(df=res, columns=columns)
+        else:
+            raise
+
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if status == 200:
+        body = response["Body"].read()
+        S3_BYTES.labels(direction="read").inc(len(body))
+        S3_CACHE_LOOKUPS.labels(result="miss").inc()
+        res = _parse_s3_body(body=body, fmt=fmt, columns=columns)
+        etag = response.get("ETag")
+        if etag:
+            if columns is None:
+                s3_df_cache.put_df(bucket=bucket, key=key, etag=etag, df=res)
+            else:
+                # An outdated DataFrame in memory would hide the new body
+                s3_df_cache.invalidate(bucket=bucket, key=key, disk=False)
+            s3_df_cache.put_body(bucket=bucket, key=key, etag=etag, body=body)
+        return _select_columns(df=res, columns=columns)
+    else:
+        raise RuntimeError(
+            f"read_df_from_s3_key: S3 response {status=} != 200, full {response=}"
+        )
+
+
+def write_df_to_s3(
+    df: pd.DataFrame,
+    filename: str,
+    bucket: str = S3_BUCKET,
+    folder: str = S3_FOLDER_DAILY_DATA,
+    compression: Optional[str] = S3_STORAGE_COMPRESSION,
+) -> str:
+    """
+    Write DataFrame to S3 as CSV, parquet or Arrow IPC,
+    depending on the filename extension.
+    """
+    folder_filename = _get_folder_filename(
+        caller_func="write_df_to_s3", filename=filename, folder=folder, df=df
+    )
+    return write_df_to_s3_key(
+        df=df, key=folder_filename, bucket=bucket, compression=compression
+    )
+
+
+def read_df_from_s3(
+    filename: str,
+    bucket: str = S3_BUCKET,
+    folder: str = S3_FOLDER_DAILY_DATA,
+    columns: Optional[List[str]] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Read DataFrame from S3 CSV, parquet or Arrow IPC object,
+    depending on the filename extension.
+    """
+    folder_filename = _get_folder_filename(
+        caller_func="read_df_from_s3", filename=filename, folder=folder
+    )
+    return read_df_from_s3_key(key=folder_filename, bucket=bucket, columns=columns)
+
+
+def write_df_to_s3_csv(
+    df: pd.DataFrame,
+    filename: str,
+    bucket: str = S3_BUCKET,
+    folder: str = S3_FOLDER_DAILY_DATA,
+) -> str:
+    if not filename.endswith(".csv"):
+        raise ValueError(f"write_df_to_s3_csv: {filename=} - must end with .csv")
+    return write_df_to_s3(df=df, filename=filename, bucket=bucket, folder=folder)
+
+
+def read_df_from_s3_csv(
+    filename: str,
+    bucket: str = S3_BUCKET,
+    folder: str = S3_FOLDER_DAILY_DATA,
+) -> Optional[pd.DataFrame]:
+    if not filename.endswith(".csv"):
+        raise ValueError(f"read_df_from_s3_csv: {filename=} - must end with .csv")
+    return read_df_from_s3(filename=filename, bucket=bucket, folder=folder)
+
+
+def get_list_of_files_in_s3_folder(
+    s3_bucker: str = S3_BUCKET, s3_folder: str = S3_FOLDER_DAILY_DATA
+) -> List[str]:
+    _check_s3_call_inputs(
+        caller_func="get_list_of_files_in_s3_folder", folder=s3_folder, filename=None
+    )
+    return [obj.key for obj in iter_s3_objects(prefix=s3_folder, bucket=s3_bucker)]
@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from constants import S3_BUCKET, S3_SEGMENT_COMPACTION_THRESHOLD
+from utils.s3.formats import STORAGE_FORMAT_EXTENSIONS, get_storage_format
+from utils.s3.maintenance import (
+    delete_s3_keys,
+    iter_s3_objects,
+    iter_s3_objects_parallel,
+)
+from utils.s3.misc import read_df_from_s3_key, write_df_to_s3_key
+
+# Segments of folder/GLD.parquet are folder/GLD/segments/*.parquet
+SEGMENTS_DIR = "/segments/"
+
+
+def _split_extension(key: str) -> Tuple[str, str]:
+    extension = STORAGE_FORMAT_EXTENSIONS[get_storage_format(filename=key)]
+    return key[: -len(extension)], extension
+
+
+def get_segments_prefix(key: str) -> str:
+    stem, _ = _split_extension(key=key)
+    return stem + SEGMENTS_DIR
+
+
+def get_base_key_of_segment(segment_key: str) -> str:
+    stem, _, name = segment_key.rpartition(SEGMENTS_DIR)
+    _, extension = _split_extension(key=name)
+    return stem + extension
+
+
+def list_segment_keys(key: str, bucket: str = S3_BUCKET) -> List[str]:
+    """Segment keys of the base object key, oldest write first"""
+    prefix = get_segments_prefix(key=key)
+    return sorted(obj.key for obj in iter_s3_objects(prefix=prefix, bucket=bucket))
+
+
+def _read_base_and_segments(
+    key: str, bucket: str, columns: Optional[List[str]]
+) -> Tuple[Optional[pd.DataFrame], List[str]]:
+    segment_keys = list_segment_keys(key=key, bucket=bucket)
+    frames = list()
+    for frame_key in [key] + segment_keys:
+        df = read_df_from_s3_key(key=frame_key, bucket=bucket, columns=columns)
+        if df is not None and not df.empty:
+            frames.append(df)
+    if not frames:
+        return None, segment_keys
+    if len(frames) == 1:
+        return frames[0], segment_keys
+    res = pd.concat(frames)
+    # Rows of later segments win
+    res = res[~res.index.duplicated(keep="last")]
+    res = res.sort_index()
+    return res, segment_keys
+
+
+def read_df_with_segments_from_s3_key(
+    key: str, bucket: str = S3_BUCKET, columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Read the base object merged with all its appended segments.
+    Returns None if there is neither base object nor segments.
+    """
+    res, _ = _read_base_and_segments(key=key, bucket=bucket, columns=columns)
+    return res
+
+
+def append_df_to_s3_key(df: pd.DataFrame, key: str, bucket: str = S3_BUCKET) -> str:
+    """
+    Write only new rows as a small dated segment object next to the base object.
+    Segments are folded into the base object once there are
+    S3_SEGMENT_COMPACTION_THRESHOLD of them.
+    """
+    if df.empty:
+        return f"Nothing to append to S3 {bucket}/{key}"
+    _, extension = _split_extension(key=key)
+    index = pd.to_datetime(df.index)
+    written_at = datetime.now(timezone.utc)
+    segment_name = f"{written_at:%Y%m%dT%H%M%S%f}_{index.min():%Y%m%d}_{index.max():%Y%m%d}{extension}"
+    res = write_df_to_s3_key(
+        df=df, key=get_segments_prefix(key=key) + segment_name, bucket=bucket
+    )
+    if (
+        len(list_segment_keys(key=key, bucket=bucket))
+        >= S3_SEGMENT_COMPACTION_THRESHOLD
+    ):
+        res = res + "; " + compact_s3_key_segments(key=key, bucket=bucket)
+    return res
+
+
+def write_df_with_segments_to_s3_key(
+    df: pd.DataFrame, key: str, bucket: str = S3_BUCKET
+) -> str:
+    """Rewrite the base object with the full history and drop its segments"""
+    segment_keys = list_segment_keys(key=key, bucket=bucket)
+    res = write_df_to_s3_key(df=df, key=key, bucket=bucket)
+    delete_s3_keys(keys=segment_keys, bucket=bucket)
+    return res
+
+
+def compact_s3_key_segments(key: str, bucket: str = S3_BUCKET) -> str:
+    """
+    Fold segments into the base object.
+    Only the segments read here are deleted, so rows appended
+    while compacting are not lost.
+    """
+    df, segment_keys = _read_base_and_segments(key=key, bucket=bucket, columns=None)
+    if df is None or not segment_keys:
+        return f"No segments to compact for S3 {bucket}/{key}"
+    write_df_to_s3_key(df=df, key=key, bucket=bucket)
+    delete_s3_keys(keys=segment_keys, bucket=bucket)
+    return f"Compacted {len(segment_keys)} segments into S3 {bucket}/{key}"
+
+
+def compact_segments_in_s3_folder(folder: str, bucket: str = S3_BUCKET) -> List[str]:
+    """Compact every base object in the folder that has segments"""
+    segments_count: Dict[str, int] = dict()
+    for obj in iter_s3_objects_parallel(prefix=folder, bucket=bucket):
+        if SEGMENTS_DIR in obj.key:
+            base_key = get_base_key_of_segment(segment_key=obj.key)
+            segments_count[base_key] = segments_count.get(base_key, 0) + 1
+    return [
+        compact_s3_key_segments(key=base_key, bucket=bucket)
+        for base_key in sorted(segments_count)
+    ]
@@ -0,0 +1,53 @@
+from datetime import date
+from typing import List, Optional
+
+import pandas as pd
+
+from constants import S3_BUCKET, S3_FOLDER_DAILY_DATA, S3_WRITE_MODE
+from utils.s3.misc import get_ticker_filename
+from utils.s3.segments import (
+    append_df_to_s3_key,
+    read_df_with_segments_from_s3_key,
+    write_df_with_segments_to_s3_key,
+)
+
+
+def get_ticker_key(ticker: str, folder: str = S3_FOLDER_DAILY_DATA) -> str:
+    return folder + get_ticker_filename(ticker=ticker)
+
+
+def read_ticker_df_from_s3(
+    ticker: str,
+    folder: str = S3_FOLDER_DAILY_DATA,
+    columns: Optional[List[str]] = None,
+) -> Optional[pd.DataFrame]:
+    """Ticker history: base object merged with the appended segments"""
+    return read_df_with_segments_from_s3_key(
+        key=get_ticker_key(ticker=ticker, folder=folder),
+        bucket=S3_BUCKET,
+        columns=columns,
+    )
+
+
+def write_ticker_df_to_s3(
+    ticker: str,
+    df: pd.DataFrame,
+    folder: str = S3_FOLDER_DAILY_DATA,
+    last_stored_date: Optional[date] = None,
+) -> str:
+    """
+    Save ticker history. With S3_WRITE_MODE == "append" and a known last stored date,
+    only the rows after that date are written, as a new segment.
+    Otherwise the whole history is rewritten.
+    """
+    if df.empty:
+        raise ValueError(f"write_ticker_df_to_s3: input DataFrame is empty, {ticker=}")
+    key = get_ticker_key(ticker=ticker, folder=folder)
+    if S3_WRITE_MODE == "append" and last_stored_date is not None:
+        new_rows = df[pd.to_datetime(df.index) > pd.Timestamp(last_stored_date)]
+        return append_df_to_s3_key(df=new_rows, key=key, bucket=S3_BUCKET)
+    return write_df_with_segments_to_s3_key(df=df, key=key, bucket=S3_BUCKET)
+
+
+def read_daily_ohlc_from_s3(ticker: str) -> Optional[pd.DataFrame]:
+    return read_ticker_df_from_s3(ticker=ticker, folder=S3_FOLDER_DAILY_DATA)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from constants import OHLC_PRICE_DTYPE
+
+OHLC_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+
+
+def to_date_index(index: pd.Index, intraday: bool = False) -> pd.DatetimeIndex:
+    """
+    The index of bars and derived columns: datetime64[ns] days without time zone,
+    or UTC times without time zone for intraday bars.
+    Time zone aware dates are converted to UTC first, as the stored dates were.
+    An index that is datetime64[ns] without time zone already is returned as is.
+    """
+    if (
+        isinstance(index, pd.DatetimeIndex)
+        and index.tz is None
+        and index.dtype == "datetime64[ns]"
+    ):
+        return index
+    res = pd.DatetimeIndex(pd.to_datetime(index))
+    if res.tz is not None:
+        res = res.tz_convert(None)
+    res = res.as_unit("ns")
+    if not intraday:
+        res = res.normalize()
+    return res.rename(None)
+
+
+def normalize_date_index(df: pd.DataFrame, intraday: bool = False) -> pd.DataFrame:
+    """
+    df with the date index of to_date_index, sorted by date.
+    df itself is returned if it has such an index already, it is never modified.
+    """
+    index = to_date_index(df.index, intraday=intraday)
+    if index is not df.index:
+        df = df.set_axis(index)
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
+
+def normalize_ohlc_df(
+    df: pd.DataFrame, price_dtype: str = OHLC_PRICE_DTYPE, intraday: bool = False
+) -> pd.DataFrame:
+    """
+    Bars in the schema used by the importers, storage and derived columns:
+    the date index of normalize_date_index without duplicate dates,
+    OHLC_COLUMNS only, prices of price_dtype and int64 Volume.
+    Missing Volume values are 0.
+    Raises ValueError if a column is absent or has non-numeric values.
+    """
+    missing = [col_name for col_name in OHLC_COLUMNS if col_name not in df.columns]
+    if missing:
+        raise ValueError(
+            f"normalize_ohlc_df: columns {missing} absent in {list(df.columns)}"
+        )
+    df = normalize_date_index(df=df, intraday=intraday)
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep="last")]
+    try:
+        columns = {
+            col_name: df[col_name].to_numpy(dtype=price_dtype)
+            for col_name in PRICE_COLUMNS
+        }
+        volume = df["Volume"]
+        if volume.dtype != np.int64:
+            volume = pd.to_numeric(volume).fillna(0).astype(np.int64)
+        columns["Volume"] = volume.to_numpy()
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"normalize_ohlc_df: non-numeric values - {e}") from e
+    return pd.DataFrame(columns, index=df.index)
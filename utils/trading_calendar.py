@@ -0,0 +1,73 @@
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+
+from constants import TRADING_CALENDAR_EXTRA_CLOSURES
+
+
+class NyseHolidayCalendar(AbstractHolidayCalendar):
+    """Regular full-day NYSE holidays, early closes are trading days"""
+
+    rules = [
+        # Not moved to Friday when it falls on Saturday
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday(
+            "Juneteenth",
+            month=6,
+            day=19,
+            start_date="2022-01-01",
+            observance=nearest_workday,
+        ),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas Day", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+_holidays: Optional[np.ndarray] = None
+
+
+def _get_holidays() -> np.ndarray:
+    global _holidays
+    if _holidays is None:
+        holidays = NyseHolidayCalendar().holidays(
+            start=pd.Timestamp("1990-01-01"), end=pd.Timestamp("2100-12-31")
+        )
+        extra = pd.DatetimeIndex(TRADING_CALENDAR_EXTRA_CLOSURES)
+        _holidays = holidays.union(extra).to_numpy(dtype="datetime64[D]")
+    return _holidays
+
+
+def is_trading_day(day: date) -> bool:
+    return bool(np.is_busday(np.datetime64(day, "D"), holidays=_get_holidays()))
+
+
+def get_last_finished_session(today: Optional[date] = None) -> date:
+    """
+    Last trading day before today, i.e. the date of the last bar
+    that the importers keep, as today's bar is unfinished.
+    """
+    today = today or pd.Timestamp("today").date()
+    res = np.busday_offset(
+        np.datetime64(today, "D"), -1, roll="forward", holidays=_get_holidays()
+    )
+    return pd.Timestamp(res).date()